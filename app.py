@@ -1,12 +1,17 @@
+import cProfile
+import hmac
+import io
 import os
+import pstats
+import time
 
 import requests
 from dotenv import load_dotenv
 from flasgger import Swagger
-from flask import Flask, abort, jsonify, request
+from flask import Flask, abort, g, jsonify, request
 from flask_caching import Cache
 from flask_cors import CORS
-from sqlalchemy import Integer, and_, case, cast, create_engine, func
+from sqlalchemy import and_, case, create_engine, func, tuple_
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import QueuePool
 
@@ -22,13 +27,27 @@ from models.scores import (
     TeamScore,
     TeamStarted,
     WeekStatus,
+    team_number_sort_key,
 )
 from models.transactions import TeamOnWaivers, WaiverPriority
+from utils.lineup import lineupQueries, optimizeLineupRows
+from utils.metrics import EndpointMetrics, Timing, currentTiming, perfStats
+from utils.projections import projectRows, registrationsQuery
+from utils.simulation import (
+    getCachedSimulation,
+    scoresSignatureQuery,
+    setCachedSimulation,
+    simulateLeagueRows,
+    simulationQueries,
+)
 
 load_dotenv()
 
 TBA_API_ENDPOINT = "https://www.thebluealliance.com/api/v3/"
 TBA_AUTH_KEY = os.getenv("TBA_API_KEY")
+# enables ?profile=1 for requests sending it as X-Admin-Token
+API_ADMIN_TOKEN = os.getenv("API_ADMIN_TOKEN")
+PROFILE_STATS_LIMIT = 60
 
 app = Flask(__name__)
 
@@ -90,6 +109,8 @@ engine = create_engine(
     pool_recycle=180,
 )
 Session = sessionmaker(bind=engine)
+perfStats.instrumentEngine(engine)
+endpointMetrics = EndpointMetrics()
 
 
 # Initialize schema on first request instead of import time
@@ -100,6 +121,84 @@ def init_schema():
         app._schema_initialized = True
 
 
+def profiling_allowed():
+    token = request.headers.get("X-Admin-Token", "")
+    return bool(API_ADMIN_TOKEN) and hmac.compare_digest(token, API_ADMIN_TOKEN)
+
+
+@app.before_request
+def start_request_timer():
+    # statements run by this request are counted into g.timing
+    g.timing = Timing()
+    g.timing_token = currentTiming.set(g.timing)
+    g.request_start = time.perf_counter()
+    if request.args.get("profile") == "1" and profiling_allowed():
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+
+@app.after_request
+def record_request(response):
+    if "request_start" not in g:
+        return response
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+    elapsed = time.perf_counter() - g.request_start
+    endpointMetrics.record(
+        request.endpoint or "unmatched",
+        response.status_code,
+        elapsed,
+        g.timing,
+        response.calculate_content_length(),
+    )
+    if profiler is None:
+        return response
+
+    # Replace the response with the profile of building it
+    report = io.StringIO()
+    report.write(
+        f"{request.method} {request.full_path} -> {response.status_code}"
+        f" in {elapsed * 1000:.1f} ms, {g.timing.queries} SQL statements"
+        f" ({g.timing.dbTime * 1000:.1f} ms)\n\n"
+    )
+    stats = pstats.Stats(profiler, stream=report)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_STATS_LIMIT)
+    return app.response_class(report.getvalue(), mimetype="text/plain")
+
+
+@app.teardown_request
+def reset_request_timer(exc):
+    token = g.pop("timing_token", None)
+    if token is not None:
+        currentTiming.reset(token)
+
+
+@app.route("/api/metrics", methods=["GET"])
+def get_metrics():
+    """
+    Request metrics for this API process in the Prometheus text format.
+    ---
+    tags:
+      - Monitoring
+    description: >
+      Per-endpoint request counts by status, latency and response size
+      histograms, and SQL statement counts and time. Any endpoint can also
+      be profiled by adding profile=1 to its query string and sending the
+      API_ADMIN_TOKEN as the X-Admin-Token header; the response is then a
+      cProfile report instead of the usual body.
+    produces:
+      - text/plain
+    responses:
+      200:
+        description: Metrics in the Prometheus exposition format.
+    """
+    return app.response_class(
+        endpointMetrics.prometheus(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
 @app.route("/api/currentWeek", methods=["GET"])
 def get_current_week():
     """
@@ -389,7 +488,7 @@ def get_waiver_teams(leagueId):
 
             year = league.year
 
-            # Query to retrieve teams on waivers along with their data, ordered by team_number casted as an integer
+            # Query to retrieve teams on waivers along with their data, in team number order
             waiver_teams_query = (
                 session.query(
                     Team.team_number,
@@ -401,11 +500,7 @@ def get_waiver_teams(leagueId):
                 .join(TeamScore, Team.team_number == TeamScore.team_key)
                 .join(FRCEvent, TeamScore.event_key == FRCEvent.event_key)
                 .filter(TeamOnWaivers.league_id == leagueId, FRCEvent.year == year)
-                .order_by(
-                    cast(
-                        Team.team_number, Integer
-                    ).asc()  # Cast team_number to Integer for sorting
-                )
+                .order_by(Team.team_number_int.asc(), Team.team_number.asc())
                 .all()
             )
 
@@ -916,6 +1011,73 @@ def get_lineups(leagueId):
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/fantasyTeams/<int:fantasyTeamId>/optimizedLineup", methods=["GET"])
+def get_optimized_lineup(fantasyTeamId):
+    """
+    Retrieve the season lineup that maximizes a fantasy team's projected points.
+    ---
+    tags:
+      - Leagues
+    parameters:
+      - name: fantasyTeamId
+        in: path
+        type: integer
+        required: true
+        description: ID of the fantasy team to optimize.
+    responses:
+      200:
+        description: One entry per week; locked weeks keep their current starts.
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              week:
+                type: integer
+              locked:
+                type: boolean
+                description: Whether the week's lineup can no longer change.
+              teams:
+                type: array
+                items:
+                  type: object
+                  properties:
+                    team_number:
+                      type: string
+                    event_key:
+                      type: string
+                    projected_points:
+                      type: number
+      400:
+        description: The team's league does not support starts/sits
+      404:
+        description: Fantasy team not found
+    """
+    try:
+        with Session() as session:
+            fantasy_team = (
+                session.query(FantasyTeam)
+                .filter(FantasyTeam.fantasy_team_id == fantasyTeamId)
+                .first()
+            )
+            if not fantasy_team:
+                return jsonify({"error": "Fantasy team not found"}), 404
+
+            league = fantasy_team.league
+            if not league.is_fim:
+                return (
+                    jsonify({"error": "This league does not support starts/sits"}),
+                    400,
+                )
+            rows = {
+                name: session.execute(stmt).all()
+                for name, stmt in lineupQueries(league, fantasyTeamId).items()
+            }
+            return jsonify(optimizeLineupRows(league, fantasyTeamId, rows))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route("/api/leagues/<int:leagueId>/fantasyScores/<int:week>", methods=["GET"])
 def get_fantasy_scores(leagueId, week):
     """
@@ -1521,6 +1683,146 @@ def get_states_round_team_ids(leagueId):
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/years/<int:year>/weeks/<int:week>/topScorers", methods=["GET"])
+@cache.cached(timeout=60, query_string=True)
+def get_top_scorers(year, week):
+    """
+    Retrieve the highest scoring FRC teams at FiM events in a given week.
+    ---
+    tags:
+      - Teams
+    parameters:
+      - name: year
+        in: path
+        type: integer
+        required: true
+        description: The season year.
+      - name: week
+        in: path
+        type: integer
+        required: true
+        description: The event week.
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Number of teams to return (default 25, max 100).
+    responses:
+      200:
+        description: Team event scores, highest first.
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              team_number:
+                type: string
+              name:
+                type: string
+              event_key:
+                type: string
+              total_points:
+                type: integer
+      500:
+        description: Internal server error.
+    """
+    limit = min(request.args.get("limit", 25, type=int), 100)
+    try:
+        with Session() as session:
+            # Sorted and limited in the database on the stored total
+            top_scores = (
+                session.query(
+                    TeamScore.team_key,
+                    Team.name,
+                    TeamScore.event_key,
+                    TeamScore.total_points,
+                )
+                .join(Team, Team.team_number == TeamScore.team_key)
+                .join(FRCEvent, TeamScore.event_key == FRCEvent.event_key)
+                .filter(FRCEvent.year == year, FRCEvent.week == week, FRCEvent.is_fim)
+                .order_by(TeamScore.total_points.desc(), Team.team_number_int.asc())
+                .limit(limit)
+                .all()
+            )
+
+            return jsonify(
+                [
+                    {
+                        "team_number": row.team_key,
+                        "name": row.name,
+                        "event_key": row.event_key,
+                        "total_points": row.total_points,
+                    }
+                    for row in top_scores
+                ]
+            )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/leagues/<int:leagueId>/playoffOdds", methods=["GET"])
+def get_playoff_odds(leagueId):
+    """
+    Simulate the rest of a league's season to estimate each team's odds of a top 3 finish.
+    ---
+    tags:
+      - Leagues
+      - FantasyScores
+    parameters:
+      - name: leagueId
+        in: path
+        type: integer
+        required: true
+        description: ID of the league to simulate.
+    responses:
+      200:
+        description: Fantasy teams ordered by their odds of locking a top 3 spot for States.
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              fantasy_team_id:
+                type: integer
+              fantasy_team_name:
+                type: string
+              rank_points:
+                type: number
+                description: Rank points from finalized weeks.
+              projected_rank_points:
+                type: number
+                description: Expected rank points at the end of the season.
+              top3_odds:
+                type: number
+                description: Share of simulations where the team is top 3 going into States.
+              win_odds:
+                type: number
+                description: Share of simulations where the team finishes first.
+      404:
+        description: League not found
+    """
+    try:
+        with Session() as session:
+            league = session.query(League).filter(League.league_id == leagueId).first()
+
+            if not league:
+                return jsonify({"error": "League not found"}), 404
+
+            signature = tuple(session.execute(scoresSignatureQuery(leagueId)).one())
+            results = getCachedSimulation(leagueId, signature)
+            if results is None:
+                rows = {
+                    name: session.execute(stmt).all()
+                    for name, stmt in simulationQueries(league).items()
+                }
+                results = simulateLeagueRows(league, rows)
+                setCachedSimulation(leagueId, signature, results)
+
+            return jsonify(results)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route("/api/leagues/<int:leagueId>/drafts", methods=["GET"])
 def get_league_drafts(leagueId):
     """
@@ -1736,6 +2038,130 @@ def get_available_teams(draftId):
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/drafts/<int:draftId>/projections", methods=["GET"])
+@cache.cached(timeout=60)
+def get_draft_projections(draftId):
+    """
+    Retrieve projected fantasy points for every team eligible in a draft.
+    ---
+    tags:
+      - Drafts
+      - Teams
+    parameters:
+      - name: draftId
+        in: path
+        type: integer
+        required: true
+        description: ID of the draft to retrieve projections for.
+    responses:
+      200:
+        description: Eligible teams ordered by projected points, with a per-event breakdown.
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              team_number:
+                type: string
+                description: The number of the team.
+              year_end_epa:
+                type: integer
+                description: The EPA the projection is based on.
+              projected_points:
+                type: number
+                description: Expected fantasy points over all of the team's events.
+              is_picked:
+                type: boolean
+                description: Whether the team has already been drafted.
+              events:
+                type: array
+                items:
+                  type: object
+                  properties:
+                    event_key:
+                      type: string
+                    week:
+                      type: integer
+                    qualification_points:
+                      type: number
+                    alliance_points:
+                      type: number
+                    elimination_points:
+                      type: number
+                    award_points:
+                      type: number
+                    rookie_points:
+                      type: number
+                    projected_points:
+                      type: number
+      404:
+        description: Draft not found
+    """
+    try:
+        with Session() as session:
+            draft = session.query(Draft).filter(Draft.draft_id == draftId).first()
+
+            if draft is None:
+                abort(404, description="Draft not found")
+
+            league = draft.league
+            epaYear = league.year if league.offseason else league.year - 1
+            rows = session.execute(
+                registrationsQuery(
+                    league.year, epaYear, None if league.is_fim else draft.event_key
+                )
+            ).all()
+            projection, totals = projectRows(rows, league.year, league.offseason)
+            picked = {
+                team_number
+                for (team_number,) in session.query(DraftPick.team_number).filter(
+                    DraftPick.draft_id == draftId, DraftPick.team_number != "-1"
+                )
+            }
+
+            teams = {}
+            for index, row in enumerate(rows):
+                team_number = row.team_key
+                if team_number not in teams:
+                    teams[team_number] = {
+                        "team_number": team_number,
+                        "year_end_epa": row.year_end_epa,
+                        "projected_points": round(totals[team_number], 2),
+                        "is_picked": team_number in picked,
+                        "events": [],
+                    }
+                teams[team_number]["events"].append(
+                    {
+                        "event_key": row.event_key,
+                        "week": row.week,
+                        "qualification_points": round(
+                            float(projection["qual"][index]), 2
+                        ),
+                        "alliance_points": round(
+                            float(projection["alliance"][index]), 2
+                        ),
+                        "elimination_points": round(
+                            float(projection["elim"][index]), 2
+                        ),
+                        "award_points": round(float(projection["award"][index]), 2),
+                        "rookie_points": round(float(projection["rookie"][index]), 2),
+                        "projected_points": round(
+                            float(projection["total"][index]), 2
+                        ),
+                    }
+                )
+
+            return jsonify(
+                sorted(
+                    teams.values(),
+                    key=lambda team: team["projected_points"],
+                    reverse=True,
+                )
+            )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route("/api/drafts/<int:draftId>", methods=["GET"])
 def get_draft_info(draftId):
     """
@@ -1810,6 +2236,16 @@ def get_available_teams_fim(leagueId):
         type: integer
         required: true
         description: The ID of the league for which to retrieve available teams.
+      - name: after
+        in: query
+        type: string
+        required: false
+        description: Return only teams after this team number (keyset pagination).
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Maximum number of teams to return. All teams if omitted.
     responses:
       200:
         description: A list of available teams for the specified league.
@@ -1851,15 +2287,13 @@ def get_available_teams_fim(leagueId):
                 return jsonify([])
 
             year = league.year
+            after = request.args.get("after")
+            limit = request.args.get("limit", type=int)
 
-            # Query to retrieve available teams
-            available_teams_query = (
-                session.query(
-                    Team.team_number,
-                    Team.name,
-                    FRCEvent.event_key,
-                    FRCEvent.week,
-                )
+            # Page of available teams, walked in (team_number_int, team_number)
+            # index order
+            page_query = (
+                session.query(Team.team_number_int, Team.team_number)
                 .join(TeamScore, Team.team_number == TeamScore.team_key)
                 .join(FRCEvent, TeamScore.event_key == FRCEvent.event_key)
                 .outerjoin(
@@ -1877,11 +2311,31 @@ def get_available_teams_fim(leagueId):
                     == year,  # Teams registered for an event in the current year
                     Team.is_fim.is_(True),  # Only FiM teams
                 )
-                .order_by(
-                    cast(
-                        Team.team_number, Integer
-                    ).asc()  # Cast team_number to Integer for sorting
+                .distinct()
+                .order_by(Team.team_number_int.asc(), Team.team_number.asc())
+            )
+            if after is not None:
+                page_query = page_query.filter(
+                    tuple_(Team.team_number_int, Team.team_number)
+                    > tuple_(team_number_sort_key(after), after)
+                )
+            if limit is not None:
+                page_query = page_query.limit(limit)
+            page = page_query.subquery()
+
+            # Query to retrieve the page's teams with their events this year
+            available_teams_query = (
+                session.query(
+                    Team.team_number,
+                    Team.name,
+                    FRCEvent.event_key,
+                    FRCEvent.week,
                 )
+                .join(page, page.c.team_number == Team.team_number)
+                .join(TeamScore, Team.team_number == TeamScore.team_key)
+                .join(FRCEvent, TeamScore.event_key == FRCEvent.event_key)
+                .filter(FRCEvent.year == year)
+                .order_by(Team.team_number_int.asc(), Team.team_number.asc())
                 .all()
             )
 
@@ -1905,8 +2359,8 @@ def get_available_teams_fim(leagueId):
                     {"event_key": event_key, "week": week}
                 )
 
-            # Return the list of available teams
-            if not available_teams:
+            # Return the list of available teams; a page past the end is empty
+            if not available_teams and after is None:
                 return jsonify({"error": "No available teams found"}), 404
 
             return jsonify(list(available_teams.values()))
@@ -9,12 +9,14 @@ import discord
 import requests
 from discord import Embed, app_commands
 from discord.ext import commands
-from sqlalchemy import delete, or_, select, update
+from sqlalchemy import delete, func, insert, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import selectinload
 
 import cogs.drafting as drafting
 import cogs.manageteam as manageteam
-from models.draft import Draft, DraftOrder, DraftPick, StatboticsData
+from cogs.notifications import queueNotification, queueNotifications
+from models.draft import Draft, DraftOrder, DraftPick, DraftPool, StatboticsData
 from models.scores import (
     FantasyScores,
     FantasyTeam,
@@ -26,6 +28,7 @@ from models.scores import (
     TeamScore,
     TeamStarted,
     WeekStatus,
+    team_number_sort_key,
 )
 from models.transactions import (
     TeamOnWaivers,
@@ -35,6 +38,22 @@ from models.transactions import (
     WaiverPriority,
 )
 from models.users import Player
+from utils.draftlayout import (
+    LINEAR,
+    SERPENTINE,
+    THIRD_ROUND_REVERSAL,
+    draftPickRows,
+)
+from utils.draftstate import buildDraftPool
+from utils.lineup import (
+    STATESLOCKED,
+    fimScoresKey,
+    rankPoints,
+    seasonKey,
+    statesKey,
+    statesLockedPoints,
+)
+from utils.metrics import TimedSession, perfStats, timedGet
 
 logger = logging.getLogger("discord")
 TBA_API_ENDPOINT = "https://www.thebluealliance.com/api/v3/"
@@ -52,6 +71,7 @@ def get_tba_headers() -> dict:
 
 FORUM_CHANNEL_ID = os.getenv("DRAFT_FORUM_ID")
 STATBOTICS_ENDPOINT = "https://api.statbotics.io/v3/team_years"
+PERF_STATS_ROWS = 25
 
 
 class Admin(commands.Cog):
@@ -175,7 +195,7 @@ class Admin(commands.Cog):
                     requestURL = (
                         f"{STATBOTICS_ENDPOINT}?year={year}&limit=500&offset={offset}"
                     )
-                    response = requests.get(requestURL, timeout=30)
+                    response = timedGet(requestURL, timeout=30)
                     if response.status_code != 200:
                         break
                     data = response.json()
@@ -223,6 +243,8 @@ class Admin(commands.Cog):
                 except Exception:
                     logger.error(traceback.format_exc())
                     break
+        # suggestions are ordered by EPA
+        self.bot.draftStates.invalidate()
 
     async def updateTeamsTask(self, interaction, startPage):
         embed = Embed(
@@ -243,7 +265,7 @@ class Admin(commands.Cog):
                 current_page = startPage
                 processed = startPage * 500
 
-                with requests.Session() as http_session:
+                with TimedSession() as http_session:
                     while True:
                         requestURL = f"{TBA_API_ENDPOINT}teams/{current_page}"
                         try:
@@ -299,6 +321,12 @@ class Admin(commands.Cog):
                                     existing_team.is_fim = is_fim
                                     updated = True
 
+                                # backfills rows created before the sort column
+                                sortKey = team_number_sort_key(team_number)
+                                if existing_team.team_number_int != sortKey:
+                                    existing_team.team_number_int = sortKey
+                                    updated = True
+
                                 if updated:
                                     logger.info(
                                         f"Updating team number {team_number}, team name {nickname}, rookie year {rookie_year}"
@@ -310,6 +338,7 @@ class Admin(commands.Cog):
                         await message.edit(embed=embed)
                         await session.commit()
 
+                self.bot.teamAutocomplete.invalidate()
                 embed.description = "Updated team list from The Blue Alliance"
                 await message.edit(embed=embed)
             except Exception:
@@ -329,7 +358,7 @@ class Admin(commands.Cog):
         async with self.bot.async_session() as session:
             try:
                 requestURL = TBA_API_ENDPOINT + "events/" + str(year)
-                response = requests.get(
+                response = timedGet(
                     requestURL, headers=reqheaders, timeout=30
                 ).json()
                 totalEvents = len(response)
@@ -402,7 +431,7 @@ class Admin(commands.Cog):
         async with self.bot.async_session() as session:
             try:
                 requestURL = TBA_API_ENDPOINT + "event/" + str(eventKey)
-                response = requests.get(
+                response = timedGet(
                     requestURL, headers=reqheaders, timeout=30
                 ).json()
                 if "key" not in response.keys():
@@ -441,7 +470,7 @@ class Admin(commands.Cog):
                 embed.description = f"Retrieving {eventKey} teams"
                 await interaction.edit_original_response(embed=embed)
                 requestURL += "/teams/simple"
-                response = requests.get(
+                response = timedGet(
                     requestURL, headers=reqheaders, timeout=30
                 ).json()
                 for team in response:
@@ -502,7 +531,7 @@ class Admin(commands.Cog):
 
         async with self.bot.async_session() as session:
             try:
-                with requests.Session() as http_session:
+                with TimedSession() as http_session:
                     requestURL = (
                         TBA_API_ENDPOINT
                         + "district/"
@@ -687,7 +716,7 @@ class Admin(commands.Cog):
                     + "/district_points"
                 )
                 reqheaders = get_tba_headers()
-                eventresponse = requests.get(
+                eventresponse = timedGet(
                     requestURL, headers=reqheaders, timeout=30
                 ).json()
                 for team in eventresponse["points"]:
@@ -760,7 +789,7 @@ class Admin(commands.Cog):
                     + "/teams/statuses"
                 )
                 reqheaders = get_tba_headers()
-                statusesResponse = requests.get(
+                statusesResponse = timedGet(
                     requestURL, headers=reqheaders, timeout=30
                 ).json()
                 for teamKey in statusesResponse.keys():
@@ -865,7 +894,7 @@ class Admin(commands.Cog):
                     TBA_API_ENDPOINT + "event/" + event.event_key + "/district_points"
                 )
                 reqheaders = get_tba_headers()
-                eventresponse = requests.get(
+                eventresponse = timedGet(
                     requestURL, headers=reqheaders, timeout=30
                 ).json()
                 for team in eventresponse["points"]:
@@ -955,7 +984,7 @@ class Admin(commands.Cog):
                         teamscore = FantasyScores(
                             league_id=league.league_id,
                             fantasy_team_id=fantasyTeam.fantasy_team_id,
-                            event_key=f"fim{league.year}",
+                            event_key=fimScoresKey(league.year),
                             week=week,
                             rank_points=0,
                             weekly_score=0,
@@ -975,35 +1004,32 @@ class Admin(commands.Cog):
                     weekly_score = 0
 
                     for start in teamstarts:
+                        total = func.coalesce(func.sum(TeamScore.total_points), 0)
                         if states:
                             # States Week: Count all points across all events the team competes in,
                             # including the Michigan Championship event
-                            team_scores_result = await session.execute(
-                                select(TeamScore)
+                            stmt = (
+                                select(total)
+                                .select_from(TeamScore)
                                 .join(FRCEvent)
                                 .where(
                                     TeamScore.team_key == start.team_number,
                                     FRCEvent.year == year,
                                     or_(
                                         FRCEvent.week == week,
-                                        FRCEvent.event_key == f"{year}micmp",
+                                        FRCEvent.event_key == statesKey(year),
                                     ),
                                 )
                             )
-                            team_scores = team_scores_result.scalars().all()
                         else:
                             # Pre-States: Only include points for the specific event in TeamStarted
-                            team_scores_result = await session.execute(
-                                select(TeamScore).where(
-                                    TeamScore.team_key == start.team_number,
-                                    TeamScore.event_key == start.event_key,
-                                )
+                            stmt = select(total).where(
+                                TeamScore.team_key == start.team_number,
+                                TeamScore.event_key == start.event_key,
                             )
-                            team_scores = team_scores_result.scalars().all()
 
-                        # Sum up the scores for this team
-                        for score in team_scores:
-                            weekly_score += score.score_team()
+                        # Sum up the scores for this team in the database
+                        weekly_score += (await session.execute(stmt)).scalar()
 
                     teamscore.weekly_score = weekly_score
                     await session.flush()
@@ -1020,6 +1046,7 @@ class Admin(commands.Cog):
                 scoresToRank = rank_result.scalars().all()
 
                 # Special case: If this is States, lock the top 3 teams from previous weeks
+                placed = 0
                 if states:
                     # Calculate cumulative scores up to the current week for the States
                     cumulativeScores = {}
@@ -1039,8 +1066,9 @@ class Admin(commands.Cog):
                     # Get the top 3 teams based on cumulative scores
                     lockedTop3 = sorted(
                         cumulativeScores.items(), key=lambda x: x[1], reverse=True
-                    )[:3]
+                    )[:STATESLOCKED]
                     lockedTop3TeamIds = [team_id for team_id, _ in lockedTop3]
+                    placed = len(lockedTop3TeamIds)
 
                     # Ensure the top 3 are locked in their positions for this week
                     locked_result = await session.execute(
@@ -1061,9 +1089,7 @@ class Admin(commands.Cog):
 
                     # Assign rank points manually for locked top 3
                     for i, teamscore in enumerate(lockedTeamsRanked):
-                        teamscore.rank_points = (
-                            100 - i * 25
-                        )  # Assign rank points from the top
+                        teamscore.rank_points = statesLockedPoints(i)
 
                     # Remove the top 3 from the scoresToRank, leaving the rest to be ranked normally
                     scoresToRank = [
@@ -1072,39 +1098,15 @@ class Admin(commands.Cog):
                         if score.fantasy_team_id not in lockedTop3TeamIds
                     ]
 
-                    # Normal ranking for the rest of the teams
-                    for i, teamscore in enumerate(scoresToRank):
-                        rank = (
-                            i + len(lockedTop3TeamIds) + 1
-                        )  # Start rank after the locked top 3
-                        # Check for ties
-                        if (
-                            i > 0
-                            and teamscore.weekly_score
-                            == scoresToRank[i - 1].weekly_score
-                        ):
-                            teamscore.rank_points = scoresToRank[
-                                i - 1
-                            ].rank_points  # Same rank as the previous team
-                        else:
-                            teamscore.rank_points = len(fantasyTeams) - rank
-                else:
-                    # Normal ranking for non-states weeks
-                    for i, teamscore in enumerate(scoresToRank):
-                        rank = i + 1  # Rank starting from 1
-                        # Check for ties
-                        if (
-                            i > 0
-                            and teamscore.weekly_score
-                            == scoresToRank[i - 1].weekly_score
-                        ):
-                            teamscore.rank_points = scoresToRank[
-                                i - 1
-                            ].rank_points  # Same rank as the previous team
-                        else:
-                            teamscore.rank_points = len(fantasyTeams) - rank
-
-                    await session.flush()
+                # Normal ranking for the rest of the teams, after any locked top 3
+                points = rankPoints(
+                    [score.weekly_score for score in scoresToRank],
+                    len(fantasyTeams),
+                    placed,
+                )
+                for teamscore, rank_points in zip(scoresToRank, points):
+                    teamscore.rank_points = rank_points
+                await session.flush()
 
                 await session.commit()
 
@@ -1128,91 +1130,69 @@ class Admin(commands.Cog):
             )
             frcEvent: FRCEvent = event_result.scalars().first()
             if league:
-                teams_result = await session.execute(
-                    select(FantasyTeam).where(FantasyTeam.league_id == league.league_id)
-                )
-                fantasyTeams = teams_result.scalars().all()
-                # Calculate scores for each fantasy team
-                for fantasyTeam in fantasyTeams:
-                    score_result = await session.execute(
-                        select(FantasyScores).where(
-                            FantasyScores.fantasy_team_id
-                            == fantasyTeam.fantasy_team_id,
-                            FantasyScores.week == frcEvent.week,
-                        )
+                if frcEvent.week in [
+                    6,
+                    7,
+                    8,
+                    9,
+                ]:  # future proofing for future champs week shifting
+                    # States+Champs Weeks: Count all points across all events the team competes in
+                    eventFilter = TeamScore.event_key.in_(
+                        select(FRCEvent.event_key).where(FRCEvent.year == league.year)
                     )
-                    teamscore = score_result.scalars().first()
-                    if not teamscore:
-                        teamscore = FantasyScores(
-                            league_id=league.league_id,
-                            fantasy_team_id=fantasyTeam.fantasy_team_id,
-                            event_key=frcEvent.event_key,
-                            week=frcEvent.week,
-                            rank_points=0,
-                            weekly_score=0,
-                        )
-                        session.add(teamscore)
-                        await session.flush()
-                    picks_result = await session.execute(
-                        select(DraftPick).where(
-                            DraftPick.fantasy_team_id == fantasyTeam.fantasy_team_id,
-                            DraftPick.draft_id == draft.draft_id,
+                else:
+                    # Non-States: Only include points for the specific event
+                    eventFilter = TeamScore.event_key == draft.event_key
+                totals_result = await session.execute(
+                    select(
+                        FantasyTeam.fantasy_team_id,
+                        func.coalesce(func.sum(TeamScore.score_expression()), 0),
+                    )
+                    .outerjoin(
+                        DraftPick,
+                        (DraftPick.fantasy_team_id == FantasyTeam.fantasy_team_id)
+                        & (DraftPick.draft_id == draft.draft_id),
+                    )
+                    .outerjoin(
+                        TeamScore,
+                        (TeamScore.team_key == DraftPick.team_number) & eventFilter,
+                    )
+                    .where(FantasyTeam.league_id == league.league_id)
+                    .group_by(FantasyTeam.fantasy_team_id)
+                )
+                totals = sorted(
+                    ((int(total), teamId) for teamId, total in totals_result.all()),
+                    reverse=True,
+                )
+                points = rankPoints([total for total, _ in totals], len(totals))
+                rows = []
+                for (weekly_score, fantasyTeamId), rank_points in zip(totals, points):
+                    rows.append(
+                        {
+                            "league_id": league.league_id,
+                            "fantasy_team_id": fantasyTeamId,
+                            "week": frcEvent.week,
+                            "event_key": frcEvent.event_key,
+                            "rank_points": rank_points,
+                            "weekly_score": weekly_score,
+                        }
+                    )
+                if rows:
+                    upsert = pg_insert(FantasyScores).values(rows)
+                    await session.execute(
+                        upsert.on_conflict_do_update(
+                            index_elements=[
+                                FantasyScores.league_id,
+                                FantasyScores.fantasy_team_id,
+                                FantasyScores.week,
+                                FantasyScores.event_key,
+                            ],
+                            set_={
+                                "rank_points": upsert.excluded.rank_points,
+                                "weekly_score": upsert.excluded.weekly_score,
+                            },
                         )
                     )
-                    draftPicks = picks_result.scalars().all()
-                    # Calculate weekly score based on team starts
-                    weekly_score = 0
-                    for pick in draftPicks:
-                        if frcEvent.week in [
-                            6,
-                            7,
-                            8,
-                            9,
-                        ]:  # future proofing for future champs week shifting
-                            # States+Champs Weeks: Count all points across all events the team competes in
-                            team_scores_result = await session.execute(
-                                select(TeamScore)
-                                .join(League)
-                                .where(
-                                    TeamScore.team_key == pick.team_number,
-                                    League.year == league.year,
-                                )
-                            )
-                            team_scores = team_scores_result.scalars().all()
-                        else:
-                            # Non-States: Only include points for the specific event
-                            team_scores_result = await session.execute(
-                                select(TeamScore).where(
-                                    TeamScore.team_key == pick.team_number,
-                                    TeamScore.event_key == draft.event_key,
-                                )
-                            )
-                            team_scores = team_scores_result.scalars().all()
-                        # Sum up the scores for this team
-                        for score in team_scores:
-                            weekly_score += score.score_team()
-                    teamscore.weekly_score = weekly_score
-                    await session.flush()
-                # Retrieve all scores for the league in the current week
-                rank_result = await session.execute(
-                    select(FantasyScores)
-                    .where(FantasyScores.league_id == league.league_id)
-                    .order_by(FantasyScores.weekly_score.desc())
-                )
-                scoresToRank = rank_result.scalars().all()
-                for i, teamscore in enumerate(scoresToRank):
-                    rank = i + 1  # Rank starting from 1
-                    # Check for ties
-                    if (
-                        i > 0
-                        and teamscore.weekly_score == scoresToRank[i - 1].weekly_score
-                    ):
-                        teamscore.rank_points = scoresToRank[
-                            i - 1
-                        ].rank_points  # Same rank as the previous team
-                    else:
-                        teamscore.rank_points = len(fantasyTeams) - rank
-                await session.flush()
 
             await session.commit()
             await message.edit(content=f"Updated all scores for {frcEvent.event_key}")
@@ -1280,10 +1260,15 @@ class Admin(commands.Cog):
 
                 else:
                     congrats_message = f"Unofficial scores for Week {week}. Check back later for final results!"
-                channel = self.bot.get_channel(int(league.discord_channel))
-                await channel.send(content=congrats_message, embed=embed)
+                await queueNotification(
+                    session,
+                    content=congrats_message,
+                    embed=embed,
+                    channel_id=league.discord_channel,
+                )
+            await session.commit()
             await interaction.followup.send(
-                f"Weekly scores for Week {week} have been sent to all active leagues."
+                f"Weekly scores for Week {week} have been queued for all active leagues."
             )
 
     async def notifySingleDraftTask(self, interaction: discord.Interaction, draft_id):
@@ -1335,8 +1320,13 @@ class Admin(commands.Cog):
                 congrats_message = f"**Congratulations to {winning_team.fantasy_team_name} for winning this draft with {winning_score} points!**\n"
                 for player in playersToNotify:
                     congrats_message += f"<@{player.player_id}> "
-                channel = self.bot.get_channel(int(league.discord_channel))
-                await channel.send(content=congrats_message, embed=embed)
+                await queueNotification(
+                    session,
+                    content=congrats_message,
+                    embed=embed,
+                    channel_id=league.discord_channel,
+                )
+                await session.commit()
 
     async def getLeagueStandingsTask(
         self, interaction: discord.Interaction, year, week
@@ -1461,8 +1451,15 @@ class Admin(commands.Cog):
             for team_number in team_numbers:
                 team_score = TeamScore(team_key=team_number, event_key=event.event_key)
                 session.add(team_score)
+            await session.flush()
+            drafts_result = await session.execute(
+                select(Draft.draft_id).where(Draft.event_key == event.event_key)
+            )
+            for draft_id in drafts_result.scalars().all():
+                await buildDraftPool(session, draft_id)
             # Step 6: Commit the changes
             await session.commit()
+            self.bot.draftStates.invalidateEvent(event.event_key)
             await interaction.followup.send(
                 f"Teams added to event {event.event_name} successfully."
             )
@@ -1537,8 +1534,12 @@ class Admin(commands.Cog):
                 team_score.team_key = newBTeamNumber
                 draft_pick.team_number = newBTeamNumber
 
+                await session.flush()
+                await buildDraftPool(session, draft.draft_id)
+
                 # Step 4: Commit changes
                 await session.commit()
+                self.bot.draftStates.invalidate(draft.draft_id)
 
                 # Step 5: Send success message
                 await interaction.followup.send(
@@ -1683,58 +1684,12 @@ class Admin(commands.Cog):
     async def getForum(self):
         return self.bot.get_channel(int(FORUM_CHANNEL_ID))
 
-    async def getLeagueId(self):  # league id generation for primary key
-        async with self.bot.async_session() as session:
-            result = await session.execute(
-                select(League).order_by(League.league_id.desc())
-            )
-            maxleague = result.scalars().first()
-            if maxleague is not None:
-                return maxleague.league_id + 1
-            else:
-                return 1
-
-    async def getFantasyTeamId(self):  # fantasy team id generation for primary key
-        async with self.bot.async_session() as session:
-            result = await session.execute(
-                select(FantasyTeam).order_by(FantasyTeam.fantasy_team_id.desc())
-            )
-            maxFantasyTeam = result.scalars().first()
-            if maxFantasyTeam is not None:
-                return maxFantasyTeam.fantasy_team_id + 1
-            else:
-                return 1
-
-    async def getDraftId(self):  # draft id generation for primary key
-        async with self.bot.async_session() as session:
-            result = await session.execute(
-                select(Draft).order_by(Draft.draft_id.desc())
-            )
-            maxDraft = result.scalars().first()
-            if maxDraft is not None:
-                return maxDraft.draft_id + 1
-            else:
-                return 1
-
     async def getFantasyTeamIdFromUserAndInteraction(
         self, interaction: discord.Interaction, user: discord.User
     ):
-        async with self.bot.async_session() as session:
-            result = await session.execute(
-                select(FantasyTeam)
-                .join(
-                    PlayerAuthorized,
-                    FantasyTeam.fantasy_team_id == PlayerAuthorized.fantasy_team_id,
-                )
-                .join(League, FantasyTeam.league_id == League.league_id)
-                .where(PlayerAuthorized.player_id == str(user.id))
-                .where(League.discord_channel == str(interaction.channel_id))
-            )
-            team = result.scalars().first()
-            if team:
-                return team.fantasy_team_id
-            else:
-                return None
+        return await self.bot.getUserFantasyTeamId(
+            user.id, interaction.channel_id, drafts=False
+        )
 
     @app_commands.command(
         name="updateteamlist", description="Grabs all teams from TBA (ADMIN)"
@@ -1766,9 +1721,7 @@ class Admin(commands.Cog):
                 )
             )[0]
             threadId = thread.id
-            newLeagueId = await self.getLeagueId()
             leagueToAdd = League(
-                league_id=newLeagueId,
                 league_name=league_name,
                 team_limit=team_limit,
                 team_starts=team_starts,
@@ -1781,6 +1734,7 @@ class Admin(commands.Cog):
             async with self.bot.async_session() as session:
                 session.add(leagueToAdd)
                 await session.commit()
+            self.bot.invalidateChannelLeagues()
             await interaction.response.send_message(
                 f"League created successfully! <#{threadId}>"
             )
@@ -1805,9 +1759,7 @@ class Admin(commands.Cog):
                 )
             )[0]
             threadId = thread.id
-            newLeagueId = await self.getLeagueId()
             leagueToAdd = League(
-                league_id=newLeagueId,
                 league_name=league_name,
                 team_limit=100,
                 team_starts=teams_to_draft,
@@ -1820,6 +1772,7 @@ class Admin(commands.Cog):
             async with self.bot.async_session() as session:
                 session.add(leagueToAdd)
                 await session.commit()
+            self.bot.invalidateChannelLeagues()
             await interaction.response.send_message(
                 f"League created successfully! <#{threadId}>"
             )
@@ -1864,9 +1817,7 @@ class Admin(commands.Cog):
                         f"League with id {leagueid} is at max capacity."
                     )
                     return
-                newTeamId = await self.getFantasyTeamId()
                 fantasyTeamToAdd = FantasyTeam(
-                    fantasy_team_id=newTeamId,
                     fantasy_team_name=teamname,
                     league_id=leagueid,
                 )
@@ -1905,19 +1856,17 @@ class Admin(commands.Cog):
                         "League is at max capacity."
                     )
                     return
-                while teamLimit > len(teamsInLeague):
-                    newTeamId = await self.getFantasyTeamId()
+                for _ in range(teamLimit - len(teamsInLeague)):
                     fantasyTeamToAdd = FantasyTeam(
-                        fantasy_team_id=newTeamId,
-                        fantasy_team_name=f"Team {newTeamId}",
-                        league_id=leagueid,
+                        fantasy_team_name="", league_id=leagueid
                     )
                     session.add(fantasyTeamToAdd)
-                    await session.commit()
-                    teams_result = await session.execute(
-                        select(FantasyTeam).where(FantasyTeam.league_id == leagueid)
+                    # the generated id names the team
+                    await session.flush()
+                    fantasyTeamToAdd.fantasy_team_name = (
+                        f"Team {fantasyTeamToAdd.fantasy_team_id}"
                     )
-                    teamsInLeague = teams_result.scalars().all()
+                await session.commit()
                 await interaction.response.send_message("Teams created successfully!.")
 
     @app_commands.command(
@@ -1974,16 +1923,17 @@ class Admin(commands.Cog):
                     )
                 )[0]
                 threadId = thread.id
-                newDraftId = await self.getDraftId()
                 draftToCreate = Draft(
-                    draft_id=newDraftId,
                     league_id=leagueid,
                     rounds=rounds,
                     event_key=event_key,
                     discord_channel=str(threadId),
                 )
                 session.add(draftToCreate)
+                await session.flush()
+                await buildDraftPool(session, draftToCreate.draft_id)
                 await session.commit()
+                self.bot.invalidateChannelLeagues()
                 await interaction.response.send_message(
                     f"Draft generated! <#{threadId}>"
                 )
@@ -1992,30 +1942,21 @@ class Admin(commands.Cog):
                     title="**Draft order**",
                     description="```Draft Slot    Team Name (id)\n",
                 )
-                randomizedteams = [
-                    fantasyTeam.fantasy_team_id for fantasyTeam in teamsInLeague
-                ]
+                randomizedteams = list(teamsInLeague)
                 random.shuffle(randomizedteams)
-                i = 1
-                for team_id in randomizedteams:
-                    draftOrder = DraftOrder(
-                        draft_id=draftToCreate.draft_id,
-                        draft_slot=i,
-                        fantasy_team_id=team_id,
-                    )
-                    teamname = next(
-                        (
-                            t.fantasy_team_name
-                            for t in teamsInLeague
-                            if t.fantasy_team_id == team_id
-                        ),
-                        "Unknown",
-                    )
-                    draftOrderEmbed.description += (
-                        f"{i:>10d}    {teamname} ({team_id})\n"
-                    )
-                    session.add(draftOrder)
-                    i += 1
+                for i, fantasyTeam in enumerate(randomizedteams, start=1):
+                    draftOrderEmbed.description += f"{i:>10d}    {fantasyTeam.fantasy_team_name} ({fantasyTeam.fantasy_team_id})\n"
+                await session.execute(
+                    insert(DraftOrder),
+                    [
+                        {
+                            "draft_id": draftToCreate.draft_id,
+                            "draft_slot": i,
+                            "fantasy_team_id": fantasyTeam.fantasy_team_id,
+                        }
+                        for i, fantasyTeam in enumerate(randomizedteams, start=1)
+                    ],
+                )
                 draftOrderEmbed.description += "```"
                 await thread.send(embed=draftOrderEmbed)
                 await session.commit()
@@ -2023,7 +1964,16 @@ class Admin(commands.Cog):
     @app_commands.command(
         name="startdraft", description="Starts the draft in the current channel (ADMIN)"
     )
-    async def startDraft(self, interaction: discord.Interaction):
+    @app_commands.choices(
+        order=[
+            app_commands.Choice(name="Serpentine", value=SERPENTINE),
+            app_commands.Choice(name="Linear", value=LINEAR),
+            app_commands.Choice(name="3rd round reversal", value=THIRD_ROUND_REVERSAL),
+        ]
+    )
+    async def startDraft(
+        self, interaction: discord.Interaction, order: str = SERPENTINE
+    ):
         if await self.verifyAdmin(interaction):
             async with self.bot.async_session() as session:
                 drafts_result = await session.execute(
@@ -2041,33 +1991,27 @@ class Admin(commands.Cog):
                 message = await interaction.original_response()
                 draftid = drafts[0].draft_id
                 orders_result = await session.execute(
-                    select(DraftOrder).where(DraftOrder.draft_id == draftid)
+                    select(DraftOrder.draft_slot, DraftOrder.fantasy_team_id).where(
+                        DraftOrder.draft_id == draftid
+                    )
                 )
-                draftOrders = orders_result.scalars().all()
+                draftOrders = dict(orders_result.all())
                 if len(draftOrders) == 0:
                     await message.edit(content="Error generating draft picks.")
                     return
-                for teamDraftOrder in draftOrders:
-                    for k in range(drafts[0].rounds):
-                        pickNumber = k * len(draftOrders)
-                        if k % 2 == 0:  # handle serpentine
-                            pickNumber += teamDraftOrder.draft_slot
-                        else:
-                            pickNumber += (
-                                len(draftOrders) - teamDraftOrder.draft_slot
-                            ) + 1
-                        draftPickToAdd = DraftPick(
-                            draft_id=draftid,
-                            fantasy_team_id=teamDraftOrder.fantasy_team_id,
-                            pick_number=pickNumber,
-                            team_number="-1",
-                        )
-                        session.add(draftPickToAdd)
+                # every pick of the draft in one INSERT
+                await session.execute(
+                    insert(DraftPick),
+                    draftPickRows(draftid, draftOrders, drafts[0].rounds, order),
+                )
+                # registrations may have changed since the draft was created
+                await buildDraftPool(session, draftid)
                 await session.commit()
+                self.bot.draftStates.invalidate(draftid)
                 await message.edit(content="Draft rounds generated!")
             draftCog = drafting.Drafting(self.bot)
             await draftCog.postDraftBoard(interaction=interaction)
-            await draftCog.notifyNextPick(interaction, draft_id=draftid)
+            await draftCog.notifyNextPick(interaction.channel, draft_id=draftid)
 
     @app_commands.command(
         name="resetdraft", description="Resets an already started draft. (ADMIN)"
@@ -2090,7 +2034,14 @@ class Admin(commands.Cog):
                 await session.execute(
                     delete(DraftPick).where(DraftPick.draft_id == draftid)
                 )
+                await session.execute(
+                    update(DraftPool)
+                    .where(DraftPool.draft_id == draftid)
+                    .values(is_picked=False)
+                )
                 await session.commit()
+                self.bot.draftStates.invalidate(draftid)
+            await drafting.Drafting(self.bot).stopPickClock(draftid)
             await interaction.response.send_message(
                 "Successfully reset draft! Use command /startdraft to restart the draft."
             )
@@ -2177,6 +2128,7 @@ class Admin(commands.Cog):
                     )
                     session.add(authorizeToAdd)
                     await session.commit()
+                    self.bot.invalidateUserTeams(user.id)
                     fantasyTeam_result = await session.execute(
                         select(FantasyTeam).where(
                             FantasyTeam.fantasy_team_id == fantasyteamid
@@ -2221,19 +2173,41 @@ class Admin(commands.Cog):
                     content="No draft associated with this channel."
                 )
                 return
-            league: League = await draftCog.getLeague(draft_id=draft.draft_id)
-            suggestedTeams = await draftCog.getSuggestedTeamsList(
-                eventKey=draft.event_key,
-                year=league.year,
-                isFiM=league.is_fim,
-                draft_id=draft.draft_id,
-                isOffseason=league.offseason,
-            )
-            teamToPick = suggestedTeams[0][0]
+            state = await self.bot.draftStates.get(draft.draft_id)
+            teamToPick = state.autoPickTeam(state.currentFantasyTeamId())
+            if teamToPick is None:
+                await interaction.channel.send(
+                    content="No available teams left to draft."
+                )
+                return
             await draftCog.makeDraftPickHandler(
                 interaction=interaction, team_number=teamToPick, force=True
             )
 
+    @app_commands.command(
+        name="pickclock",
+        description="Set the pick clock in seconds for the draft in this channel, 0 to disable (ADMIN)",
+    )
+    async def setPickClock(self, interaction: discord.Interaction, seconds: int):
+        if await self.verifyAdmin(interaction):
+            draftCog = drafting.Drafting(self.bot)
+            draft: Draft = await draftCog.getDraftFromChannel(interaction=interaction)
+            if draft is None:
+                await interaction.response.send_message(
+                    "No draft associated with this channel."
+                )
+                return
+            await interaction.response.send_message(
+                f"Setting pick clock to {seconds} seconds."
+                if seconds > 0
+                else "Disabling pick clock."
+            )
+            deadline = await draftCog.setPickClock(draft.draft_id, seconds)
+            if deadline is not None:
+                await interaction.channel.send(
+                    f"Current pick clock expires <t:{int(deadline.timestamp())}:R>."
+                )
+
     @app_commands.command(
         name="statboticsupdate", description="Updates cache of Statbotics data (ADMIN)"
     )
@@ -2241,6 +2215,44 @@ class Admin(commands.Cog):
         if await self.verifyAdmin(interaction):
             asyncio.create_task(self.updateStatboticsTask(interaction, year))
 
+    @app_commands.command(
+        name="cachestats", description="Shows hit/miss counts for the lookup caches (ADMIN)"
+    )
+    async def cacheStats(self, interaction: discord.Interaction):
+        if await self.verifyAdmin(interaction):
+            embed = Embed(
+                title="**Lookup Caches**",
+                description=f"```{'Cache':<20s}{'Size':>6s}{'Hits':>8s}{'Misses':>8s}{'Hit %':>8s}\n",
+            )
+            for stats in self.bot.cacheStats():
+                embed.description += f"{stats['name']:<20s}{stats['size']:>6d}{stats['hits']:>8d}{stats['misses']:>8d}{stats['hit_rate']:>8.1%}\n"
+            sessions = self.bot.async_session.stats()
+            embed.description += f"\nInteraction sessions: {sessions['scopes']}, reused by helpers: {sessions['reused']}\n"
+            locks = self.bot.locks.stats()
+            embed.description += f"Mutation locks: {locks['acquisitions']} taken, {locks['contended']} contended, {locks['avg_wait'] * 1000:.1f} ms avg / {locks['max_wait'] * 1000:.1f} ms max wait\n"
+            embed.description += "```"
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(
+        name="perfstats",
+        description="Shows latency, query counts and API time per command (ADMIN)",
+    )
+    async def showPerfStats(self, interaction: discord.Interaction):
+        if await self.verifyAdmin(interaction):
+            embed = Embed(
+                title="**Command Performance** (ms, slowest p95 first)",
+                description=f"```{'Command':<20s}{'Calls':>6s}{'p50':>7s}{'p95':>7s}{'Max':>7s}{'Qry':>5s}{'DB':>7s}{'HTTP':>7s}\n",
+            )
+            for name, stats in perfStats.commandSummaries()[:PERF_STATS_ROWS]:
+                embed.description += f"{name[:19]:<20s}{stats['calls']:>6d}{stats['p50'] * 1000:>7.0f}{stats['p95'] * 1000:>7.0f}{stats['max'] * 1000:>7.0f}{stats['avg_queries']:>5.1f}{stats['avg_db'] * 1000:>7.0f}{stats['avg_http'] * 1000:>7.0f}\n"
+            snapshot = perfStats.snapshot()
+            queries = snapshot["queries"]
+            embed.description += f"\nQueries: {queries['count']}, p50 {queries['p50'] * 1000:.1f} ms, p95 {queries['p95'] * 1000:.1f} ms, max {queries['max'] * 1000:.1f} ms\n"
+            for service, http in snapshot["http"].items():
+                embed.description += f"{service}: {http['count']} requests, p50 {http['p50'] * 1000:.0f} ms, p95 {http['p95'] * 1000:.0f} ms, max {http['max'] * 1000:.0f} ms\n"
+            embed.description += "```"
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+
     @app_commands.command(
         name="deauthplayer", description="Remove a player from a team (ADMIN)"
     )
@@ -2258,6 +2270,7 @@ class Admin(commands.Cog):
                         )
                     )
                     await session.commit()
+                self.bot.invalidateUserTeams(user.id)
                 await interaction.response.send_message(
                     f"Successfully removed <@{user.id}> from league.", ephemeral=True
                 )
@@ -2369,6 +2382,7 @@ class Admin(commands.Cog):
                 await session.flush()
                 await session.execute(delete(TradeProposal))
                 await session.commit()
+            self.bot.invalidateCurrentWeek()
             await interaction.response.send_message(
                 f"Locked lineups for week {currentWeek.week} in {currentWeek.year}"
             )
@@ -2397,10 +2411,57 @@ class Admin(commands.Cog):
                 weekToMod.active = False
                 weekToMod.lock_lineups = True
                 await session.commit()
+            self.bot.invalidateCurrentWeek()
             await message.edit(
                 content=f"Deactivated week {currentWeek.week} in {currentWeek.year}"
             )
 
+    async def getLineupDeficits(self, session, week: WeekStatus):
+        """Every (player, fantasy team, starts set, starts allowed) row for active
+        FiM leagues where the team has not filled its lineup for the week.
+
+        Teams without authorized players get one row with a null player_id."""
+        startsAllowed = League.team_starts
+        if week.week == manageteam.STATESWEEK:
+            startsAllowed = League.team_starts + manageteam.STATESEXTRA
+        startsSet = (
+            select(
+                TeamStarted.fantasy_team_id,
+                func.count().label("starts_set"),
+            )
+            .where(TeamStarted.week == week.week)
+            .group_by(TeamStarted.fantasy_team_id)
+            .subquery()
+        )
+        startsSetCount = func.coalesce(startsSet.c.starts_set, 0)
+        result = await session.execute(
+            select(
+                PlayerAuthorized.player_id,
+                FantasyTeam.fantasy_team_id,
+                FantasyTeam.fantasy_team_name,
+                League.league_id,
+                League.discord_channel,
+                startsSetCount.label("starts_set"),
+                startsAllowed.label("starts_allowed"),
+            )
+            .join(FantasyTeam, FantasyTeam.league_id == League.league_id)
+            .outerjoin(
+                PlayerAuthorized,
+                PlayerAuthorized.fantasy_team_id == FantasyTeam.fantasy_team_id,
+            )
+            .outerjoin(
+                startsSet, startsSet.c.fantasy_team_id == FantasyTeam.fantasy_team_id
+            )
+            .where(
+                League.active,
+                League.is_fim,
+                League.year == week.year,
+                startsSetCount < startsAllowed,
+            )
+            .order_by(League.league_id, FantasyTeam.fantasy_team_id)
+        )
+        return result.all()
+
     @app_commands.command(
         name="remind", description="Remind players to set their lineups (ADMIN)"
     )
@@ -2409,53 +2470,41 @@ class Admin(commands.Cog):
             await interaction.response.send_message(
                 "Reminding all users with unfilled lineups to fill them."
             )
+            week: WeekStatus = await self.bot.getCurrentWeek()
+            if week is None:
+                await interaction.channel.send(content="There is no active week!")
+                return
             async with self.bot.async_session() as session:
-                leagues_result = await session.execute(
-                    select(League).where(League.active)
-                )
-                leagues = leagues_result.scalars().all()
-                if len(leagues) == 0:
+                deficits = await self.getLineupDeficits(session, week)
+                if len(deficits) == 0:
                     await interaction.channel.send(
-                        content="There are no active leagues!"
+                        content="Every active league has full lineups!"
                     )
-                else:
-                    for league in leagues:
-                        sendReminder = False
-                        reminderMessage = "Teams with unfilled lineups:\n"
-                        leagueTeams_result = await session.execute(
-                            select(FantasyTeam).where(
-                                FantasyTeam.league_id == league.league_id
-                            )
-                        )
-                        leagueTeams = leagueTeams_result.scalars().all()
-                        for team in leagueTeams:
-                            numberOfStarters_result = await session.execute(
-                                select(TeamStarted).where(
-                                    TeamStarted.fantasy_team_id == team.fantasy_team_id
-                                )
-                            )
-                            numberOfStarters = len(
-                                numberOfStarters_result.scalars().all()
-                            )
-                            if numberOfStarters < league.team_starts:
-                                sendReminder = True
-                                playersToNotify_result = await session.execute(
-                                    select(PlayerAuthorized).where(
-                                        PlayerAuthorized.fantasy_team_id
-                                        == team.fantasy_team_id
-                                    )
-                                )
-                                playersToNotify = playersToNotify_result.scalars().all()
-                                reminderMessage += f"{team.fantasy_team_name} "
-                                for player in playersToNotify:
-                                    reminderMessage += f"<@{player.player_id}> "
-                                reminderMessage += f"currently starting {numberOfStarters} of {league.team_starts}\n"
-                        if sendReminder:
-                            channel = await self.bot.fetch_channel(
-                                int(league.discord_channel)
-                            )
-                            if not channel is None:
-                                await channel.send(content=reminderMessage)
+                    return
+                # one message per league, one line per fantasy team
+                leagueMessages = {}
+                for row in deficits:
+                    channelId, teams = leagueMessages.setdefault(
+                        row.league_id, (row.discord_channel, {})
+                    )
+                    if row.fantasy_team_id not in teams:
+                        teams[row.fantasy_team_id] = [
+                            f"{row.fantasy_team_name} ",
+                            f"currently starting {row.starts_set} of {row.starts_allowed}\n",
+                        ]
+                    # a team with no authorized players is still listed, unmentioned
+                    if row.player_id is not None:
+                        teams[row.fantasy_team_id].insert(-1, f"<@{row.player_id}> ")
+                notifications = []
+                for channelId, teams in leagueMessages.values():
+                    reminderMessage = "Teams with unfilled lineups:\n"
+                    for parts in teams.values():
+                        reminderMessage += "".join(parts)
+                    notifications.append(
+                        {"content": reminderMessage, "channel_id": channelId}
+                    )
+                await queueNotifications(session, notifications)
+                await session.commit()
 
     @app_commands.command(
         name="processwaivers", description="Process all waivers (ADMIN)"
@@ -2466,6 +2515,17 @@ class Admin(commands.Cog):
             message = await interaction.original_response()
             week: WeekStatus = await self.bot.getCurrentWeek()
             async with self.bot.async_session() as session:
+                result = await session.execute(
+                    select(League.league_id).where(League.active)
+                )
+                leagueKeys = [("league", league_id) for league_id in result.scalars()]
+            # hold every active league's lock until the claims are committed
+            if self.bot.locks.wouldWait(*leagueKeys):
+                await self.bot.async_session.release()
+            async with (
+                self.bot.locks.holdAll(leagueKeys),
+                self.bot.async_session() as session,
+            ):
                 leagues_result = await session.execute(
                     select(League).where(League.active)
                 )
@@ -2595,7 +2655,7 @@ class Admin(commands.Cog):
                                                         Draft.league_id
                                                         == fantasyTeam.league_id,
                                                         Draft.event_key
-                                                        == str(league.year) + "fim",
+                                                        == seasonKey(league.year),
                                                     )
                                                 )
                                             )
@@ -2753,6 +2813,7 @@ class Admin(commands.Cog):
                     await session.flush()
                 msg = await interaction.original_response()
                 await session.commit()
+                self.bot.invalidateCurrentWeek()
                 await msg.edit(content="Success!")
 
     @app_commands.command(name="scoredraft", description="Score an individual draft")
@@ -1,51 +1,54 @@
 import logging
 import os
+import re
+from datetime import datetime, timedelta
 from math import ceil
 
 import discord
 from discord import Embed, app_commands
 from discord.ext import commands
 from discord.ui import Button, View
-from sqlalchemy import Integer, select
+from sqlalchemy import delete, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 
-from models.draft import Draft, DraftOrder, DraftPick, StatboticsData
+from models.draft import (
+    Draft,
+    DraftClock,
+    DraftOrder,
+    DraftPick,
+    DraftPool,
+    DraftQueue,
+)
 from models.scores import (
     FantasyTeam,
     FRCEvent,
     League,
     PlayerAuthorized,
-    Team,
     TeamOwned,
     TeamScore,
+    team_number_sort_key,
 )
 from models.transactions import WaiverPriority
+from utils.draftstate import DraftPickConflict
+from utils.locks import draftOf, serialized
 
 logger = logging.getLogger("discord")
+DRAFT_BOARD_ROUNDS_PER_PAGE = 4
+AVAILABLE_TEAMS_PER_EMBED = 168
+# draft_id -> (draft state, picks made, rendered board pages)
+draftBoardCache = {}
 
 
 class Drafting(commands.Cog):
 
     class DraftPaginationView(View):
-        def __init__(
-            self,
-            bot,
-            interaction,
-            session,
-            draftOrder,
-            draft,
-            rounds_per_page,
-            total_pages,
-        ):
+        def __init__(self, pages, current_page=0):
             super().__init__(timeout=5000)
-            self.bot = bot
-            self.interaction = interaction
-            self.session = session
-            self.draftOrder = draftOrder
-            self.draft = draft
-            self.rounds_per_page = rounds_per_page
-            self.total_pages = total_pages
-            self.current_page = 0
+            self.message = None
+            self.pages = pages
+            self.total_pages = len(pages)
+            self.current_page = current_page
 
         @discord.ui.button(label="Previous", style=discord.ButtonStyle.primary)
         async def previous_button(
@@ -64,218 +67,108 @@ class Drafting(commands.Cog):
                 await self.update_embed(interaction)
 
         async def update_embed(self, interaction: discord.Interaction):
-            draftCog = Drafting(self.bot)
-            new_embed = await draftCog.createDraftBoardEmbed(
-                self.session,
-                self.draftOrder,
-                self.draft,
-                self.current_page,
-                self.total_pages,
-                self.rounds_per_page,
-            )
+            # pages are pre-rendered, flipping never touches the database
             self.children[0].disabled = self.current_page <= 0
             self.children[1].disabled = self.current_page >= self.total_pages - 1
-            await interaction.message.edit(embed=new_embed, view=self)
+            await interaction.message.edit(
+                embed=self.pages[self.current_page], view=self
+            )
 
         async def on_timeout(self):
             for child in self.children:
                 child.disabled = True
-            await self.interaction.message.edit(view=self)
+            if self.message is not None:
+                await self.message.edit(view=self)
 
     def __init__(self, bot):
         self.bot = bot
 
-    async def getCurrentPickTeamId(self, draft_id):
-        async with self.bot.async_session() as session:
-            stmt = (
-                select(DraftPick)
-                .where(DraftPick.draft_id == draft_id, DraftPick.team_number == "-1")
-                .order_by(DraftPick.pick_number.asc())
-            )
-            result = await session.execute(stmt)
-            unmadepicks = result.scalars().all()
-            if len(unmadepicks) == 0:
-                return -1
-            else:
-                return unmadepicks[0].fantasy_team_id
-
-    async def getCurrentPickNumber(self, draft_id):
-        async with self.bot.async_session() as session:
-            stmt = (
-                select(DraftPick)
-                .where(DraftPick.draft_id == draft_id, DraftPick.team_number == "-1")
-                .order_by(DraftPick.pick_number.asc())
-            )
-            result = await session.execute(stmt)
-            unmadepicks = result.scalars().all()
-            if len(unmadepicks) == 0:
-                return -1
-            else:
-                return unmadepicks[0].pick_number
-
-    async def makeDraftPickTask(self, draft_id: int, team_number: str):
-        async with self.bot.async_session() as session:
-            stmt = (
-                select(DraftPick)
-                .where(DraftPick.draft_id == draft_id, DraftPick.team_number == "-1")
-                .order_by(DraftPick.pick_number.asc())
-            )
-            result = await session.execute(stmt)
-            pickToMake = result.scalars().first()
-            pickToMake.team_number = team_number
-            await session.commit()
+    async def cog_load(self):
+        self.bot.pickClock.start(self.onPickClockExpired)
+        await self.restorePickClocks()
 
-    async def teamIsUnpicked(self, draft_id: int, team_number: str):
-        async with self.bot.async_session() as session:
-            stmt = select(DraftPick).where(
-                DraftPick.draft_id == draft_id, DraftPick.team_number != "-1"
-            )
-            result = await session.execute(stmt)
-            picksMade = result.scalars().all()
-            teamsPicked = set()
-            teamsPicked.update([pick.team_number for pick in picksMade])
-            return team_number not in teamsPicked
+    async def cog_unload(self):
+        self.bot.pickClock.stop()
 
-    async def teamIsInDraft(
-        self, team_number: str, eventKey: str, year: int, isFiM: bool
-    ):
-        async with self.bot.async_session() as session:
-            # Query to get eligible teams based on whether it's FiM or not
-            if isFiM:
-                stmt = (
-                    select(Team.team_number)
-                    .distinct()
-                    .join(TeamScore, Team.team_number == TeamScore.team_key)
-                    .join(FRCEvent, TeamScore.event_key == FRCEvent.event_key)
-                    .where(Team.is_fim == isFiM, FRCEvent.year == year)
-                )
-            else:
-                stmt = (
-                    select(TeamScore.team_key)
-                    .distinct()
-                    .where(TeamScore.event_key == eventKey)
-                )
+    async def getCurrentPickTeamId(self, draft_id):
+        state = await self.bot.draftStates.get(draft_id)
+        return state.currentFantasyTeamId()
 
-            # Execute the query and get the result
-            result = await session.execute(stmt)
-            teams = result.scalars().all()
-
-            # Update the set of eligible teams and check if the given team is in the list
-            teamsEligible = {team for team in teams}
-            return team_number in teamsEligible
-
-    async def getSuggestedTeamsList(
-        self,
-        eventKey: str,
-        year: int,
-        isFiM: bool,
-        draft_id: int,
-        isOffseason: bool = False,
+    @serialized(draftOf)
+    async def makeDraftPickTask(
+        self, draft_id: int, pick_number: int, fantasy_team_id: int, team_number: str
     ):
-        async with self.bot.async_session() as session:
-            # Subquery for picked teams
-            picked_subq = (
-                select(DraftPick.team_number)
-                .where(DraftPick.draft_id == draft_id, DraftPick.team_number != "-1")
-                .scalar_subquery()
+        """Commit ``pick_number`` for ``fantasy_team_id`` with a conditional UPDATE.
+
+        The caller passes the pick it validated; once the draft lock is held
+        the turn and the team are checked again. Raises DraftPickConflict,
+        after reloading the draft state when the database disagrees, if that
+        pick was already made or the team was already taken.
+        """
+        state = await self.bot.draftStates.get(draft_id)
+        if (
+            state.currentPickNumber() != pick_number
+            or state.currentFantasyTeamId() != fantasy_team_id
+        ):
+            raise DraftPickConflict(
+                f"Pick {pick_number} was already made. Please try again."
             )
-
-            # Base query for Team and StatboticsData
-            if isFiM:
-                stmt = (
-                    select(Team.team_number, StatboticsData.year_end_epa)
-                    .distinct()
-                    .join(TeamScore, Team.team_number == TeamScore.team_key)
-                    .join(FRCEvent, TeamScore.event_key == FRCEvent.event_key)
-                    .join(
-                        StatboticsData, Team.team_number == StatboticsData.team_number
-                    )
+        if not state.isUnpicked(team_number):
+            raise DraftPickConflict(
+                f"Team {team_number} has already been picked. Please try again."
+            )
+        async with self.bot.async_session() as session:
+            try:
+                result = await session.execute(
+                    update(DraftPick)
                     .where(
-                        Team.is_fim == isFiM,
-                        FRCEvent.year == year,
-                        StatboticsData.year == year - 1,
-                        Team.team_number.notin_(picked_subq),
+                        DraftPick.draft_id == draft_id,
+                        DraftPick.pick_number == pick_number,
+                        DraftPick.fantasy_team_id == fantasy_team_id,
+                        DraftPick.team_number == "-1",
                     )
+                    .values(team_number=team_number)
                 )
-            elif not isOffseason:
-                stmt = (
-                    select(TeamScore.team_key, StatboticsData.year_end_epa)
-                    .distinct()
-                    .join(
-                        StatboticsData, TeamScore.team_key == StatboticsData.team_number
+                if result.rowcount != 1:
+                    await session.rollback()
+                    await self.bot.draftStates.reload(draft_id)
+                    raise DraftPickConflict(
+                        f"Pick {pick_number} was already made. Please try again."
                     )
+                await session.execute(
+                    update(DraftPool)
                     .where(
-                        TeamScore.event_key == eventKey,
-                        StatboticsData.year == year - 1,
-                        TeamScore.team_key.notin_(picked_subq),
+                        DraftPool.draft_id == draft_id,
+                        DraftPool.team_number == team_number,
                     )
+                    .values(is_picked=True)
                 )
-            else:
-                stmt = (
-                    select(TeamScore.team_key, StatboticsData.year_end_epa)
-                    .distinct()
-                    .join(
-                        StatboticsData, TeamScore.team_key == StatboticsData.team_number
-                    )
-                    .where(
-                        TeamScore.event_key == eventKey,
-                        StatboticsData.year == year,
-                        TeamScore.team_key.notin_(picked_subq),
-                    )
+                await session.commit()
+            except IntegrityError:
+                await session.rollback()
+                await self.bot.draftStates.reload(draft_id)
+                raise DraftPickConflict(
+                    f"Team {team_number} has already been picked. Please try again."
                 )
-
-            # Order by year_end_epa descending
-            stmt = stmt.order_by(StatboticsData.year_end_epa.desc())
-
-            # Execute the query
-            result = await session.execute(stmt)
-            return result.all()
+        state.recordPick(pick_number, team_number)
 
     async def getAllAvailableTeamsList(
-        self, eventKey: str, year: int, isFiM: bool, draft_id: int
+        self, draft_id: int, after: str = None, limit: int = None
     ):
+        """Unpicked teams in numeric order, optionally the page after ``after``."""
         async with self.bot.async_session() as session:
-            # Subquery for picked teams
-            picked_subq = (
-                select(DraftPick.team_number)
-                .where(DraftPick.draft_id == draft_id, DraftPick.team_number != "-1")
-                .scalar_subquery()
+            stmt = (
+                select(DraftPool.team_number, DraftPool.team_number_int)
+                .where(DraftPool.draft_id == draft_id, DraftPool.is_picked.is_(False))
+                .order_by(DraftPool.team_number_int, DraftPool.team_number)
             )
-
-            if isFiM:
-                # Query for FiM teams
-                stmt = (
-                    select(
-                        Team.team_number,
-                        Team.team_number.cast(Integer).label("team_number_int"),
-                    )
-                    .distinct()
-                    .join(TeamScore, Team.team_number == TeamScore.team_key)
-                    .join(FRCEvent, TeamScore.event_key == FRCEvent.event_key)
-                    .where(
-                        Team.is_fim == isFiM,
-                        FRCEvent.year == year,
-                        Team.team_number.notin_(picked_subq),
-                    )
+            if after is not None:
+                stmt = stmt.where(
+                    tuple_(DraftPool.team_number_int, DraftPool.team_number)
+                    > tuple_(team_number_sort_key(after), after)
                 )
-            else:
-                # Query for non-FiM teams
-                stmt = (
-                    select(
-                        TeamScore.team_key,
-                        TeamScore.team_key.cast(Integer).label("team_number_int"),
-                    )
-                    .distinct()
-                    .where(
-                        TeamScore.event_key == eventKey,
-                        TeamScore.team_key.notin_(picked_subq),
-                    )
-                )
-
-            # Order by team number (cast to int for sorting)
-            stmt = stmt.order_by("team_number_int")
-
-            # Execute the query and get the result
+            if limit is not None:
+                stmt = stmt.limit(limit)
             result = await session.execute(stmt)
             return result.all()
 
@@ -285,27 +178,16 @@ class Drafting(commands.Cog):
         if draft is None:
             await message.edit(content="No draft associated with this channel.")
             return
-        league: League = await self.getLeague(draft_id=draft.draft_id)
-        suggestedTeams = await self.getSuggestedTeamsList(
-            eventKey=draft.event_key,
-            year=league.year,
-            isFiM=league.is_fim,
-            draft_id=draft.draft_id,
-            isOffseason=league.offseason,
-        )
-        yearToSuggest = league.year if league.offseason else league.year - 1
+        state = await self.bot.draftStates.get(draft.draft_id)
+        suggestedTeams = state.bestAvailable(10)
+        yearToSuggest = state.year if state.offseason else state.year - 1
         embed = Embed(
             title="**Suggested teams (autodraft)**",
-            description=f"```{'Team':>10s}{f'{yearToSuggest} EPA':>12s}\n",
+            description=f"```{'Team':>10s}{f'{yearToSuggest} EPA':>12s}{'Proj Pts':>10s}\n",
         )
-        teamsRemaining = len(suggestedTeams)
-        teamsToReport = 10
-        if teamsRemaining < 10:
-            teamsToReport = teamsRemaining
-        for k in range(teamsToReport):
-            embed.description += (
-                f"{suggestedTeams[k][0]:>10s}{suggestedTeams[k][1]:>12d}\n"
-            )
+        for team_number, epa, projected in suggestedTeams:
+            epaText = "---" if epa is None else str(epa)
+            embed.description += f"{team_number:>10s}{epaText:>12s}{projected:>10.1f}\n"
         embed.description += "```"
         await message.edit(embed=embed)
 
@@ -328,24 +210,9 @@ class Drafting(commands.Cog):
     async def getFantasyTeamIdFromDraftInteraction(
         self, interaction: discord.Interaction
     ):
-        async with self.bot.async_session() as session:
-            stmt = (
-                select(FantasyTeam)
-                .join(
-                    PlayerAuthorized,
-                    FantasyTeam.fantasy_team_id == PlayerAuthorized.fantasy_team_id,
-                )
-                .join(League, FantasyTeam.league_id == League.league_id)
-                .join(Draft, League.league_id == Draft.league_id)
-                .where(PlayerAuthorized.player_id == str(interaction.user.id))
-                .where(Draft.discord_channel == str(interaction.channel_id))
-            )
-            result = await session.execute(stmt)
-            team = result.scalars().first()
-            if team:
-                return team.fantasy_team_id
-            else:
-                return None
+        return await self.bot.getUserFantasyTeamId(
+            interaction.user.id, interaction.channel_id, leagues=False
+        )
 
     async def getLeague(self, draft_id):
         draft: Draft = await self.getDraft(draft_id)
@@ -357,20 +224,6 @@ class Drafting(commands.Cog):
             league = result.scalars().first()
             return league
 
-    async def getCurrentPickTeamId(self, draft_id):
-        async with self.bot.async_session() as session:
-            stmt = (
-                select(DraftPick)
-                .where(DraftPick.draft_id == draft_id, DraftPick.team_number == "-1")
-                .order_by(DraftPick.pick_number.asc())
-            )
-            result = await session.execute(stmt)
-            unmadepicks = result.scalars().all()
-            if len(unmadepicks) == 0:
-                return -1
-            else:
-                return unmadepicks[0].fantasy_team_id
-
     async def makeDraftPickHandler(
         self, interaction: discord.Interaction, team_number: str, force: bool
     ):
@@ -378,118 +231,131 @@ class Drafting(commands.Cog):
         draft: Draft = await self.getDraftFromChannel(interaction=interaction)
         if draft is None:
             await message.edit(content="Invalid draft channel")
+            return
         draft_id = draft.draft_id
-        currentPickId = await self.getCurrentPickTeamId(draft_id)
-        league: League = await self.getLeague(draft_id)
-        userFantasyTeamId = await self.getFantasyTeamIdFromDraftInteraction(interaction)
-        if currentPickId == -1:
+        state = await self.bot.draftStates.get(draft_id)
+        userFantasyTeamId = None
+        if not force:
+            userFantasyTeamId = await self.getFantasyTeamIdFromDraftInteraction(
+                interaction
+            )
+        # the pick validated here is the only one makeDraftPickTask will make
+        pick_number = state.currentPickNumber()
+        pickingTeamId = state.currentFantasyTeamId()
+        if state.isComplete():
             await message.edit(content="Draft is complete! Invalid command.")
-        elif force or currentPickId == userFantasyTeamId:
-            if await self.teamIsUnpicked(draft_id=draft_id, team_number=team_number):
-                if await self.teamIsInDraft(
-                    team_number=team_number,
-                    eventKey=draft.event_key,
-                    year=league.year,
-                    isFiM=league.is_fim,
-                ):
+        elif force or pickingTeamId == userFantasyTeamId:
+            if not state.isUnpicked(team_number):
+                await message.edit(
+                    content=f"Team {team_number} has already been picked. Please try again."
+                )
+            elif not state.isEligible(team_number):
+                await message.edit(
+                    content=f"Team {team_number} is not able to be drafted in this draft."
+                )
+            else:
+                try:
                     await self.makeDraftPickTask(
-                        draft_id=draft_id, team_number=team_number
+                        draft_id=draft_id,
+                        pick_number=pick_number,
+                        fantasy_team_id=pickingTeamId,
+                        team_number=team_number,
                     )
                     await message.channel.send(
                         content=f"Team {team_number} has been successfully selected!"
                     )
-                else:
-                    await message.edit(
-                        content=f"Team {team_number} is not able to be drafted in this draft."
-                    )
-            else:
-                await message.edit(
-                    content=f"Team {team_number} has already been picked. Please try again."
-                )
+                except DraftPickConflict as e:
+                    await message.edit(content=str(e))
+                    return
             # await self.postDraftBoard(interaction)
             await message.channel.send(
                 content=f"https://fantasyfim.com/drafts/{draft_id}"
             )
             await self.postSuggestedTeams(interaction)
-            await self.notifyNextPick(interaction, draft_id=draft_id)
-            if await self.getCurrentPickTeamId(draft_id=draft_id) == "-1":
+            await self.notifyNextPick(interaction.channel, draft_id=draft_id)
+            if state.isComplete():
                 await interaction.channel.edit(archived=True, locked=True)
         else:
             await message.edit(content="It is not your turn to pick!")
 
-    async def postDraftBoard(self, interaction: discord.Interaction):
+    async def getDraftBoardPages(
+        self, draft_id, rounds_per_page=DRAFT_BOARD_ROUNDS_PER_PAGE
+    ):
+        state = await self.bot.draftStates.get(draft_id)
+        cached = draftBoardCache.get(draft_id)
+        if cached is not None and cached[0] is state and cached[1] == state.picksMade:
+            return cached[2]
         async with self.bot.async_session() as session:
-            draft: Draft = await self.getDraftFromChannel(interaction=interaction)
-            if draft is None:
-                ogresponse = await interaction.original_response()
-                await ogresponse.edit(content="No draft associated with this channel.")
-                return
-            draft_id = draft.draft_id
             stmt = (
-                select(DraftOrder)
+                select(
+                    DraftOrder.draft_slot,
+                    FantasyTeam.fantasy_team_name,
+                    DraftPick.pick_number,
+                    DraftPick.team_number,
+                )
+                .join(
+                    FantasyTeam,
+                    FantasyTeam.fantasy_team_id == DraftOrder.fantasy_team_id,
+                )
+                .outerjoin(
+                    DraftPick,
+                    (DraftPick.draft_id == DraftOrder.draft_id)
+                    & (DraftPick.fantasy_team_id == DraftOrder.fantasy_team_id),
+                )
                 .where(DraftOrder.draft_id == draft_id)
-                .order_by(DraftOrder.draft_slot.asc())
+                .order_by(DraftOrder.draft_slot.asc(), DraftPick.pick_number.asc())
             )
             result = await session.execute(stmt)
-            draftOrder = result.scalars().all()
-            total_rounds = draft.rounds
-            rounds_per_page = 4
-            total_pages = ceil(total_rounds / rounds_per_page)
-            currentPick = await self.getCurrentPickNumber(draft_id=draft_id)
-            currentPage = int((currentPick - 1) / (rounds_per_page * len(draftOrder)))
-            if currentPage >= total_pages:
-                currentPage = total_pages - 1
-            draftBoardEmbed = await self.createDraftBoardEmbed(
-                session, draftOrder, draft, currentPage, total_pages, rounds_per_page
-            )
-            view = self.DraftPaginationView(
-                self.bot,
-                interaction,
-                session,
-                draftOrder,
-                draft,
-                rounds_per_page,
+            boardRows = result.all()
+        # draft slot -> (fantasy team name, [(pick number, team number)])
+        board = {}
+        for draft_slot, team_name, pick_number, team_number in boardRows:
+            _, picks = board.setdefault(draft_slot, (team_name, []))
+            if pick_number is not None:
+                picks.append((pick_number, team_number))
+        total_pages = max(ceil(state.rounds / rounds_per_page), 1)
+        pages = [
+            self.createDraftBoardEmbed(
+                board,
+                state.rounds,
+                state.currentPickNumber(),
+                k,
                 total_pages,
+                rounds_per_page,
             )
-            await interaction.channel.send(embed=draftBoardEmbed, view=view)
+            for k in range(total_pages)
+        ]
+        draftBoardCache[draft_id] = (state, state.picksMade, pages)
+        return pages
 
-    async def postFullDraftBoard(self, interaction: discord.Interaction):
-        async with self.bot.async_session() as session:
-            draft: Draft = await self.getDraftFromChannel(interaction=interaction)
-            if draft is None:
-                ogresponse = await interaction.original_response()
-                await ogresponse.edit(content="No draft associated with this channel.")
-                return
-            draft_id = draft.draft_id
-            stmt = (
-                select(DraftOrder)
-                .where(DraftOrder.draft_id == draft_id)
-                .order_by(DraftOrder.draft_slot.asc())
-            )
-            result = await session.execute(stmt)
-            draftOrder = result.scalars().all()
-            total_rounds = draft.rounds
-            rounds_per_page = 4
-            total_pages = ceil(total_rounds / rounds_per_page)
-            for k in range(total_pages):
-                draftBoardEmbed = await self.createDraftBoardEmbed(
-                    session, draftOrder, draft, k, total_pages, rounds_per_page
-                )
-                view = self.DraftPaginationView(
-                    self.bot,
-                    interaction,
-                    session,
-                    draftOrder,
-                    draft,
-                    rounds_per_page,
-                    total_pages,
-                )
-                await interaction.channel.send(embed=draftBoardEmbed, view=view)
+    async def postDraftBoard(self, interaction: discord.Interaction):
+        draft: Draft = await self.getDraftFromChannel(interaction=interaction)
+        if draft is None:
+            ogresponse = await interaction.original_response()
+            await ogresponse.edit(content="No draft associated with this channel.")
+            return
+        pages = await self.getDraftBoardPages(draft.draft_id)
+        state = await self.bot.draftStates.get(draft.draft_id)
+        teamsInDraft = max(len(state.picks) // max(state.rounds, 1), 1)
+        currentPick = state.currentPickNumber()
+        currentPage = int(
+            (currentPick - 1) / (DRAFT_BOARD_ROUNDS_PER_PAGE * teamsInDraft)
+        )
+        currentPage = min(max(currentPage, 0), len(pages) - 1)
+        view = self.DraftPaginationView(pages, currentPage)
+        view.message = await interaction.channel.send(
+            embed=pages[currentPage], view=view
+        )
 
-    async def createDraftBoardEmbed(
-        self, session, draftOrder, draft, current_page, total_pages, rounds_per_page
+    async def postFullDraftBoard(self, channel, draft_id):
+        pages = await self.getDraftBoardPages(draft_id)
+        for k, page in enumerate(pages):
+            view = self.DraftPaginationView(pages, k)
+            view.message = await channel.send(embed=page, view=view)
+
+    def createDraftBoardEmbed(
+        self, board, rounds, currentPick, current_page, total_pages, rounds_per_page
     ):
-        draft_id = draft.draft_id
         draftBoardEmbed = Embed(
             title=f"**Draft Board - Page {current_page+1}/{total_pages}**",
             description="```",
@@ -497,76 +363,49 @@ class Drafting(commands.Cog):
         header = f"{'Team':^15s}{'':3s}"
         for round_num in range(
             1 + current_page * rounds_per_page,
-            min((current_page + 1) * rounds_per_page, draft.rounds) + 1,
+            min((current_page + 1) * rounds_per_page, rounds) + 1,
         ):
             header += f"{'Pick ' + str(round_num):>7s}{'':2s}"
         draftBoardEmbed.description += header + "\n"
-        for draftSlot in draftOrder:
-            stmt = select(FantasyTeam).where(
-                FantasyTeam.fantasy_team_id == draftSlot.fantasy_team_id
-            )
-            result = await session.execute(stmt)
-            fantasyteam = result.scalars().first()
-
-            stmt = (
-                select(DraftPick)
-                .where(DraftPick.fantasy_team_id == draftSlot.fantasy_team_id)
-                .where(
-                    DraftPick.pick_number
-                    > current_page * rounds_per_page * len(draftOrder)
-                )
-                .where(
-                    DraftPick.pick_number
-                    <= (current_page + 1) * rounds_per_page * len(draftOrder)
-                )
-                .where(DraftPick.draft_id == draft_id)
-                .order_by(DraftPick.pick_number.asc())
-            )
-            result = await session.execute(stmt)
-            draftPicks = result.scalars().all()
-
-            abbrevName = fantasyteam.fantasy_team_name[
-                :15
-            ]  # Limit team name to 15 characters
+        firstPick = current_page * rounds_per_page * len(board)
+        lastPick = (current_page + 1) * rounds_per_page * len(board)
+        for draft_slot in sorted(board):
+            team_name, draftPicks = board[draft_slot]
+            abbrevName = team_name[:15]  # Limit team name to 15 characters
             draftBoardEmbed.description += f"{abbrevName:<15s}{'':3s}"
-            for pick in draftPicks:
+            for pick_number, team_number in draftPicks:
+                if not firstPick < pick_number <= lastPick:
+                    continue
                 pickToAdd = "---"
-                if pick.team_number == "-1" and (
-                    (await self.getCurrentPickNumber(draft_id=draft_id))
-                    == pick.pick_number
-                ):
+                if team_number == "-1" and currentPick == pick_number:
                     pickToAdd = "!PICK!"
-                elif not pick.team_number == "-1":
-                    pickToAdd = pick.team_number
+                elif not team_number == "-1":
+                    pickToAdd = team_number
                 draftBoardEmbed.description += f"{pickToAdd:>7s}{'':2s}"
             draftBoardEmbed.description += "\n"
         draftBoardEmbed.description += "```"
         return draftBoardEmbed
 
     async def postAllAvailableTeams(self, interaction: discord.Interaction):
-        teamcount = 0
         draft: Draft = await self.getDraftFromChannel(interaction)
-        league: League = await self.getLeague(draft.draft_id)
-        allavailableteams = await self.getAllAvailableTeamsList(
-            draft.event_key, league.year, league.is_fim, draft.draft_id
-        )
-        # logger.info(allavailableteams)
-        embed = None
-        totalteams = len(allavailableteams)
-        while teamcount < totalteams:
-            if teamcount % 168 == 0:
-                if not embed is None:
-                    embed.description += "```"
-                    await interaction.channel.send(embed=embed)
-                embed = Embed(description="```")
-            teamnumber = allavailableteams[teamcount][0]
-            embed.description += f"{teamnumber:>7s}"
-            teamcount += 1
-            if teamcount % 8 == 0:
-                embed.description += "\n"
-        if not embed is None:
+        after = None
+        while True:
+            # one embed per page, fetched with keyset pagination
+            page = await self.getAllAvailableTeamsList(
+                draft.draft_id, after, AVAILABLE_TEAMS_PER_EMBED
+            )
+            if not page:
+                break
+            embed = Embed(description="```")
+            for teamcount, (teamnumber, _) in enumerate(page, start=1):
+                embed.description += f"{teamnumber:>7s}"
+                if teamcount % 8 == 0:
+                    embed.description += "\n"
             embed.description += "```"
             await interaction.channel.send(embed=embed)
+            if len(page) < AVAILABLE_TEAMS_PER_EMBED:
+                break
+            after = page[-1][0]
 
     # embed = Embed(description="```")
 
@@ -609,14 +448,15 @@ class Drafting(commands.Cog):
                 waiverPriority += 1
             await session.commit()
 
-    async def notifyNextPick(self, interaction: discord.Interaction, draft_id):
+    async def notifyNextPick(self, channel, draft_id):
         async with self.bot.async_session() as session:
             teamIdToPick = await self.getCurrentPickTeamId(draft_id=draft_id)
             msg = ""
             if teamIdToPick == -1:
                 msg += "Draft is complete!"
+                await self.stopPickClock(draft_id)
                 await self.finishDraft(draft_id=draft_id)
-                await self.postFullDraftBoard(interaction=interaction)
+                await self.postFullDraftBoard(channel, draft_id)
             else:
                 stmt = select(PlayerAuthorized).where(
                     PlayerAuthorized.fantasy_team_id == teamIdToPick
@@ -635,7 +475,118 @@ class Drafting(commands.Cog):
                 msg += (
                     f" **({teamToNotify.fantasy_team_name})** it is your turn to pick!"
                 )
-            await interaction.channel.send(msg)
+                deadline = await self.startPickClock(draft_id)
+                if deadline is not None:
+                    msg += f" Pick clock expires <t:{int(deadline.timestamp())}:R>."
+            await channel.send(msg)
+
+    async def startPickClock(self, draft_id):
+        """Start the clock for the current pick if the draft has one.
+
+        Returns the deadline, leaving an already running clock for the same
+        pick untouched so failed pick attempts do not reset it.
+        """
+        state = await self.bot.draftStates.get(draft_id)
+        pick_number = state.currentPickNumber()
+        async with self.bot.async_session() as session:
+            stmt = select(DraftClock).where(DraftClock.draft_id == draft_id)
+            result = await session.execute(stmt)
+            clock: DraftClock = result.scalars().first()
+            if clock is None or pick_number == -1:
+                return None
+            if clock.pick_number == pick_number and clock.deadline is not None:
+                deadline = clock.deadline
+            else:
+                deadline = datetime.now() + timedelta(seconds=clock.seconds_per_pick)
+                clock.pick_number = pick_number
+                clock.deadline = deadline
+                await session.commit()
+        self.bot.pickClock.schedule(draft_id, pick_number, deadline)
+        return deadline
+
+    async def stopPickClock(self, draft_id):
+        self.bot.pickClock.cancel(draft_id)
+        async with self.bot.async_session() as session:
+            await session.execute(
+                update(DraftClock)
+                .where(DraftClock.draft_id == draft_id)
+                .values(pick_number=None, deadline=None)
+            )
+            await session.commit()
+
+    async def setPickClock(self, draft_id, seconds: int):
+        async with self.bot.async_session() as session:
+            stmt = select(DraftClock).where(DraftClock.draft_id == draft_id)
+            result = await session.execute(stmt)
+            clock: DraftClock = result.scalars().first()
+            if seconds <= 0:
+                if clock is not None:
+                    await session.delete(clock)
+                    await session.commit()
+                self.bot.pickClock.cancel(draft_id)
+                return None
+            if clock is None:
+                clock = DraftClock(draft_id=draft_id, seconds_per_pick=seconds)
+                session.add(clock)
+            else:
+                clock.seconds_per_pick = seconds
+                clock.pick_number = None
+                clock.deadline = None
+            await session.commit()
+        return await self.startPickClock(draft_id)
+
+    async def restorePickClocks(self):
+        async with self.bot.async_session() as session:
+            stmt = select(DraftClock).where(DraftClock.deadline.is_not(None))
+            result = await session.execute(stmt)
+            clocks = result.scalars().all()
+        for clock in clocks:
+            # deadlines that passed while the bot was down fire right away
+            self.bot.pickClock.schedule(
+                clock.draft_id, clock.pick_number, clock.deadline
+            )
+        logger.info(f"Restored {len(clocks)} pick clocks")
+
+    async def onPickClockExpired(self, draft_id, pick_number):
+        await self.bot.wait_until_ready()
+        # expiries run in their own task outside any interaction; share one
+        # session across the pick, the notification and finishing the draft
+        self.bot.async_session.bindTask()
+        state = await self.bot.draftStates.get(draft_id)
+        if state is None or state.currentPickNumber() != pick_number:
+            return
+        fantasyTeamId = state.currentFantasyTeamId()
+        channel = self.bot.get_channel(
+            int(state.discord_channel)
+        ) or await self.bot.fetch_channel(int(state.discord_channel))
+        team_number = state.autoPickTeam(fantasyTeamId)
+        if team_number is None:
+            await channel.send("Pick clock expired, but no teams are left to draft.")
+            return
+        try:
+            await self.makeDraftPickTask(
+                draft_id=draft_id,
+                pick_number=pick_number,
+                fantasy_team_id=fantasyTeamId,
+                team_number=team_number,
+            )
+        except DraftPickConflict:
+            # someone picked as the clock ran out; the state has been reloaded
+            await self.startPickClock(draft_id)
+            return
+        async with self.bot.async_session() as session:
+            stmt = select(FantasyTeam).where(
+                FantasyTeam.fantasy_team_id == fantasyTeamId
+            )
+            result = await session.execute(stmt)
+            fantasyTeam = result.scalars().first()
+        await channel.send(
+            content=f"Pick clock expired for **{fantasyTeam.fantasy_team_name}**. Team {team_number} has been auto-drafted!"
+        )
+        await channel.send(content=f"https://fantasyfim.com/drafts/{draft_id}")
+        await self.notifyNextPick(channel, draft_id=draft_id)
+        if state.isComplete():
+            await channel.edit(archived=True, locked=True)
 
     async def postTeamDraftBoard(
         self, interaction: discord.Interaction, team_id, draft_id
@@ -702,37 +653,142 @@ class Drafting(commands.Cog):
             interaction=interaction, team_number=team_number, force=False
         )
 
+    @make_pick.autocomplete("team_number")
+    async def makePickAutocomplete(
+        self, interaction: discord.Interaction, current: str
+    ):
+        return await self.bot.teamAutocomplete.complete(interaction, current, "draft")
+
     @app_commands.command(
         name="autodraft",
-        description="Automatically draft the highest EPA team currently available.",
+        description="Draft the first available team in your queue, or the top projected team.",
     )
     async def auto_draft(self, interaction: discord.Interaction):
         await interaction.response.send_message(
-            "Attempting to auto-draft the highest EPA team.", ephemeral=True
+            "Attempting to auto-draft.", ephemeral=True
         )
         draft: Draft = await self.getDraftFromChannel(interaction=interaction)
         message = await interaction.original_response()
         if draft is None:
             await message.edit(content="No draft associated with this channel.")
             return
-        league: League = await self.getLeague(draft_id=draft.draft_id)
-        suggestedTeams = await self.getSuggestedTeamsList(
-            eventKey=draft.event_key,
-            year=league.year,
-            isFiM=league.is_fim,
-            draft_id=draft.draft_id,
-            isOffseason=league.offseason,
-        )
-        if len(suggestedTeams) == 0:
+        state = await self.bot.draftStates.get(draft.draft_id)
+        best_team = state.autoPickTeam(state.currentFantasyTeamId())
+        if best_team is None:
             await message.edit(content="No available teams left to draft.")
             return
 
-        best_team = suggestedTeams[0][0]
         await message.edit(content=f"Auto-drafting team {best_team}.")
         await self.makeDraftPickHandler(
             interaction=interaction, team_number=best_team, force=False
         )
 
+    async def setDraftQueueTask(
+        self, interaction: discord.Interaction, draft_id, fantasyTeamId, teams
+    ):
+        message = await interaction.original_response()
+        state = await self.bot.draftStates.get(draft_id)
+        queue = []
+        skipped = []
+        for team_number in teams:
+            if (
+                state.isEligible(team_number)
+                and state.isUnpicked(team_number)
+                and team_number not in queue
+            ):
+                queue.append(team_number)
+            else:
+                skipped.append(team_number)
+        async with self.bot.async_session() as session:
+            await session.execute(
+                delete(DraftQueue).where(
+                    DraftQueue.draft_id == draft_id,
+                    DraftQueue.fantasy_team_id == fantasyTeamId,
+                )
+            )
+            session.add_all(
+                [
+                    DraftQueue(
+                        draft_id=draft_id,
+                        fantasy_team_id=fantasyTeamId,
+                        position=position,
+                        team_number=team_number,
+                    )
+                    for position, team_number in enumerate(queue, start=1)
+                ]
+            )
+            await session.commit()
+        state.setQueue(fantasyTeamId, queue)
+        content = f"Saved a queue of {len(queue)} teams."
+        if skipped:
+            content += f" Skipped unavailable or duplicate teams: {', '.join(skipped)}"
+        await message.edit(content=content[:2000])
+
+    @app_commands.command(
+        name="queue",
+        description="Set your ranked autopick queue for this draft (comma separated team numbers)",
+    )
+    async def setDraftQueue(self, interaction: discord.Interaction, teams: str):
+        await interaction.response.send_message("Saving draft queue", ephemeral=True)
+        message = await interaction.original_response()
+        draft: Draft = await self.getDraftFromChannel(interaction=interaction)
+        if draft is None:
+            await message.edit(content="No draft associated with this channel.")
+            return
+        teamId = await self.getFantasyTeamIdFromDraftInteraction(interaction)
+        if teamId is None:
+            await message.edit(content="You are not part of any team in this draft!")
+            return
+        teamList = [
+            team.strip() for team in re.split(r"[,\s]+", teams) if team.strip()
+        ]
+        await self.setDraftQueueTask(interaction, draft.draft_id, teamId, teamList)
+
+    @app_commands.command(
+        name="myqueue", description="View your autopick queue for this draft"
+    )
+    async def viewDraftQueue(self, interaction: discord.Interaction):
+        await interaction.response.send_message("Fetching draft queue", ephemeral=True)
+        message = await interaction.original_response()
+        draft: Draft = await self.getDraftFromChannel(interaction=interaction)
+        if draft is None:
+            await message.edit(content="No draft associated with this channel.")
+            return
+        teamId = await self.getFantasyTeamIdFromDraftInteraction(interaction)
+        if teamId is None:
+            await message.edit(content="You are not part of any team in this draft!")
+            return
+        state = await self.bot.draftStates.get(draft.draft_id)
+        queue = state.getQueue(teamId)
+        if not queue:
+            await message.edit(
+                content="Your queue is empty, autopicks will use the best available EPA."
+            )
+            return
+        embed = Embed(title="**Your draft queue**", description="```")
+        for position, team_number in enumerate(queue[:50], start=1):
+            embed.description += f"{position:>4d}. {team_number}\n"
+        if len(queue) > 50:
+            embed.description += f"... and {len(queue) - 50} more\n"
+        embed.description += "```"
+        await message.edit(content="", embed=embed)
+
+    @app_commands.command(
+        name="clearqueue", description="Clear your autopick queue for this draft"
+    )
+    async def clearDraftQueue(self, interaction: discord.Interaction):
+        await interaction.response.send_message("Clearing draft queue", ephemeral=True)
+        message = await interaction.original_response()
+        draft: Draft = await self.getDraftFromChannel(interaction=interaction)
+        if draft is None:
+            await message.edit(content="No draft associated with this channel.")
+            return
+        teamId = await self.getFantasyTeamIdFromDraftInteraction(interaction)
+        if teamId is None:
+            await message.edit(content="You are not part of any team in this draft!")
+            return
+        await self.setDraftQueueTask(interaction, draft.draft_id, teamId, [])
+
     """@app_commands.command(name="draftboard", description="Re-post the Draft Board")
   @commands.cooldown(rate=1, per=60)
   async def repost_draft_board(self, interaction: discord.Interaction):
@@ -741,7 +797,7 @@ class Drafting(commands.Cog):
 
     @app_commands.command(
         name="suggest",
-        description="Provides a list of suggested teams based on the previous season's year-end EPA.",
+        description="Suggests teams by projected fantasy points from the previous season's EPA.",
     )
     @commands.cooldown(rate=1, per=60)
     async def suggestTenTeams(self, interaction: discord.Interaction):
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import os
 import random
@@ -5,7 +6,7 @@ import random
 import discord
 from discord import Embed, app_commands
 from discord.ext import commands
-from sqlalchemy import func, select
+from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
 from models.draft import Draft
@@ -18,6 +19,14 @@ from models.scores import (
 )
 from models.transactions import WaiverPriority
 from models.users import Player
+from utils.simulation import (
+    SIMULATIONS,
+    getCachedSimulation,
+    scoresSignatureQuery,
+    setCachedSimulation,
+    simulateLeagueRows,
+    simulationQueries,
+)
 
 logger = logging.getLogger("discord")
 websiteURL = os.getenv("WEBSITE_URL")
@@ -283,6 +292,43 @@ class General(commands.Cog):
                     content="No league associated with this channel!"
                 )
 
+    @app_commands.command(
+        name="playoffodds",
+        description="Simulates the rest of the season for the league in this channel",
+    )
+    async def playoffOdds(self, interaction: discord.Interaction):
+        await interaction.response.send_message("Simulating the rest of the season...")
+        message = await interaction.original_response()
+        async with self.bot.async_session() as session:
+            stmt = select(League).where(
+                League.is_fim,
+                League.active,
+                League.discord_channel == str(interaction.channel_id),
+            )
+            result = await session.execute(stmt)
+            league = result.scalars().first()
+            if league is None:
+                await message.edit(content="No league associated with this channel!")
+                return
+            result = await session.execute(scoresSignatureQuery(league.league_id))
+            signature = tuple(result.one())
+            results = getCachedSimulation(league.league_id, signature)
+            if results is None:
+                rows = {}
+                for name, stmt in simulationQueries(league).items():
+                    rows[name] = (await session.execute(stmt)).all()
+                results = await asyncio.to_thread(simulateLeagueRows, league, rows)
+                setCachedSimulation(league.league_id, signature, results)
+
+        embed = Embed(
+            title=f"Playoff Odds for {league.league_name} ({league.year})",
+            description=f"Based on {SIMULATIONS} simulated seasons\n```{'Team':<20s}{'Top 3':>7s}{'1st':>7s}{'Proj RP':>9s}\n",
+        )
+        for team in results:
+            embed.description += f"{team['fantasy_team_name'][:19]:<20s}{team['top3_odds']:>7.1%}{team['win_odds']:>7.1%}{team['projected_rank_points']:>9.1f}\n"
+        embed.description += "```"
+        await message.edit(content="", embed=embed)
+
     @app_commands.command(
         name="randomize", description="Randomly pick a team from a comma-separated list"
     )
@@ -367,13 +413,7 @@ class General(commands.Cog):
                 session.add(new_player)
                 await session.flush()
 
-            # Step 6: Create a new FantasyTeam for the user
-            stmt = select(func.max(FantasyTeam.fantasy_team_id))
-            result = await session.execute(stmt)
-            max_team_id = result.scalar()
-            new_team_id = max_team_id + 1 if max_team_id else 1
-
-            # Step 7: Check if the team name is unique in the league
+            # Step 6: Check if the team name is unique in the league
             if teamname:
                 stmt = select(FantasyTeam).where(
                     FantasyTeam.league_id == league.league_id,
@@ -387,8 +427,9 @@ class General(commands.Cog):
             # Use the provided team name or the player's Discord nickname if no valid team name is provided
             new_team_name = teamname if teamname else interaction.user.display_name
 
+            # Step 7: Create a new FantasyTeam for the user; the database
+            # assigns its id, so simultaneous joins cannot collide
             new_fantasy_team = FantasyTeam(
-                fantasy_team_id=new_team_id,
                 league_id=league.league_id,
                 fantasy_team_name=new_team_name,
             )
@@ -397,13 +438,15 @@ class General(commands.Cog):
             await session.flush()
             # Step 8: Link the player to the new FantasyTeam
             player_authorized = PlayerAuthorized(
-                player_id=str(interaction.user.id), fantasy_team_id=new_team_id
+                player_id=str(interaction.user.id),
+                fantasy_team_id=new_fantasy_team.fantasy_team_id,
             )
 
             session.add(player_authorized)
 
-            # Step 8: Commit changes and send a success message
+            # Step 9: Commit changes and send a success message
             await session.commit()
+            self.bot.invalidateUserTeams(interaction.user.id)
             await interaction.response.send_message(
                 f"Successfully joined the offseason draft with team '{new_team_name}' and team ID {new_fantasy_team.fantasy_team_id}!"
             )
@@ -5,9 +5,10 @@ from datetime import datetime, timedelta
 import discord
 from discord import Embed, app_commands
 from discord.ext import commands
-from sqlalchemy import delete, func, select
+from sqlalchemy import delete, select
 from sqlalchemy.orm import selectinload
 
+from cogs.notifications import queueNotification
 from models.draft import Draft
 from models.scores import (
     FantasyTeam,
@@ -28,11 +29,16 @@ from models.transactions import (
     WaiverPriority,
 )
 from models.users import Player
+from utils.lineup import (
+    STATESEXTRA,
+    STATESWEEK,
+    lineupQueries,
+    loadLineupContext,
+    optimizeLineupRows,
+)
+from utils.locks import fantasyTeamLeague, serialized
 
 logger = logging.getLogger("discord")
-STATESWEEK = 7
-STATESEXTRA = 1
-MAXSTARTS = 2
 
 
 class ManageTeam(commands.Cog):
@@ -108,44 +114,11 @@ class ManageTeam(commands.Cog):
             await message.edit(embed=teamBoardEmbed, content="")
 
     async def getFantasyTeamIdFromInteraction(self, interaction: discord.Interaction):
-        async with self.bot.async_session() as session:
-            stmt = select(League).where(
-                League.discord_channel == str(interaction.channel_id)
-            )
-            result = await session.execute(stmt)
-            league = result.scalars().first()
-
-            if league is None:
-                stmt = select(Draft).where(
-                    Draft.discord_channel == str(interaction.channel_id)
-                )
-                result = await session.execute(stmt)
-                draft = result.scalars().first()
-                if draft:
-                    stmt = select(League).where(League.league_id == draft.league_id)
-                    result = await session.execute(stmt)
-                    league = result.scalars().first()
-
-            if league is None:
-                return None
-
-            stmt = (
-                select(FantasyTeam)
-                .join(
-                    PlayerAuthorized,
-                    FantasyTeam.fantasy_team_id == PlayerAuthorized.fantasy_team_id,
-                )
-                .join(League, FantasyTeam.league_id == League.league_id)
-                .where(PlayerAuthorized.player_id == str(interaction.user.id))
-                .where(League.league_id == league.league_id)
-            )
-            result = await session.execute(stmt)
-            team = result.scalars().first()
-            if team:
-                return team.fantasy_team_id
-            else:
-                return None
+        return await self.bot.getUserFantasyTeamId(
+            interaction.user.id, interaction.channel_id
+        )
 
+    @serialized(fantasyTeamLeague)
     async def startTeamTask(
         self,
         interaction: discord.Interaction,
@@ -155,140 +128,29 @@ class ManageTeam(commands.Cog):
         update_response: bool = True,
     ):
         deferred = await interaction.original_response()
-        result_message = ""
         async with self.bot.async_session() as session:
-            stmt = select(FantasyTeam).where(FantasyTeam.fantasy_team_id == fantasyId)
-            result = await session.execute(stmt)
-            fantasyteam: FantasyTeam = result.scalars().first()
-
-            stmt = select(League).where(League.league_id == fantasyteam.league_id)
-            result = await session.execute(stmt)
-            league: League = result.scalars().first()
-            # is this a fim season long league?
-            if not league.is_fim:
-                result_message = "This league does not support starts/sits."
-                if update_response:
-                    await deferred.edit(content=result_message)
-                return result_message
-
-            # Check if lineups are locked for the given week in this league
-            stmt = select(WeekStatus).where(
-                WeekStatus.year == league.year, WeekStatus.week == week
-            )
-            result = await session.execute(stmt)
-            week_status = result.scalars().first()
-
-            if week_status and week_status.lineups_locked:
-                result_message = (
-                    "Lineups are locked for this week, you cannot modify your lineup at this time."
-                )
-                if update_response:
-                    await deferred.edit(content=result_message)
-                return result_message
-            if league.year == 2026 and week == 6:
-                result_message = (
-                    "Week 6 starts for 2026 are managed under week 5 only. Please try again using week 5."
-                )
-                if update_response:
-                    await deferred.edit(content=result_message)
-                return result_message
-            # do you own the team?
-            stmt = select(TeamOwned).where(
-                TeamOwned.team_key == frcteam,
-                TeamOwned.league_id == league.league_id,
-                TeamOwned.fantasy_team_id == fantasyId,
-            )
-            result = await session.execute(stmt)
-            teamowned = result.scalars().first()
-            if teamowned is None:
-                result_message = "You do not own this team."
-                if update_response:
-                    await deferred.edit(content=result_message)
-                return result_message
-
-            stmt = select(TeamStarted).where(
-                TeamStarted.fantasy_team_id == fantasyId, TeamStarted.week == week
-            )
-            result = await session.execute(stmt)
-            teamsStartedRecords = result.scalars().all()
-            teamsStartedCount = len(teamsStartedRecords)
-
-            if (league.team_starts <= teamsStartedCount and week < STATESWEEK) or (
-                league.team_starts + STATESEXTRA <= teamsStartedCount
-                and week == STATESWEEK
-            ):
-                result_message = "Already starting max number of teams this week."
-            else:
-                # get frc events in fim this week
-                event_weeks = [week]
-                # 2026 special case: for week 5 lineups, allow teams competing in week 6.
-                if league.year == 2026 and week == 5:
-                    event_weeks.append(6)
-
-                stmt = select(FRCEvent).where(
-                    FRCEvent.year == league.year,
-                    FRCEvent.week.in_(event_weeks),
-                    FRCEvent.is_fim,
-                )
-                result = await session.execute(stmt)
-                frcevents = result.scalars().all()
-                eventList = [event.event_key for event in frcevents]
-                # does team compete in fim this week?
-                stmt = select(TeamScore).where(
-                    TeamScore.team_key == frcteam, TeamScore.event_key.in_(eventList)
-                )
-                result = await session.execute(stmt)
-                teamcompeting = result.scalars().all()
-                # is your team already starting?
-                alreadyStarting = sum(
-                    1 for r in teamsStartedRecords if r.team_number == frcteam
-                )
-                # has your team been started twice this year already?
-                stmt = (
-                    select(func.count())
-                    .select_from(TeamStarted)
-                    .where(
-                        TeamStarted.league_id == league.league_id,
-                        TeamStarted.team_number == frcteam,
-                        TeamStarted.week < STATESWEEK,
-                    )
-                )
-                result = await session.execute(stmt)
-                teamStartedCount = result.scalar()
-
-                if len(teamcompeting) == 0:
-                    result_message = "This team is not competing this week!"
-                elif len(teamcompeting) > 1:
-                    result_message = (
-                        "Please contact a fantasy admin to start your team. They are competing at multiple FiM events this week which is a special case."
-                    )
-                elif alreadyStarting > 0:
-                    result_message = "This team is already starting this week!"
-                elif not week == STATESWEEK and teamStartedCount >= MAXSTARTS:
-                    result_message = f"This team may not be started again until States, they have reached the maximum of {MAXSTARTS}"
-                else:
-                    eventkey = teamcompeting[0].event_key
-                    stmt = select(FRCEvent).where(FRCEvent.event_key == eventkey)
-                    result = await session.execute(stmt)
-                    frcevent: FRCEvent = result.scalars().first()
-                    teamStartedToAdd = TeamStarted(
-                        fantasy_team_id=fantasyId,
-                        team_number=frcteam,
-                        league_id=league.league_id,
-                        event_key=eventkey,
-                        week=week,
+            context = await loadLineupContext(session, fantasyId, week)
+            result_message = context.lineupError()
+            if result_message is None:
+                result_message, eventkey = context.startTeam(frcteam)
+                if eventkey is not None:
+                    session.add(
+                        TeamStarted(
+                            fantasy_team_id=fantasyId,
+                            team_number=frcteam,
+                            league_id=context.league.league_id,
+                            event_key=eventkey,
+                            week=week,
+                        )
                     )
-                    session.add(teamStartedToAdd)
                     await session.commit()
-                    result_message = (
-                        f"{fantasyteam.fantasy_team_name} is starting team {frcteam} competing at {frcevent.event_name} in week {week}!"
-                    )
 
-            if update_response:
-                await deferred.edit(content=result_message)
+        if update_response:
+            await deferred.edit(content=result_message)
 
-            return result_message
+        return result_message
 
+    @serialized(fantasyTeamLeague)
     async def sitTeamTask(
         self, interaction: discord.Interaction, frcteam: str, week: int, fantasyId: int
     ):
@@ -353,6 +215,7 @@ class ManageTeam(commands.Cog):
                     content=f"{fantasyteam.fantasy_team_name} is sitting team {frcteam} competing at {event_name} in week {week}."
                 )
 
+    @serialized(fantasyTeamLeague)
     async def setLineupTask(
         self,
         interaction: discord.Interaction,
@@ -362,52 +225,39 @@ class ManageTeam(commands.Cog):
     ):
         deferred = await interaction.original_response()
         async with self.bot.async_session() as session:
-            stmt = select(FantasyTeam).where(FantasyTeam.fantasy_team_id == fantasyId)
-            result = await session.execute(stmt)
-            fantasyteam: FantasyTeam = result.scalars().first()
-
-            stmt = select(League).where(League.league_id == fantasyteam.league_id)
-            result = await session.execute(stmt)
-            league: League = result.scalars().first()
-            # is this a fim season long league?
-            if not league.is_fim:
-                await deferred.edit(content="This league does not support starts/sits.")
+            context = await loadLineupContext(session, fantasyId, week)
+            error = context.lineupError()
+            if error is not None:
+                await deferred.edit(content=error)
                 return
 
-            # Check if lineups are locked for the given week in this league
-            stmt = select(WeekStatus).where(
-                WeekStatus.year == league.year, WeekStatus.week == week
+            # validate the whole lineup in memory, then replace the week's
+            # starts in one transaction
+            context.clearWeek()
+            results = []
+            for team in teams:
+                result, _ = context.startTeam(team)
+                results.append(f"{team}: {result}")
+
+            await session.execute(
+                delete(TeamStarted).where(
+                    TeamStarted.league_id == context.league.league_id,
+                    TeamStarted.fantasy_team_id == fantasyId,
+                    TeamStarted.week == week,
+                )
             )
-            result = await session.execute(stmt)
-            week_status = result.scalars().first()
-
-            if week_status and week_status.lineups_locked:
-                await deferred.edit(
-                    content="Lineups are locked for this week, you cannot modify your lineup at this time."
+            session.add_all(
+                TeamStarted(
+                    fantasy_team_id=fantasyId,
+                    team_number=team_number,
+                    league_id=context.league.league_id,
+                    event_key=event_key,
+                    week=week,
                 )
-                return
-
-            # remove all existing starts for this week
-            stmt = delete(TeamStarted).where(
-                TeamStarted.league_id == league.league_id,
-                TeamStarted.fantasy_team_id == fantasyId,
-                TeamStarted.week == week,
+                for team_number, event_key in context.started
             )
-            await session.execute(stmt)
             await session.commit()
 
-        # start each team provided
-        results = []
-        for team in teams:
-            result = await self.startTeamTask(
-                interaction,
-                frcteam=team,
-                week=week,
-                fantasyId=fantasyId,
-                update_response=False,
-            )
-            results.append(f"{team}: {result}")
-
         if len(results) == 0:
             await deferred.edit(content="No teams provided.")
         else:
@@ -482,6 +332,72 @@ class ManageTeam(commands.Cog):
             embed.description += "```"
             await response.edit(embed=embed, content="")
 
+    @serialized(fantasyTeamLeague)
+    async def optimizeLineupTask(
+        self, interaction: discord.Interaction, fantasyId: int, apply: bool
+    ):
+        deferred = await interaction.original_response()
+        async with self.bot.async_session() as session:
+            stmt = (
+                select(FantasyTeam)
+                .where(FantasyTeam.fantasy_team_id == fantasyId)
+                .options(selectinload(FantasyTeam.league))
+            )
+            result = await session.execute(stmt)
+            fantasyteam: FantasyTeam = result.scalars().first()
+            league: League = fantasyteam.league
+            if not league.is_fim:
+                await deferred.edit(content="This league does not support starts/sits.")
+                return
+
+            rows = {}
+            for name, stmt in lineupQueries(league, fantasyId).items():
+                rows[name] = (await session.execute(stmt)).all()
+            lineup = optimizeLineupRows(league, fantasyId, rows)
+
+            openWeeks = [week["week"] for week in lineup if not week["locked"]]
+            if apply and openWeeks:
+                await session.execute(
+                    delete(TeamStarted).where(
+                        TeamStarted.league_id == league.league_id,
+                        TeamStarted.fantasy_team_id == fantasyId,
+                        TeamStarted.week.in_(openWeeks),
+                    )
+                )
+                session.add_all(
+                    TeamStarted(
+                        fantasy_team_id=fantasyId,
+                        team_number=team["team_number"],
+                        league_id=league.league_id,
+                        event_key=team["event_key"],
+                        week=week["week"],
+                    )
+                    for week in lineup
+                    if not week["locked"]
+                    for team in week["teams"]
+                )
+                await session.commit()
+
+        title = "Starting Lineups Set" if apply else "Suggested Starting Lineups"
+        embed = Embed(
+            title=f"**{fantasyteam.fantasy_team_name} {title}**",
+            description="```",
+        )
+        total = 0.0
+        for week in lineup:
+            weekLabel = f"Week {week['week']}"
+            teams = " ".join(team["team_number"] for team in week["teams"]) or "-----"
+            if week["locked"]:
+                embed.description += f"{weekLabel:<8s}{teams} (locked)\n"
+                continue
+            points = sum(team["projected_points"] for team in week["teams"])
+            total += points
+            embed.description += f"{weekLabel:<8s}{teams:<24s}{points:>6.1f}\n"
+        embed.description += f"```Projected points in open weeks: **{total:.1f}**"
+        if not apply:
+            embed.description += "\nRun again with apply=True to set these lineups."
+        await deferred.edit(embed=embed, content="")
+
     async def viewMyClaimsTask(self, interaction: discord.Interaction, fantasyId: int):
         async with self.bot.async_session() as session:
             # retrieve waiver claim data
@@ -510,6 +426,7 @@ class ManageTeam(commands.Cog):
             embed.description += "```"
             await response.edit(embed=embed, content="")
 
+    @serialized(fantasyTeamLeague)
     async def addDropTeamTask(
         self,
         interaction: discord.Interaction,
@@ -521,7 +438,7 @@ class ManageTeam(commands.Cog):
     ):
         async with self.bot.async_session() as session:
             message = await interaction.original_response()
-            currentWeek = await self.bot.getCurrentWeek()
+            currentWeek = await self.bot.getCurrentWeek(fresh=True)
             if currentWeek.lineups_locked:
                 await message.edit(
                     content="Cannot make transaction with locked lineups."
@@ -615,6 +532,7 @@ class ManageTeam(commands.Cog):
                 )
                 await session.commit()
 
+    @serialized(fantasyTeamLeague)
     async def makeWaiverClaimTask(
         self,
         interaction: discord.Interaction,
@@ -675,6 +593,7 @@ class ManageTeam(commands.Cog):
                 )
                 await session.commit()
 
+    @serialized(fantasyTeamLeague)
     async def cancelClaimTask(
         self, interaction: discord.Interaction, fantasyId: int, priority: int
     ):
@@ -835,8 +754,11 @@ class ManageTeam(commands.Cog):
             for player in playersToNotif:
                 notifText += f"<@{player.player_id}> "
             if not force:
-                await interaction.channel.send(
-                    embed=tradeProposalEmbed, content=notifText
+                await queueNotification(
+                    session,
+                    content=notifText,
+                    embed=tradeProposalEmbed,
+                    channel_id=interaction.channel_id,
                 )
             # Commit all the teams involved in the trade
             await session.commit()
@@ -876,6 +798,7 @@ class ManageTeam(commands.Cog):
                     content=f"You did not have a pending proposal with id {tradeId}."
                 )
 
+    @serialized(fantasyTeamLeague)
     async def acceptTradeTask(
         self,
         interaction: discord.Interaction,
@@ -895,7 +818,7 @@ class ManageTeam(commands.Cog):
             )
             result = await session.execute(stmt)
             proposalObj = result.scalars().first()
-            currentWeek = await self.bot.getCurrentWeek()
+            currentWeek = await self.bot.getCurrentWeek(fresh=True)
             if currentWeek.lineups_locked and not force:
                 await message.edit("Cannot accept a trade while lineups are locked!")
                 return
@@ -925,6 +848,8 @@ class ManageTeam(commands.Cog):
                     result = await session.execute(stmt)
                     ownership = result.scalars().first()
                     if not ownership:
+                        # undo the half of the trade already flushed
+                        await session.rollback()
                         await message.edit(
                             content=f"Team {tradeTeam.team_key} is no longer owned by the proposer."
                         )
@@ -954,6 +879,8 @@ class ManageTeam(commands.Cog):
                     result = await session.execute(stmt)
                     ownership = result.scalars().first()
                     if not ownership:
+                        # undo the half of the trade already flushed
+                        await session.rollback()
                         await message.edit(
                             content=f"Team {tradeTeam.team_key} is no longer owned by the proposed-to team."
                         )
@@ -1030,6 +957,12 @@ class ManageTeam(commands.Cog):
                 interaction=interaction, week=week, frcteam=frcteam, fantasyId=teamId
             )
 
+    @startTeam.autocomplete("frcteam")
+    async def startTeamAutocomplete(
+        self, interaction: discord.Interaction, current: str
+    ):
+        return await self.bot.teamAutocomplete.complete(interaction, current, "roster")
+
     @app_commands.command(
         name="sit", description="Remove team from starting lineup for week"
     )
@@ -1047,6 +980,10 @@ class ManageTeam(commands.Cog):
                 interaction=interaction, week=week, frcteam=frcteam, fantasyId=teamId
             )
 
+    @sitTeam.autocomplete("frcteam")
+    async def sitTeamAutocomplete(self, interaction: discord.Interaction, current: str):
+        return await self.bot.teamAutocomplete.complete(interaction, current, "roster")
+
     @app_commands.command(
         name="setlineup", description="Set entire lineup with comma-separated team list"
     )
@@ -1094,6 +1031,7 @@ class ManageTeam(commands.Cog):
                     )
                     session.add(authorizeToAdd)
                     await session.commit()
+                    self.bot.invalidateUserTeams(user.id)
                     stmt = select(FantasyTeam).where(
                         FantasyTeam.fantasy_team_id == fantasyteamid
                     )
@@ -1142,6 +1080,18 @@ class ManageTeam(commands.Cog):
                 interaction, addTeam=addteam, dropTeam=dropteam, fantasyId=teamId
             )
 
+    @addDrop.autocomplete("addteam")
+    async def addTeamAutocomplete(self, interaction: discord.Interaction, current: str):
+        return await self.bot.teamAutocomplete.complete(
+            interaction, current, "freeagent"
+        )
+
+    @addDrop.autocomplete("dropteam")
+    async def dropTeamAutocomplete(
+        self, interaction: discord.Interaction, current: str
+    ):
+        return await self.bot.teamAutocomplete.complete(interaction, current, "roster")
+
     @app_commands.command(name="lineup", description="View your starting lineups")
     async def startingLineups(self, interaction: discord.Interaction):
         await interaction.response.send_message(
@@ -1155,6 +1105,24 @@ class ManageTeam(commands.Cog):
         else:
             await self.viewStartsTask(interaction, teamId)
 
+    @app_commands.command(
+        name="optimizelineup",
+        description="Suggest (or set) the lineups that maximize your projected points",
+    )
+    async def optimizeLineup(
+        self, interaction: discord.Interaction, apply: bool = False
+    ):
+        await interaction.response.send_message(
+            "Optimizing starting lineups...", ephemeral=True
+        )
+        originalResponse = await interaction.original_response()
+        teamId = await self.getFantasyTeamIdFromInteraction(interaction)
+        if teamId is None:
+            await originalResponse.edit(content="You are not in this league!")
+            return
+        else:
+            await self.optimizeLineupTask(interaction, teamId, apply)
+
     @app_commands.command(
         name="claim", description="Make a waiver claim (only shown to you)"
     )
@@ -1173,6 +1141,18 @@ class ManageTeam(commands.Cog):
         else:
             await self.makeWaiverClaimTask(interaction, teamId, teamtoclaim, teamtodrop)
 
+    @makeWaiverClaim.autocomplete("teamtoclaim")
+    async def claimTeamAutocomplete(
+        self, interaction: discord.Interaction, current: str
+    ):
+        return await self.bot.teamAutocomplete.complete(interaction, current, "waivers")
+
+    @makeWaiverClaim.autocomplete("teamtodrop")
+    async def claimDropAutocomplete(
+        self, interaction: discord.Interaction, current: str
+    ):
+        return await self.bot.teamAutocomplete.complete(interaction, current, "roster")
+
     @app_commands.command(
         name="myclaims", description="View your waiver claims (only shown to you)"
     )
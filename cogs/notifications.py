@@ -0,0 +1,250 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+
+import discord
+from discord.ext import commands, tasks
+from sqlalchemy import or_, select, update
+
+from models.notifications import NotificationOutbox
+
+logger = logging.getLogger("discord")
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 5
+DEDUPE_WINDOW = timedelta(minutes=30)
+# Discord allows 5 message creates per 5 seconds on a single channel route
+ROUTE_LIMIT = 5
+ROUTE_PERIOD = 5.0
+
+
+def notificationKey(route: str, content: str, embed: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{route}\n{content or ''}\n{embed or ''}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+async def queueNotifications(session, notifications: list[dict]) -> int:
+    """Add notifications to the outbox without sending them.
+
+    Each entry takes ``content``, ``embed`` (a discord.Embed) and either
+    ``channel_id`` or ``user_id``. Anything identical to a message queued
+    within DEDUPE_WINDOW that is still waiting to be sent is dropped; once
+    the earlier copy has gone out, a deliberate repeat is queued again. The
+    caller owns the commit so the notification is only sent if the rest of
+    its transaction lands. Returns the number of rows queued.
+    """
+    rows = {}
+    for notification in notifications:
+        embed = notification.get("embed")
+        embedJson = json.dumps(embed.to_dict(), sort_keys=True) if embed else None
+        channelId = notification.get("channel_id")
+        userId = notification.get("user_id")
+        row = NotificationOutbox(
+            channel_id=str(channelId) if channelId is not None else None,
+            user_id=str(userId) if userId is not None else None,
+            content=notification.get("content"),
+            embed=embedJson,
+        )
+        row.dedupe_key = notificationKey(row.route, row.content, row.embed)
+        rows.setdefault(row.dedupe_key, row)
+    if not rows:
+        return 0
+
+    recent_result = await session.execute(
+        select(NotificationOutbox.dedupe_key).where(
+            NotificationOutbox.dedupe_key.in_(list(rows.keys())),
+            NotificationOutbox.created_at >= datetime.now() - DEDUPE_WINDOW,
+            NotificationOutbox.sent_at.is_(None),
+            NotificationOutbox.failed.is_(False),
+        )
+    )
+    for key in recent_result.scalars().all():
+        rows.pop(key, None)
+    session.add_all(rows.values())
+    return len(rows)
+
+
+async def queueNotification(
+    session, content=None, embed: discord.Embed = None, channel_id=None, user_id=None
+) -> bool:
+    queued = await queueNotifications(
+        session,
+        [
+            {
+                "content": content,
+                "embed": embed,
+                "channel_id": channel_id,
+                "user_id": user_id,
+            }
+        ],
+    )
+    return queued == 1
+
+
+class Notifications(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.routeSends = defaultdict(deque)
+        self.routeBlockedUntil = {}
+
+    async def cog_load(self):
+        self.sendPendingNotifications.start()
+
+    async def cog_unload(self):
+        self.sendPendingNotifications.cancel()
+
+    def routeCapacity(self, route: str) -> int:
+        now = time.monotonic()
+        if self.routeBlockedUntil.get(route, 0) > now:
+            return 0
+        sends = self.routeSends[route]
+        while sends and now - sends[0] > ROUTE_PERIOD:
+            sends.popleft()
+        return ROUTE_LIMIT - len(sends)
+
+    def blockedRoutes(self) -> tuple[list[str], list[str]]:
+        """Channel ids and user ids whose routes cannot send right now."""
+        channelIds, userIds = [], []
+        for route in set(self.routeSends) | set(self.routeBlockedUntil):
+            if self.routeCapacity(route) > 0:
+                # forget idle routes so the bookkeeping does not grow forever
+                self.routeBlockedUntil.pop(route, None)
+                if not self.routeSends[route]:
+                    del self.routeSends[route]
+                continue
+            kind, destination = route.split(":", 1)
+            (userIds if kind == "user" else channelIds).append(destination)
+        return channelIds, userIds
+
+    async def getDestination(self, notification: NotificationOutbox):
+        if notification.user_id is not None:
+            userId = int(notification.user_id)
+            return self.bot.get_user(userId) or await self.bot.fetch_user(userId)
+        channelId = int(notification.channel_id)
+        return self.bot.get_channel(channelId) or await self.bot.fetch_channel(
+            channelId
+        )
+
+    async def sendRoute(self, route: str, notifications: list, outcomes: dict):
+        capacity = self.routeCapacity(route)
+        for notification in notifications[:capacity]:
+            try:
+                destination = await self.getDestination(notification)
+                embed = None
+                if notification.embed:
+                    embed = discord.Embed.from_dict(json.loads(notification.embed))
+                await destination.send(content=notification.content, embed=embed)
+                self.routeSends[route].append(time.monotonic())
+                outcomes[notification.notification_id] = None
+            except (discord.Forbidden, discord.NotFound) as e:
+                # retrying will not help, e.g. DMs closed or channel deleted
+                outcomes[notification.notification_id] = (e, False)
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    retryAfter = float(getattr(e, "retry_after", ROUTE_PERIOD))
+                    self.routeBlockedUntil[route] = time.monotonic() + retryAfter
+                outcomes[notification.notification_id] = (e, True)
+                break
+            except Exception as e:
+                outcomes[notification.notification_id] = (e, True)
+                break
+
+    @tasks.loop(seconds=2)
+    async def sendPendingNotifications(self):
+        # leave rate-limited routes out of the batch so their backlog does
+        # not hold up every other destination
+        channelIds, userIds = self.blockedRoutes()
+        query = select(NotificationOutbox).where(
+            NotificationOutbox.sent_at.is_(None),
+            NotificationOutbox.failed.is_(False),
+            NotificationOutbox.next_attempt <= datetime.now(),
+        )
+        if channelIds:
+            query = query.where(
+                or_(
+                    NotificationOutbox.channel_id.is_(None),
+                    NotificationOutbox.channel_id.not_in(channelIds),
+                )
+            )
+        if userIds:
+            query = query.where(
+                or_(
+                    NotificationOutbox.user_id.is_(None),
+                    NotificationOutbox.user_id.not_in(userIds),
+                )
+            )
+        async with self.bot.async_session() as session:
+            pending_result = await session.execute(
+                query.order_by(NotificationOutbox.notification_id.asc()).limit(
+                    BATCH_SIZE
+                )
+            )
+            pending = pending_result.scalars().all()
+        if not pending:
+            return
+
+        routes = defaultdict(list)
+        for notification in pending:
+            routes[notification.route].append(notification)
+        outcomes = {}
+        await asyncio.gather(
+            *[
+                self.sendRoute(route, notifications, outcomes)
+                for route, notifications in routes.items()
+            ]
+        )
+        if not outcomes:
+            return
+
+        now = datetime.now()
+        sentIds = [nid for nid, outcome in outcomes.items() if outcome is None]
+        byId = {notification.notification_id: notification for notification in pending}
+        async with self.bot.async_session() as session:
+            if sentIds:
+                await session.execute(
+                    update(NotificationOutbox)
+                    .where(NotificationOutbox.notification_id.in_(sentIds))
+                    .values(sent_at=now)
+                )
+            for nid, outcome in outcomes.items():
+                if outcome is None:
+                    continue
+                error, retry = outcome
+                attempts = byId[nid].attempts + 1
+                failed = not retry or attempts >= MAX_ATTEMPTS
+                if failed:
+                    logger.warning(f"Dropping notification {nid}: {error}")
+                await session.execute(
+                    update(NotificationOutbox)
+                    .where(NotificationOutbox.notification_id == nid)
+                    .values(
+                        attempts=attempts,
+                        failed=failed,
+                        last_error=str(error)[:1000],
+                        next_attempt=now + timedelta(seconds=2**attempts),
+                    )
+                )
+            await session.commit()
+
+    @sendPendingNotifications.before_loop
+    async def beforeSendPendingNotifications(self):
+        await self.bot.wait_until_ready()
+
+    @sendPendingNotifications.error
+    async def sendPendingNotificationsError(self, error):
+        logger.error(f"Notification sender stopped: {error}")
+        self.sendPendingNotifications.restart()
+
+
+async def setup(bot: commands.Bot) -> None:
+    cog = Notifications(bot)
+    guild = await bot.fetch_guild(int(os.getenv("GUILD_ID")))
+    assert guild is not None
+
+    await bot.add_cog(cog, guilds=[guild])
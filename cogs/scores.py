@@ -133,6 +133,12 @@ class Scores(commands.Cog):
         )
         await self.getFRCTeamReport(interaction, frcteam)
 
+    @getTeamReport.autocomplete("frcteam")
+    async def teamReportAutocomplete(
+        self, interaction: discord.Interaction, current: str
+    ):
+        return await self.bot.teamAutocomplete.complete(interaction, current, "fim")
+
     @app_commands.command(
         name="weeklyreport",
         description="Retrieves a report of scores and rankings up to date for the current week in the channel's league",
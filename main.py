@@ -5,20 +5,34 @@ import threading
 import time
 
 import discord
-from discord import Embed
-from discord.ext import commands
+from discord import Embed, app_commands
+from discord.ext import commands, tasks
 from dotenv import load_dotenv
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
 import cogs.admin as admin
 from models.base import Base
+from models.draft import Draft
 from models.scores import FantasyTeam, League, PlayerAuthorized, WeekStatus
+from utils.cache import MISSING, TTLCache
+from utils.draftstate import DraftStateManager
+from utils.locks import KeyedLocks
+from utils.metrics import openPerfLog, perfStats
+from utils.pickclock import PickClock
+from utils.sessionscope import ScopedSessionMaker
+from utils.teamindex import TeamAutocomplete
 
 load_dotenv()
 
 logger = logging.getLogger("discord")
 
+CHANNEL_LEAGUE_TTL = 600
+USER_TEAMS_TTL = 300
+CURRENT_WEEK_TTL = 60
+FANTASY_TEAM_LEAGUE_TTL = 3600
+PERF_LOG_INTERVAL = 300
+
 intents = discord.Intents.default()
 intents.message_content = True
 
@@ -30,6 +44,28 @@ elif conn_str and conn_str.startswith("postgres://"):
     conn_str = conn_str.replace("postgres://", "postgresql+asyncpg://", 1)
 
 
+class SessionCommandTree(app_commands.CommandTree):
+    """Runs each app command and autocomplete inside one database session.
+
+    Every call is also timed into ``perfStats`` along with the queries and
+    HTTP requests it made, see /perfstats.
+    """
+
+    # interaction_check is the public hook discord.py awaits first in the
+    # task it creates for every application command interaction; the
+    # session and timing are bound to that task and wrapped up when it ends
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        name = interaction.data.get("name", "unknown")
+        if interaction.type == discord.InteractionType.autocomplete:
+            name += " (autocomplete)"
+        finish = perfStats.begin(name)
+        self.client.async_session.bindTask()
+        asyncio.current_task().add_done_callback(
+            lambda task: finish(interaction.command_failed)
+        )
+        return True
+
+
 class FantasyFiMBot(commands.Bot):
 
     def __init__(self):
@@ -37,6 +73,7 @@ class FantasyFiMBot(commands.Bot):
             command_prefix="/",
             intents=discord.Intents.all(),
             application_id=os.getenv("DISCORD_APPLICATION_ID"),
+            tree_cls=SessionCommandTree,
         )
 
         # Async-only engine optimized for Neon
@@ -48,7 +85,25 @@ class FantasyFiMBot(commands.Bot):
             pool_recycle=180,
             connect_args={"ssl": True},
         )
-        self.async_session = async_sessionmaker(self.engine, expire_on_commit=False)
+        perfStats.instrumentEngine(self.engine.sync_engine)
+        # one session per interaction, see SessionCommandTree
+        self.async_session = ScopedSessionMaker(
+            async_sessionmaker(self.engine, expire_on_commit=False)
+        )
+        self.draftStates = DraftStateManager(self.async_session)
+        self.pickClock = PickClock()
+        # (channel_id, leagues, drafts) -> league_id or None
+        self.channelLeagues = TTLCache("channel_league", CHANNEL_LEAGUE_TTL)
+        # (user_id, league_id) -> tuple of fantasy_team_ids
+        self.userTeams = TTLCache("user_teams", USER_TEAMS_TTL)
+        self.currentWeek = TTLCache("current_week", CURRENT_WEEK_TTL)
+        # fantasy_team_id -> league_id
+        self.fantasyTeamLeagues = TTLCache(
+            "fantasy_team_league", FANTASY_TEAM_LEAGUE_TTL
+        )
+        # ("league", league_id) / ("draft", draft_id) -> lock for mutations
+        self.locks = KeyedLocks("mutation")
+        self.teamAutocomplete = TeamAutocomplete(self)
 
     async def setup_db(self):
         """Initialize database tables"""
@@ -75,38 +130,114 @@ class FantasyFiMBot(commands.Bot):
         adminCog = admin.Admin(self)
         await adminCog.importFullDistrctTask(2026)
 
-    async def verifyTeamMember(
-        self, interaction: discord.Interaction, user: discord.User
+    async def getChannelLeagueId(
+        self, channel_id, leagues: bool = True, drafts: bool = True
     ):
+        """League a channel belongs to, as a league thread and/or a draft thread."""
+        key = (str(channel_id), leagues, drafts)
+        league_id = self.channelLeagues.get(key)
+        if league_id is not MISSING:
+            return league_id
+        league_id = None
         async with self.async_session() as session:
-            # Get the fantasy team ID for the interaction user in this channel's league
-            stmt = (
+            if leagues:
+                result = await session.execute(
+                    select(League.league_id).where(
+                        League.discord_channel == str(channel_id)
+                    )
+                )
+                league_id = result.scalars().first()
+            if league_id is None and drafts:
+                result = await session.execute(
+                    select(Draft.league_id).where(
+                        Draft.discord_channel == str(channel_id)
+                    )
+                )
+                league_id = result.scalars().first()
+        return self.channelLeagues.set(key, league_id)
+
+    async def getUserFantasyTeamIds(self, user_id, league_id: int) -> tuple:
+        key = (str(user_id), league_id)
+        teamIds = self.userTeams.get(key)
+        if teamIds is not MISSING:
+            return teamIds
+        async with self.async_session() as session:
+            result = await session.execute(
                 select(FantasyTeam.fantasy_team_id)
                 .join(
                     PlayerAuthorized,
                     PlayerAuthorized.fantasy_team_id == FantasyTeam.fantasy_team_id,
                 )
-                .join(League, FantasyTeam.league_id == League.league_id)
-                .where(PlayerAuthorized.player_id == str(interaction.user.id))
-                .where(League.discord_channel == str(interaction.channel_id))
+                .where(
+                    PlayerAuthorized.player_id == str(user_id),
+                    FantasyTeam.league_id == league_id,
+                )
             )
-            result = await session.execute(stmt)
-            row = result.first()
+            teamIds = tuple(result.scalars().all())
+        return self.userTeams.set(key, teamIds)
 
-            if row is None:
-                return False
+    async def getUserFantasyTeamId(
+        self, user_id, channel_id, leagues: bool = True, drafts: bool = True
+    ):
+        league_id = await self.getChannelLeagueId(channel_id, leagues, drafts)
+        if league_id is None:
+            return None
+        teamIds = await self.getUserFantasyTeamIds(user_id, league_id)
+        return teamIds[0] if teamIds else None
 
-            teamid = row.fantasy_team_id
-            logger.info(f"teamid {teamid}")
+    async def getFantasyTeamLeagueId(self, fantasyId: int):
+        league_id = self.fantasyTeamLeagues.get(fantasyId)
+        if league_id is not MISSING:
+            return league_id
+        async with self.async_session() as session:
+            result = await session.execute(
+                select(FantasyTeam.league_id).where(
+                    FantasyTeam.fantasy_team_id == fantasyId
+                )
+            )
+            return self.fantasyTeamLeagues.set(fantasyId, result.scalars().first())
 
-            # Check if the given user is authorized in the same team
-            user_stmt = (
-                select(PlayerAuthorized)
-                .where(PlayerAuthorized.player_id == str(user.id))
-                .where(PlayerAuthorized.fantasy_team_id == teamid)
+    def invalidateUserTeams(self, user_id=None):
+        if user_id is None:
+            self.userTeams.invalidate()
+        else:
+            self.userTeams.invalidateWhere(lambda key: key[0] == str(user_id))
+
+    def invalidateChannelLeagues(self):
+        self.channelLeagues.invalidate()
+
+    def invalidateCurrentWeek(self):
+        self.currentWeek.invalidate()
+
+    def cacheStats(self) -> list[dict]:
+        return [
+            cache.stats()
+            for cache in (
+                self.channelLeagues,
+                self.userTeams,
+                self.currentWeek,
+                self.fantasyTeamLeagues,
+                self.teamAutocomplete.scopes,
+                self.teamAutocomplete.draftChannels,
             )
-            user_result = await session.execute(user_stmt)
-            return user_result.first() is not None
+        ]
+
+    async def verifyTeamMember(
+        self, interaction: discord.Interaction, user: discord.User
+    ):
+        # Get the fantasy team ID for the interaction user in this channel's league
+        league_id = await self.getChannelLeagueId(interaction.channel_id, drafts=False)
+        if league_id is None:
+            return False
+        teamIds = await self.getUserFantasyTeamIds(interaction.user.id, league_id)
+        if not teamIds:
+            return False
+
+        teamid = teamIds[0]
+        logger.info(f"teamid {teamid}")
+
+        # Check if the given user is authorized in the same team
+        return teamid in await self.getUserFantasyTeamIds(user.id, league_id)
 
     async def verifyTeamMemberByTeamId(self, fantasyId: int, user: discord.User):
         async with self.async_session() as session:
@@ -138,7 +269,11 @@ class FantasyFiMBot(commands.Bot):
             # Return True if user is NOT in the league (no teams found)
             return len(found_teams) == 0
 
-    async def getCurrentWeek(self) -> WeekStatus:
+    async def getCurrentWeek(self, fresh: bool = False) -> WeekStatus:
+        """The active week; ``fresh`` skips the cache, e.g. under a mutation lock."""
+        week = MISSING if fresh else self.currentWeek.get(None)
+        if week is not MISSING:
+            return week
         async with self.async_session() as session:
             stmt = (
                 select(WeekStatus)
@@ -146,15 +281,33 @@ class FantasyFiMBot(commands.Bot):
                 .order_by(WeekStatus.year.asc(), WeekStatus.week.asc())
             )
             result = await session.execute(stmt)
-            return result.scalars().first()
+            week = result.scalars().first()
+        if week is not None:
+            # cache a detached copy: the row belongs to a possibly shared
+            # session, and a rollback there would expire it for every cache hit
+            week = WeekStatus(
+                year=week.year,
+                week=week.week,
+                lineups_locked=week.lineups_locked,
+                scores_finalized=week.scores_finalized,
+                active=week.active,
+            )
+        return self.currentWeek.set(None, week)
+
+    @tasks.loop(seconds=PERF_LOG_INTERVAL)
+    async def writePerfLog(self):
+        perfStats.writeLog()
 
     async def setup_hook(self):
         await self.setup_db()
+        openPerfLog(os.getenv("PERF_LOG_FILE", "perfstats.log"))
+        self.writePerfLog.start()
         await self.load_extension("cogs.general")
         await self.load_extension("cogs.scores")
         await self.load_extension("cogs.admin")
         await self.load_extension("cogs.drafting")
         await self.load_extension("cogs.manageteam")
+        await self.load_extension("cogs.notifications")
         await self.tree.sync(guild=discord.Object(id=os.getenv("GUILD_ID")))
 
     async def on_ready(self):
@@ -0,0 +1,5 @@
+-- A team can only be drafted once per draft. Unmade picks all hold the
+-- placeholder team '-1', so they are left out of the index.
+CREATE UNIQUE INDEX IF NOT EXISTS uq_draftpick_draft_team
+    ON draftpick (draft_id, team_number)
+    WHERE team_number <> '-1';
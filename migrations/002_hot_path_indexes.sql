@@ -0,0 +1,31 @@
+-- Secondary indexes for the lookups the bot and API make on every request.
+-- CONCURRENTLY keeps the tables writable while the indexes build, so run
+-- this file outside of a transaction (psql -f does).
+
+-- scoring and draft pools read whole events; the PK leads with team_key
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_teamscore_event_key
+    ON teamscore (event_key);
+
+-- a fantasy team's lineup for a week
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_teamstarted_fantasy_team_week
+    ON teamstarted (fantasy_team_id, week);
+
+-- season start counts for a team in a league
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_teamstarted_league_team
+    ON teamstarted (league_id, team_number);
+
+-- weekly rankings and standings
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_fantasyscores_league_week
+    ON fantasyscores (league_id, week);
+
+-- the next open pick of a draft; picked teams use uq_draftpick_draft_team
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_draftpick_open
+    ON draftpick (draft_id, pick_number)
+    WHERE team_number = '-1';
+
+-- channel -> league / draft resolution for every slash command
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_league_discord_channel
+    ON league (discord_channel);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_draft_discord_channel
+    ON draft (discord_channel);
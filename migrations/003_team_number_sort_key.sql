@@ -0,0 +1,25 @@
+-- Integer sort key for team numbers so listings can walk an index instead of
+-- sorting on CAST(team_number AS INTEGER). Offseason B teams ("33B") sort
+-- with their numeric part. Run outside of a transaction (psql -f does).
+-- Tables that do not exist yet are skipped (the \if guards need psql 10+):
+-- the bot's create_all builds them later with the column and index in place.
+
+SELECT to_regclass('teams') IS NOT NULL AS has_teams \gset
+\if :has_teams
+ALTER TABLE teams ADD COLUMN IF NOT EXISTS team_number_int INTEGER;
+UPDATE teams
+    SET team_number_int = substring(team_number FROM '^[0-9]+')::integer
+    WHERE team_number_int IS NULL;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_teams_number_sort
+    ON teams (team_number_int, team_number);
+\endif
+
+SELECT to_regclass('draft_pool') IS NOT NULL AS has_draft_pool \gset
+\if :has_draft_pool
+ALTER TABLE draft_pool ADD COLUMN IF NOT EXISTS team_number_int INTEGER;
+UPDATE draft_pool
+    SET team_number_int = substring(team_number FROM '^[0-9]+')::integer
+    WHERE team_number_int IS NULL;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_draft_pool_by_number
+    ON draft_pool (draft_id, is_picked, team_number_int, team_number);
+\endif
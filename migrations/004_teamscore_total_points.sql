@@ -0,0 +1,12 @@
+-- Stored total of a TeamScore's point columns so weekly totals and
+-- leaderboards can SUM/ORDER BY it in the database. Adding a stored generated
+-- column rewrites teamscore once. Run outside of a transaction (psql -f does).
+
+ALTER TABLE teamscore ADD COLUMN IF NOT EXISTS total_points INTEGER NOT NULL
+    GENERATED ALWAYS AS (
+        qual_points + alliance_points + elim_points + award_points
+        + rookie_points + stat_correction
+    ) STORED;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_teamscore_total_points
+    ON teamscore (total_points);
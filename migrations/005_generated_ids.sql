@@ -0,0 +1,30 @@
+-- League, fantasy team and draft ids come from the database instead of
+-- max(id) + 1. Tables created by create_all already have a serial sequence
+-- that explicit ids never advanced; older tables get an identity column.
+-- Either way the sequence is moved past the current max id.
+
+DO $$
+DECLARE
+    target record;
+BEGIN
+    FOR target IN
+        SELECT * FROM (VALUES
+            ('league', 'league_id'),
+            ('fantasyteam', 'fantasy_team_id'),
+            ('draft', 'draft_id')
+        ) AS t(table_name, column_name)
+    LOOP
+        IF pg_get_serial_sequence(target.table_name, target.column_name) IS NULL THEN
+            EXECUTE format(
+                'ALTER TABLE %I ALTER COLUMN %I ADD GENERATED BY DEFAULT AS IDENTITY',
+                target.table_name, target.column_name
+            );
+        END IF;
+        EXECUTE format(
+            'SELECT setval(pg_get_serial_sequence(%L, %L), '
+            'COALESCE((SELECT max(%I) FROM %I), 0) + 1, false)',
+            target.table_name, target.column_name,
+            target.column_name, target.table_name
+        );
+    END LOOP;
+END $$;
@@ -16,3 +16,7 @@ from models.transactions import *
 # trunk-ignore(ruff/E402)
 # trunk-ignore(ruff/F403)
 from models.users import *
+
+# trunk-ignore(ruff/E402)
+# trunk-ignore(ruff/F403)
+from models.notifications import *
@@ -1,4 +1,6 @@
-from sqlalchemy import ForeignKey, Integer, String
+from datetime import datetime
+
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Integer, String, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -6,10 +8,12 @@ from .base import Base
 
 class Draft(Base):
     __tablename__ = "draft"
-    draft_id: Mapped[int] = mapped_column(Integer(), primary_key=True)
+    draft_id: Mapped[int] = mapped_column(
+        Integer(), primary_key=True, autoincrement=True
+    )
     league_id: Mapped[int] = mapped_column(ForeignKey("league.league_id"))
     event_key: Mapped[int] = mapped_column(ForeignKey("frcevent.event_key"))
-    discord_channel: Mapped[str] = mapped_column(String(30))
+    discord_channel: Mapped[str] = mapped_column(String(30), index=True)
     rounds: Mapped[int] = mapped_column(Integer(), nullable=False, default=3)
 
     league = relationship("League")
@@ -34,6 +38,25 @@ class DraftOrder(Base):
 
 class DraftPick(Base):
     __tablename__ = "draftpick"
+    __table_args__ = (
+        # unmade picks all share the "-1" placeholder
+        Index(
+            "uq_draftpick_draft_team",
+            "draft_id",
+            "team_number",
+            unique=True,
+            postgresql_where=text("team_number <> '-1'"),
+            sqlite_where=text("team_number <> '-1'"),
+        ),
+        # the next open pick of a draft
+        Index(
+            "ix_draftpick_open",
+            "draft_id",
+            "pick_number",
+            postgresql_where=text("team_number = '-1'"),
+            sqlite_where=text("team_number = '-1'"),
+        ),
+    )
     fantasy_team_id: Mapped[int] = mapped_column(
         ForeignKey("fantasyteam.fantasy_team_id"), primary_key=True
     )
@@ -59,3 +82,66 @@ class StatboticsData(Base):
     year_end_epa: Mapped[int] = mapped_column(Integer())
 
     team = relationship("Team")
+
+
+class DraftPool(Base):
+    """Teams eligible for a draft, materialized when the draft is created/started."""
+
+    __tablename__ = "draft_pool"
+    __table_args__ = (
+        Index("ix_draft_pool_available", "draft_id", "is_picked", "year_end_epa"),
+        Index(
+            "ix_draft_pool_by_number",
+            "draft_id",
+            "is_picked",
+            "team_number_int",
+            "team_number",
+        ),
+    )
+    draft_id: Mapped[int] = mapped_column(
+        ForeignKey("draft.draft_id"), primary_key=True
+    )
+    team_number: Mapped[str] = mapped_column(
+        ForeignKey("teams.team_number"), primary_key=True
+    )
+    year_end_epa: Mapped[int] = mapped_column(Integer(), nullable=True)
+    is_picked: Mapped[bool] = mapped_column(Boolean(), nullable=False, default=False)
+    # copy of Team.team_number_int so available-team listings are index ordered
+    team_number_int: Mapped[int] = mapped_column(Integer(), nullable=True)
+
+    draft = relationship("Draft")
+    team = relationship("Team")
+
+
+class DraftClock(Base):
+    """Pick clock settings and the running deadline for a draft."""
+
+    __tablename__ = "draftclock"
+    draft_id: Mapped[int] = mapped_column(
+        ForeignKey("draft.draft_id"), primary_key=True
+    )
+    seconds_per_pick: Mapped[int] = mapped_column(Integer(), nullable=False)
+    pick_number: Mapped[int] = mapped_column(Integer(), nullable=True)
+    deadline: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    draft = relationship("Draft")
+
+
+class DraftQueue(Base):
+    """A fantasy team's ranked wish list for autopicks in a draft."""
+
+    __tablename__ = "draftqueue"
+    draft_id: Mapped[int] = mapped_column(
+        ForeignKey("draft.draft_id"), primary_key=True
+    )
+    fantasy_team_id: Mapped[int] = mapped_column(
+        ForeignKey("fantasyteam.fantasy_team_id"), primary_key=True
+    )
+    position: Mapped[int] = mapped_column(Integer(), primary_key=True)
+    team_number: Mapped[str] = mapped_column(
+        ForeignKey("teams.team_number"), nullable=False
+    )
+
+    draft = relationship("Draft")
+    fantasyTeam = relationship("FantasyTeam")
+    team = relationship("Team")
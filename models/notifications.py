@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from sqlalchemy import Boolean, DateTime, Index, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class NotificationOutbox(Base):
+    __tablename__ = "notificationoutbox"
+    __table_args__ = (
+        Index("ix_notificationoutbox_pending", "sent_at", "failed", "next_attempt"),
+    )
+
+    notification_id: Mapped[int] = mapped_column(
+        Integer, primary_key=True, autoincrement=True
+    )
+    # exactly one of channel_id / user_id is set; user_id means a DM
+    channel_id: Mapped[str] = mapped_column(String(30), nullable=True)
+    user_id: Mapped[str] = mapped_column(String(50), nullable=True)
+    content: Mapped[str] = mapped_column(Text(), nullable=True)
+    embed: Mapped[str] = mapped_column(Text(), nullable=True)  # Embed.to_dict() JSON
+    dedupe_key: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
+    attempts: Mapped[int] = mapped_column(Integer(), nullable=False, default=0)
+    failed: Mapped[bool] = mapped_column(Boolean(), nullable=False, default=False)
+    last_error: Mapped[str] = mapped_column(Text(), nullable=True)
+    next_attempt: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, default=datetime.now
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, default=datetime.now
+    )
+    sent_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    @property
+    def route(self) -> str:
+        if self.user_id is not None:
+            return f"user:{self.user_id}"
+        return f"channel:{self.channel_id}"
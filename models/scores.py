@@ -1,19 +1,36 @@
 import json
+import re
 
 from scipy.special import erfinv
-from sqlalchemy import Boolean, Double, ForeignKey, Integer, String
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import Boolean, Computed, Double, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
 from .base import Base
 
 
+def team_number_sort_key(team_number):
+    """Numeric part of a team number; offseason B teams ("33B") sort with 33."""
+    match = re.match(r"\d+", str(team_number))
+    return int(match.group()) if match else None
+
+
 class Team(Base):
     __tablename__ = "teams"
+    # listings sort numerically and page with (team_number_int, team_number)
+    __table_args__ = (
+        Index("ix_teams_number_sort", "team_number_int", "team_number"),
+    )
 
     team_number: Mapped[str] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     is_fim: Mapped[Boolean] = mapped_column(Boolean(), nullable=False, default=False)
     rookie_year: Mapped[int] = mapped_column(Integer(), nullable=True)
+    team_number_int: Mapped[int] = mapped_column(Integer(), nullable=True)
+
+    @validates("team_number")
+    def validate_team_number(self, key, team_number):
+        self.team_number_int = team_number_sort_key(team_number)
+        return team_number
 
     def __str__(self):
         return str(self.teamnumber) + " " + self.name
@@ -34,6 +51,13 @@ class FRCEvent(Base):
 
 class TeamScore(Base):
     __tablename__ = "teamscore"
+    __table_args__ = (
+        # the primary key leads with team_key; scoring and draft pools look up
+        # whole events
+        Index("ix_teamscore_event_key", "event_key"),
+        # leaderboards order by total
+        Index("ix_teamscore_total_points", "total_points"),
+    )
     team_key: Mapped[str] = mapped_column(
         ForeignKey("teams.team_number"), primary_key=True
     )
@@ -49,11 +73,22 @@ class TeamScore(Base):
     event_finished: Mapped[bool] = mapped_column(
         Boolean(), nullable=False, default=False
     )
+    # maintained by the database so totals can be summed, sorted and indexed
+    # without loading rows
+    total_points: Mapped[int] = mapped_column(
+        Integer(),
+        Computed(
+            "qual_points + alliance_points + elim_points + award_points"
+            " + rookie_points + stat_correction",
+            persisted=True,
+        ),
+    )
 
     team = relationship("Team")
     event = relationship("FRCEvent")
 
     def score_team(self):
+        # computed in Python so unflushed point changes are included
         return (
             self.qual_points
             + self.alliance_points
@@ -63,6 +98,11 @@ class TeamScore(Base):
             + self.stat_correction
         )
 
+    @classmethod
+    def score_expression(cls):
+        # SQL counterpart of score_team() for aggregate queries
+        return cls.total_points
+
     def __str__(self):
         return (
             str(self.team_key)
@@ -123,7 +163,9 @@ class TeamScore(Base):
 
 class League(Base):
     __tablename__ = "league"
-    league_id: Mapped[int] = mapped_column(primary_key=True)
+    league_id: Mapped[int] = mapped_column(
+        Integer(), primary_key=True, autoincrement=True
+    )
     league_name: Mapped[str] = mapped_column(String(255), nullable=False)
     offseason: Mapped[bool] = mapped_column(Boolean(), nullable=False, default=False)
     team_limit: Mapped[int] = mapped_column(Integer(), nullable=False, default=8)
@@ -131,7 +173,9 @@ class League(Base):
     is_fim: Mapped[bool] = mapped_column(Boolean(), default=False)
     year: Mapped[int] = mapped_column(Integer(), nullable=False)
     active: Mapped[bool] = mapped_column(Boolean(), nullable=False, default=True)
-    discord_channel: Mapped[str] = mapped_column(String(30), nullable=False)
+    discord_channel: Mapped[str] = mapped_column(
+        String(30), nullable=False, index=True
+    )
     team_size_limit: Mapped[int] = mapped_column(Integer(), nullable=False)
 
     def __str__(self):
@@ -140,7 +184,9 @@ class League(Base):
 
 class FantasyTeam(Base):
     __tablename__ = "fantasyteam"
-    fantasy_team_id: Mapped[int] = mapped_column(Integer(), primary_key=True)
+    fantasy_team_id: Mapped[int] = mapped_column(
+        Integer(), primary_key=True, autoincrement=True
+    )
     fantasy_team_name: Mapped[str] = mapped_column(String(255), nullable=False)
     league_id: Mapped[int] = mapped_column(
         ForeignKey("league.league_id"), nullable=False
@@ -185,6 +231,10 @@ class TeamOwned(Base):
 
 class TeamStarted(Base):
     __tablename__ = "teamstarted"
+    __table_args__ = (
+        Index("ix_teamstarted_fantasy_team_week", "fantasy_team_id", "week"),
+        Index("ix_teamstarted_league_team", "league_id", "team_number"),
+    )
     fantasy_team_id: Mapped[int] = mapped_column(
         ForeignKey("fantasyteam.fantasy_team_id"), primary_key=True
     )
@@ -230,6 +280,7 @@ class WeekStatus(Base):
 
 class FantasyScores(Base):
     __tablename__ = "fantasyscores"
+    __table_args__ = (Index("ix_fantasyscores_league_week", "league_id", "week"),)
     league_id: Mapped[int] = mapped_column(
         ForeignKey("league.league_id"), primary_key=True
     )
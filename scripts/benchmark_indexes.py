@@ -0,0 +1,184 @@
+"""Compare query plans for the hot lookups with and without their indexes.
+
+Builds a throwaway schema filled by the seeded synthetic data generator
+(every generator option applies), then EXPLAIN ANALYZEs each hot query
+twice: once with the indexes from migrations/002_hot_path_indexes.sql
+dropped and once with them in place. Run from the repository root:
+
+    python -m scripts.benchmark_indexes --seasons 5 --leagues 200
+"""
+
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+from models.base import Base
+from models.draft import Draft, DraftPick
+from models.scores import FantasyTeam, League, TeamStarted
+from scripts.generate_synthetic_data import (
+    Generator,
+    databaseUrl,
+    generatorParser,
+    insertRows,
+)
+
+SCHEMA = "index_benchmark"
+HOT_INDEXES = [
+    "ix_teamscore_event_key",
+    "ix_teamstarted_fantasy_team_week",
+    "ix_teamstarted_league_team",
+    "ix_fantasyscores_league_week",
+    "ix_draftpick_open",
+    "ix_league_discord_channel",
+    "ix_draft_discord_channel",
+]
+# (label, query); parameters point at the last season's data
+QUERIES = [
+    (
+        "event registrations",
+        "SELECT team_key FROM teamscore WHERE event_key = :event_key",
+    ),
+    (
+        "weekly lineup",
+        "SELECT team_number, event_key FROM teamstarted"
+        " WHERE fantasy_team_id = :fantasy_team_id AND week = :week",
+    ),
+    (
+        "season starts",
+        "SELECT count(*) FROM teamstarted"
+        " WHERE league_id = :league_id AND team_number = :team_number",
+    ),
+    (
+        "weekly scores",
+        "SELECT fantasy_team_id, rank_points FROM fantasyscores"
+        " WHERE league_id = :league_id AND week = :week",
+    ),
+    (
+        "next open pick",
+        "SELECT pick_number FROM draftpick WHERE draft_id = :draft_id"
+        " AND team_number = '-1' ORDER BY pick_number LIMIT 1",
+    ),
+    (
+        "channel league",
+        "SELECT league_id FROM league WHERE discord_channel = :league_channel",
+    ),
+    (
+        "channel draft",
+        "SELECT draft_id FROM draft WHERE discord_channel = :draft_channel",
+    ),
+]
+
+
+def planNodes(plan: dict) -> list[str]:
+    node = plan["Node Type"]
+    if "Index Name" in plan:
+        node += f" ({plan['Index Name']})"
+    nodes = [node]
+    for child in plan.get("Plans", []):
+        nodes += planNodes(child)
+    return nodes
+
+
+def explain(conn, query: str, params: dict, runs: int):
+    """Plan nodes and the best execution time (ms) over ``runs`` executions."""
+    best = None
+    for _ in range(runs):
+        result = conn.execute(
+            text("EXPLAIN (ANALYZE, FORMAT JSON) " + query), params
+        ).scalar()
+        plan = result[0]
+        if best is None or plan["Execution Time"] < best[1]:
+            best = (planNodes(plan["Plan"]), plan["Execution Time"])
+    return best
+
+
+def queryParams(rows: dict, year: int) -> dict:
+    """Parameters pointing at a league, lineup and draft of the ``year`` season."""
+    leagues = [row for row in rows[League] if row["year"] == year]
+    league = leagues[len(leagues) // 2]
+    fantasyTeam = next(
+        row for row in rows[FantasyTeam] if row["league_id"] == league["league_id"]
+    )
+    start = next(
+        row
+        for row in rows[TeamStarted]
+        if row["fantasy_team_id"] == fantasyTeam["fantasy_team_id"]
+    )
+    drafts = [
+        row
+        for row in rows[Draft]
+        if row["league_id"] in {season["league_id"] for season in leagues}
+    ]
+    openDraftIds = {
+        row["draft_id"] for row in rows[DraftPick] if row["team_number"] == "-1"
+    }
+    draft = next(
+        (row for row in drafts if row["draft_id"] in openDraftIds), drafts[0]
+    )
+    return {
+        "event_key": start["event_key"],
+        "fantasy_team_id": fantasyTeam["fantasy_team_id"],
+        "week": start["week"],
+        "league_id": league["league_id"],
+        "team_number": start["team_number"],
+        "draft_id": draft["draft_id"],
+        "league_channel": league["discord_channel"],
+        "draft_channel": draft["discord_channel"],
+    }
+
+
+def main():
+    parser = generatorParser(description=__doc__.splitlines()[0])
+    parser.set_defaults(seasons=5, leagues=200)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="keep the schema")
+    args = parser.parse_args()
+
+    load_dotenv()
+    engine = create_engine(
+        databaseUrl(os.getenv("DATABASE_URL")),
+        connect_args={"options": f"-csearch_path={SCHEMA}"},
+    )
+    indexes = {
+        index.name: index
+        for table in Base.metadata.tables.values()
+        for index in table.indexes
+        if index.name in HOT_INDEXES
+    }
+    generator = Generator(args)
+    rows = generator.generate()
+    params = queryParams(rows, generator.lastYear)
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+            Base.metadata.create_all(conn)
+            for name in HOT_INDEXES:
+                conn.execute(text(f"DROP INDEX {name}"))
+            insertRows(conn, rows)
+            conn.execute(text("ANALYZE"))
+
+        results = {}
+        for phase in ("without", "with"):
+            with engine.begin() as conn:
+                if phase == "with":
+                    for name in HOT_INDEXES:
+                        indexes[name].create(conn)
+                    conn.execute(text("ANALYZE"))
+                for label, query in QUERIES:
+                    results[(label, phase)] = explain(conn, query, params, args.runs)
+
+        for label, _ in QUERIES:
+            print(label)
+            for phase in ("without", "with"):
+                nodes, elapsed = results[(label, phase)]
+                print(f"  {phase:>7} indexes: {elapsed:8.3f} ms  {' > '.join(nodes)}")
+    finally:
+        if not args.keep:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
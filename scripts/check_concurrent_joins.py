@@ -0,0 +1,132 @@
+"""Fire simultaneous /joindraft inserts at Postgres and count id collisions.
+
+Creates a throwaway schema filled by the seeded synthetic data generator
+plus one offseason league, then runs the inserts /joindraft makes (player,
+fantasy team, authorization) for ``--joins`` users at once. With
+database-generated ids every join should succeed; ``--legacy`` computes ids
+with max(id) + 1 as the command used to, for comparison. Run from the
+repository root:
+
+    python -m scripts.check_concurrent_joins --joins 100
+"""
+
+import asyncio
+import os
+import sys
+
+from dotenv import load_dotenv
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from models.base import Base
+from models.scores import FantasyTeam, League, PlayerAuthorized
+from models.users import Player
+from scripts.generate_synthetic_data import Generator, generatorParser, insertRows
+
+SCHEMA = "join_concurrency_check"
+
+
+def asyncUrl(url: str) -> str:
+    for prefix in ("postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return url.replace(prefix, "postgresql+asyncpg://", 1)
+    return url
+
+
+async def joinDraft(async_session, start: asyncio.Event, league_id, user_id, legacy):
+    await start.wait()
+    async with async_session() as session:
+        try:
+            session.add(Player(user_id=user_id, is_admin=False))
+            await session.flush()
+            fantasyTeam = FantasyTeam(league_id=league_id, fantasy_team_name=user_id)
+            if legacy:
+                result = await session.execute(
+                    select(func.max(FantasyTeam.fantasy_team_id))
+                )
+                fantasyTeam.fantasy_team_id = (result.scalar() or 0) + 1
+            session.add(fantasyTeam)
+            await session.flush()
+            session.add(
+                PlayerAuthorized(
+                    player_id=user_id, fantasy_team_id=fantasyTeam.fantasy_team_id
+                )
+            )
+            await session.commit()
+            return True
+        except IntegrityError:
+            await session.rollback()
+            return False
+
+
+async def main():
+    parser = generatorParser(description=__doc__.splitlines()[0])
+    parser.set_defaults(seasons=1)
+    parser.add_argument("--joins", type=int, default=100)
+    parser.add_argument("--connections", type=int, default=20)
+    parser.add_argument("--legacy", action="store_true", help="use max(id) + 1")
+    args = parser.parse_args()
+
+    load_dotenv()
+    engine = create_async_engine(
+        asyncUrl(os.getenv("DATABASE_URL")),
+        pool_size=args.connections,
+        max_overflow=0,
+        connect_args={"server_settings": {"search_path": SCHEMA}},
+    )
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+    rows = Generator(args).generate()
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(insertRows, rows)
+        async with async_session() as session:
+            league = League(
+                league_name="Concurrency check",
+                team_limit=args.joins,
+                team_starts=3,
+                offseason=True,
+                is_fim=False,
+                year=2025,
+                discord_channel="0",
+                team_size_limit=3,
+            )
+            session.add(league)
+            await session.commit()
+
+        start = asyncio.Event()
+        tasks = [
+            asyncio.create_task(
+                joinDraft(async_session, start, league.league_id, str(i), args.legacy)
+            )
+            for i in range(args.joins)
+        ]
+        start.set()
+        results = await asyncio.gather(*tasks)
+
+        async with async_session() as session:
+            teams, distinctIds = (
+                await session.execute(
+                    select(
+                        func.count(),
+                        func.count(FantasyTeam.fantasy_team_id.distinct()),
+                    ).where(FantasyTeam.league_id == league.league_id)
+                )
+            ).one()
+        collisions = results.count(False)
+        print(
+            f"{args.joins} joins: {results.count(True)} succeeded, "
+            f"{collisions} collided; {teams} fantasy teams, {distinctIds} distinct ids"
+        )
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await engine.dispose()
+    return 1 if collisions or teams != args.joins else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,654 @@
+"""Fill a database with deterministic synthetic seasons for benchmarks.
+
+Generates FiM-sized seasons (about 550 teams and 40 events a year) with
+leagues, drafts, lineups, weekly scores, waivers, trades and Statbotics EPAs
+shaped like production data. The same seed and options always produce the
+same rows, on SQLite or Postgres. The last season is in progress: its week
+``--current-week`` is active, later events are unscored and a few drafts are
+still open. Run from the repository root:
+
+    python -m scripts.generate_synthetic_data --seasons 3 --leagues 50
+    python -m scripts.generate_synthetic_data --url "$DATABASE_URL" \\
+        --schema synthetic --reset
+
+Rows are inserted with explicit ids, so target an empty database or schema
+(``--reset`` drops and recreates every table first).
+"""
+
+import argparse
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+from itertools import count
+
+from sqlalchemy import create_engine, insert, text
+
+from models.base import Base
+from models.draft import Draft, DraftOrder, DraftPick, DraftPool, StatboticsData
+from models.scores import (
+    FantasyScores,
+    FantasyTeam,
+    FRCEvent,
+    League,
+    PlayerAuthorized,
+    Team,
+    TeamOwned,
+    TeamScore,
+    TeamStarted,
+    WeekStatus,
+    team_number_sort_key,
+)
+from models.transactions import (
+    TeamOnWaivers,
+    TradeProposal,
+    TradeTeams,
+    WaiverClaim,
+    WaiverPriority,
+)
+from models.users import Player
+from utils.draftlayout import SERPENTINE, draftPickRows
+from utils.lineup import (
+    STATESLOCKED,
+    STATESWEEK,
+    fimScoresKey,
+    lineupWeek,
+    rankPoints,
+    seasonKey,
+    statesKey,
+    statesLockedPoints,
+)
+
+# parents before children
+INSERT_ORDER = [
+    Team,
+    FRCEvent,
+    TeamScore,
+    StatboticsData,
+    WeekStatus,
+    Player,
+    League,
+    FantasyTeam,
+    PlayerAuthorized,
+    WaiverPriority,
+    Draft,
+    DraftOrder,
+    DraftPick,
+    DraftPool,
+    TeamOwned,
+    TeamStarted,
+    FantasyScores,
+    TeamOnWaivers,
+    WaiverClaim,
+    TradeProposal,
+    TradeTeams,
+]
+# tables whose ids are generated by the database; their sequences are
+# moved past the explicit ids inserted here
+GENERATED_IDS = [
+    ("league", "league_id"),
+    ("fantasyteam", "fantasy_team_id"),
+    ("draft", "draft_id"),
+    ("tradeproposal", "trade_id"),
+]
+BATCH_SIZE = 5000
+DISTRICT_WEEKS = 5
+EVENTS_PER_TEAM = 2
+STATES_TEAMS = 160
+ALLIANCE_PICKS = 16
+TEAM_STARTS = 3
+OPEN_DRAFT_EVERY = 10  # one in ten of the current season's drafts is unfinished
+CHANNEL_BASE = 1_100_000_000_000_000_000
+USER_BASE = 400_000_000_000_000_000
+
+PLACES = [
+    "Ann Arbor",
+    "Alpena",
+    "Battle Creek",
+    "Detroit",
+    "Escanaba",
+    "Flint",
+    "Grand Rapids",
+    "Holland",
+    "Jackson",
+    "Kalamazoo",
+    "Lansing",
+    "Livonia",
+    "Marquette",
+    "Midland",
+    "Muskegon",
+    "Novi",
+    "Saginaw",
+    "Sterling Heights",
+    "Traverse City",
+    "Troy",
+]
+NAME_WORDS = [
+    "Robotics",
+    "Gearheads",
+    "Titans",
+    "Dragons",
+    "Voltage",
+    "Falcons",
+    "Circuit Breakers",
+    "Knights",
+    "Thunder",
+    "Cyber Eagles",
+    "Iron Wolves",
+    "Mechanical Mayhem",
+    "RoboHawks",
+    "Chaos",
+    "Sparks",
+]
+# (award points, chance) per team per event
+AWARDS = [(5, 0.08), (8, 0.05), (10, 0.03)]
+# elimination finish of each alliance, best first
+ELIM_FINISHES = [
+    {"won_finals": True},
+    {"lost_finals": True},
+    {"lost_match_13": True},
+    {"lost_match_13": True},
+    {"lost_match_12": True},
+    {"lost_match_12": True},
+    {},
+    {},
+]
+
+
+class Generator:
+    """Builds every row up front, keyed by model, from one seeded RNG."""
+
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.rows = defaultdict(list)
+        self.leagueIds = count(1)
+        self.fantasyTeamIds = count(1)
+        self.draftIds = count(1)
+        self.tradeIds = count(1)
+        self.channels = count(CHANNEL_BASE)
+        self.lastYear = args.first_year + args.seasons - 1
+
+    def add(self, model, **row):
+        self.rows[model].append(row)
+
+    def teamName(self) -> str:
+        return f"{self.rng.choice(PLACES)} {self.rng.choice(NAME_WORDS)}"
+
+    def makeTeams(self):
+        args = self.args
+        total = args.teams + args.other_teams
+        numbers = sorted(self.rng.sample(range(1, 10_500), total))
+        fimNumbers = set(self.rng.sample(numbers, args.teams))
+        # unmade draft picks point at the "-1" placeholder team
+        self.add(
+            Team,
+            team_number="-1",
+            name="Unpicked",
+            is_fim=False,
+            rookie_year=None,
+            team_number_int=None,
+        )
+        self.teams = [str(number) for number in numbers]
+        self.fimTeams = [team for team in self.teams if int(team) in fimNumbers]
+        self.rookieYears = {}
+        for team in self.teams:
+            # newer teams have larger numbers
+            rookieYear = min(1992 + int(team) // 320, self.lastYear)
+            self.rookieYears[team] = rookieYear
+            self.add(
+                Team,
+                team_number=team,
+                name=self.teamName(),
+                is_fim=int(team) in fimNumbers,
+                rookie_year=rookieYear,
+                team_number_int=team_number_sort_key(team),
+            )
+        self.players = [
+            str(USER_BASE + index)
+            for index in range(args.leagues * args.fantasy_teams)
+        ]
+        for player in self.players:
+            self.add(Player, user_id=player, is_admin=False)
+
+    def makeStatbotics(self):
+        # the draft pool ranks teams on the previous season's EPA
+        self.epa = {}
+        skill = {team: self.rng.gauss(0, 1) for team in self.teams}
+        rated = self.rng.sample(self.teams, min(self.args.statbotics, len(self.teams)))
+        for year in range(self.args.first_year - 1, self.lastYear + 1):
+            for team in sorted(rated):
+                epa = max(1, round(30 + 12 * skill[team] + self.rng.gauss(0, 4)))
+                self.epa[(team, year)] = epa
+                self.add(StatboticsData, team_number=team, year=year, year_end_epa=epa)
+
+    def isScored(self, year: int, week: int) -> bool:
+        return year < self.lastYear or week < self.args.current_week
+
+    def makeEvents(self, year: int):
+        """Events and registrations; returns team -> {lineup week: event_key}."""
+        self.add(
+            FRCEvent,
+            event_key=seasonKey(year),
+            event_name=f"{year} FIM Season",
+            year=year,
+            week=0,
+            is_fim=True,
+        )
+        districtEvents = []
+        for index in range(self.args.events - 1):
+            week = index % DISTRICT_WEEKS + 1
+            eventKey = f"{year}mi{index:03d}"
+            districtEvents.append((eventKey, week))
+            self.add(
+                FRCEvent,
+                event_key=eventKey,
+                event_name=f"FIM District {self.rng.choice(PLACES)} Event",
+                year=year,
+                week=week,
+                is_fim=True,
+            )
+        # States is played the week after the last district week, but
+        # lineupWeek starts its teams in a week of their own
+        states = statesKey(year)
+        self.add(
+            FRCEvent,
+            event_key=states,
+            event_name="FIM State Championship",
+            year=year,
+            week=DISTRICT_WEEKS + 1,
+            is_fim=True,
+        )
+
+        schedule = defaultdict(dict)
+        registrations = defaultdict(list)
+        for team in self.fimTeams:
+            weeks = self.rng.sample(range(1, DISTRICT_WEEKS + 1), EVENTS_PER_TEAM)
+            for week in weeks:
+                eventKey = self.rng.choice(
+                    [key for key, eventWeek in districtEvents if eventWeek == week]
+                )
+                schedule[team][lineupWeek(eventKey, week, year)] = eventKey
+                registrations[eventKey].append(team)
+        qualified = min(STATES_TEAMS, len(self.fimTeams))
+        for team in self.rng.sample(self.fimTeams, qualified):
+            schedule[team][STATESWEEK] = states
+            registrations[states].append(team)
+
+        self.points = {}
+        weeks = {key: lineupWeek(key, week, year) for key, week in districtEvents}
+        weeks[states] = STATESWEEK
+        for eventKey in sorted(registrations):
+            self.scoreEvent(year, eventKey, weeks[eventKey], registrations[eventKey])
+        self.districtEvents = [key for key, _ in districtEvents]
+        return schedule
+
+    def scoreEvent(self, year: int, eventKey: str, week: int, teams: list):
+        if not self.isScored(year, week):
+            for team in teams:
+                self.add(
+                    TeamScore,
+                    team_key=team,
+                    event_key=eventKey,
+                    qual_points=0,
+                    alliance_points=0,
+                    elim_points=0,
+                    award_points=0,
+                    rookie_points=0,
+                    stat_correction=0,
+                    event_finished=False,
+                )
+                self.points[(team, eventKey)] = 0
+            return
+        # stronger teams rank better, with plenty of noise
+        ranked = sorted(
+            teams,
+            key=lambda team: -self.epa.get((team, year), 20) + self.rng.gauss(0, 10),
+        )
+        picks = {team: pick for pick, team in enumerate(ranked[:ALLIANCE_PICKS], 1)}
+        for rank, team in enumerate(ranked, 1):
+            score = TeamScore(team_key=team, event_key=eventKey, stat_correction=0)
+            score.update_qualification_points(rank, len(ranked))
+            score.update_alliance_points(picks.get(team))
+            alliance = (picks[team] - 1) % len(ELIM_FINISHES) if team in picks else None
+            score.update_elim_points(
+                **(ELIM_FINISHES[alliance] if alliance is not None else {})
+            )
+            score.award_points = 0
+            for points, chance in AWARDS:
+                if self.rng.random() < chance:
+                    score.award_points = points
+            score.rookie_points = 0
+            if eventKey != statesKey(year):
+                if self.rookieYears[team] == year:
+                    score.rookie_points = 5
+                elif self.rookieYears[team] == year - 1:
+                    score.rookie_points = 2
+            self.points[(team, eventKey)] = score.score_team()
+            self.add(
+                TeamScore,
+                team_key=team,
+                event_key=eventKey,
+                qual_points=score.qual_points,
+                alliance_points=score.alliance_points,
+                elim_points=score.elim_points,
+                award_points=score.award_points,
+                rookie_points=score.rookie_points,
+                stat_correction=0,
+                event_finished=True,
+            )
+
+    def makeWeekStatus(self, year: int):
+        for week in range(1, STATESWEEK + 1):
+            done = self.isScored(year, week)
+            self.add(
+                WeekStatus,
+                year=year,
+                week=week,
+                lineups_locked=done,
+                scores_finalized=done,
+                active=year == self.lastYear and week == self.args.current_week,
+            )
+
+    def makeLeague(self, year: int, index: int, schedule: dict):
+        args = self.args
+        current = year == self.lastYear
+        # every fifth league drafts from a single event instead of all of FiM
+        isFim = index % 5 != 4
+        league_id = next(self.leagueIds)
+        self.add(
+            League,
+            league_id=league_id,
+            league_name=f"Synthetic League {year}-{index + 1}",
+            offseason=False,
+            team_limit=args.fantasy_teams,
+            team_starts=TEAM_STARTS,
+            is_fim=isFim,
+            year=year,
+            active=current,
+            discord_channel=str(next(self.channels)),
+            team_size_limit=args.rounds,
+        )
+        fantasyTeams = []
+        for slot, player in enumerate(
+            self.rng.sample(self.players, args.fantasy_teams), 1
+        ):
+            fantasy_team_id = next(self.fantasyTeamIds)
+            fantasyTeams.append(fantasy_team_id)
+            self.add(
+                FantasyTeam,
+                fantasy_team_id=fantasy_team_id,
+                fantasy_team_name=f"Fantasy Team {fantasy_team_id}",
+                league_id=league_id,
+            )
+            self.add(
+                PlayerAuthorized, player_id=player, fantasy_team_id=fantasy_team_id
+            )
+            self.add(
+                WaiverPriority,
+                league_id=league_id,
+                priority=slot,
+                fantasy_team_id=fantasy_team_id,
+            )
+
+        rosters = {}
+        for draftIndex in range(args.drafts):
+            if draftIndex > 0:
+                eventKey = statesKey(year)
+            elif isFim:
+                eventKey = seasonKey(year)
+            else:
+                eventKey = self.rng.choice(self.districtEvents)
+            if isFim and draftIndex == 0:
+                eligible = [team for team in self.fimTeams if schedule.get(team)]
+            else:
+                eligible = [
+                    team
+                    for team in self.fimTeams
+                    if eventKey in schedule.get(team, {}).values()
+                ]
+            picks = self.makeDraft(league_id, year, eventKey, fantasyTeams, eligible)
+            if draftIndex == 0:
+                rosters = picks
+                for fantasy_team_id, teams in picks.items():
+                    for team in teams:
+                        self.add(
+                            TeamOwned,
+                            team_key=team,
+                            fantasy_team_id=fantasy_team_id,
+                            league_id=league_id,
+                            draft_id=self.lastDraftId,
+                        )
+
+        self.makeLineups(league_id, year, rosters, schedule)
+        if current:
+            self.makeTransactions(league_id, year, rosters)
+
+    def makeDraft(self, league_id, year, eventKey, fantasyTeams, eligible):
+        """Draft rows; returns fantasy_team_id -> teams picked."""
+        args = self.args
+        draft_id = self.lastDraftId = next(self.draftIds)
+        self.add(
+            Draft,
+            draft_id=draft_id,
+            league_id=league_id,
+            event_key=eventKey,
+            discord_channel=str(next(self.channels)),
+            rounds=args.rounds,
+        )
+        slots = self.rng.sample(fantasyTeams, len(fantasyTeams))
+        slotTeams = dict(enumerate(slots, 1))
+        for slot, fantasy_team_id in slotTeams.items():
+            self.add(
+                DraftOrder,
+                fantasy_team_id=fantasy_team_id,
+                draft_id=draft_id,
+                draft_slot=slot,
+            )
+
+        # managers take the best previous-season EPA, give or take
+        epaYear = year - 1
+        board = sorted(
+            eligible,
+            key=lambda team: -self.epa.get((team, epaYear), 0) + self.rng.gauss(0, 6),
+        )
+        pickRows = draftPickRows(draft_id, slotTeams, args.rounds, SERPENTINE)
+        made = len(pickRows)
+        if year == self.lastYear and draft_id % OPEN_DRAFT_EVERY == 0:
+            made = self.rng.randrange(len(pickRows))
+        picked = defaultdict(list)
+        for index, row in enumerate(pickRows):
+            if index < made and index < len(board):
+                row["team_number"] = board[index]
+                picked[row["fantasy_team_id"]].append(board[index])
+            self.add(DraftPick, **row)
+
+        drafted = {team for teams in picked.values() for team in teams}
+        for team in sorted(eligible):
+            self.add(
+                DraftPool,
+                draft_id=draft_id,
+                team_number=team,
+                year_end_epa=self.epa.get((team, epaYear)),
+                is_picked=team in drafted,
+                team_number_int=team_number_sort_key(team),
+            )
+        return picked
+
+    def makeLineups(self, league_id, year, rosters, schedule):
+        args = self.args
+        lastWeek = STATESWEEK if year < self.lastYear else args.current_week
+        seasonPoints = defaultdict(float)
+        for week in range(1, lastWeek + 1):
+            weekly = {}
+            for fantasy_team_id, roster in sorted(rosters.items()):
+                playing = [team for team in roster if week in schedule.get(team, {})]
+                started = self.rng.sample(playing, min(args.starts, len(playing)))
+                for team in started:
+                    self.add(
+                        TeamStarted,
+                        fantasy_team_id=fantasy_team_id,
+                        team_number=team,
+                        league_id=league_id,
+                        event_key=schedule[team][week],
+                        week=week,
+                    )
+                weekly[fantasy_team_id] = sum(
+                    self.points[(team, schedule[team][week])] for team in started
+                )
+            if not self.isScored(year, week):
+                continue
+            # rank points as the admin scoring command assigns them
+            ranked = sorted(weekly, key=weekly.get, reverse=True)
+            rankPointsOf = {}
+            if week == STATESWEEK:
+                locked = sorted(
+                    ranked, key=lambda team: seasonPoints[team], reverse=True
+                )[:STATESLOCKED]
+                for place, fantasy_team_id in enumerate(locked):
+                    rankPointsOf[fantasy_team_id] = statesLockedPoints(place)
+                ranked = [team for team in ranked if team not in rankPointsOf]
+            points = rankPoints(
+                [weekly[team] for team in ranked], len(weekly), len(rankPointsOf)
+            )
+            rankPointsOf.update(zip(ranked, points))
+            for fantasy_team_id, rank_points in rankPointsOf.items():
+                seasonPoints[fantasy_team_id] += rank_points
+                self.add(
+                    FantasyScores,
+                    league_id=league_id,
+                    fantasy_team_id=fantasy_team_id,
+                    week=week,
+                    event_key=fimScoresKey(year),
+                    rank_points=float(rank_points),
+                    weekly_score=weekly[fantasy_team_id],
+                )
+
+    def makeTransactions(self, league_id, year, rosters):
+        args = self.args
+        owned = {team for teams in rosters.values() for team in teams}
+        freeAgents = [team for team in self.fimTeams if team not in owned]
+        onWaivers = self.rng.sample(freeAgents, min(args.waivers, len(freeAgents)))
+        for team in onWaivers:
+            self.add(TeamOnWaivers, league_id=league_id, team_number=team)
+
+        withRosters = sorted(team for team, roster in rosters.items() if roster)
+        priorities = defaultdict(int)
+        for _ in range(args.claims if onWaivers and withRosters else 0):
+            fantasy_team_id = self.rng.choice(withRosters)
+            priorities[fantasy_team_id] += 1
+            self.add(
+                WaiverClaim,
+                fantasy_team_id=fantasy_team_id,
+                league_id=league_id,
+                team_claimed=self.rng.choice(onWaivers),
+                team_to_drop=self.rng.choice(rosters[fantasy_team_id]),
+                priority=priorities[fantasy_team_id],
+            )
+
+        if len(withRosters) < 2:
+            return
+        created = datetime(year, 3, 1) + timedelta(weeks=args.current_week)
+        for _ in range(args.trades):
+            proposer, proposedTo = self.rng.sample(withRosters, 2)
+            trade_id = next(self.tradeIds)
+            self.add(
+                TradeProposal,
+                trade_id=trade_id,
+                league_id=league_id,
+                proposer_team_id=proposer,
+                proposed_to_team_id=proposedTo,
+                expiration=created + timedelta(days=1),
+                created_at=created,
+            )
+            for fantasy_team_id, offered in ((proposer, True), (proposedTo, False)):
+                roster = rosters[fantasy_team_id]
+                for team in self.rng.sample(roster, min(len(roster), 2)):
+                    self.add(
+                        TradeTeams, trade_id=trade_id, team_key=team, is_offered=offered
+                    )
+
+    def generate(self):
+        self.makeTeams()
+        self.makeStatbotics()
+        for year in range(self.args.first_year, self.lastYear + 1):
+            schedule = self.makeEvents(year)
+            self.makeWeekStatus(year)
+            for index in range(self.args.leagues):
+                self.makeLeague(year, index, schedule)
+        return self.rows
+
+
+def databaseUrl(url: str) -> str:
+    # SQLAlchemy only accepts the postgresql:// spelling
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql://", 1)
+    return url
+
+
+def generatorParser(**kwargs) -> argparse.ArgumentParser:
+    """Parser for the generator's options, shared by the benchmark scripts."""
+    parser = argparse.ArgumentParser(**kwargs)
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--seasons", type=int, default=3)
+    parser.add_argument("--first-year", type=int, default=2023)
+    parser.add_argument("--current-week", type=int, default=3, help="of last season")
+    parser.add_argument("--teams", type=int, default=550, help="FiM teams")
+    parser.add_argument("--other-teams", type=int, default=150, help="non-FiM teams")
+    parser.add_argument("--events", type=int, default=40, help="per season")
+    parser.add_argument("--statbotics", type=int, default=700, help="teams rated")
+    parser.add_argument("--leagues", type=int, default=20, help="per season")
+    parser.add_argument("--fantasy-teams", type=int, default=8, help="per league")
+    parser.add_argument("--drafts", type=int, default=1, help="per league")
+    parser.add_argument("--rounds", type=int, default=6, help="per draft")
+    parser.add_argument("--starts", type=int, default=TEAM_STARTS, help="per week")
+    parser.add_argument("--waivers", type=int, default=10, help="per active league")
+    parser.add_argument("--claims", type=int, default=4, help="per active league")
+    parser.add_argument("--trades", type=int, default=3, help="per active league")
+    return parser
+
+
+def insertRows(conn, rows: dict):
+    """Insert generated rows into existing tables; returns (table, count) pairs."""
+    counts = []
+    for model in INSERT_ORDER:
+        modelRows = rows[model]
+        for start in range(0, len(modelRows), BATCH_SIZE):
+            conn.execute(insert(model), modelRows[start : start + BATCH_SIZE])
+        counts.append((model.__tablename__, len(modelRows)))
+    if conn.dialect.name == "postgresql":
+        for table, column in GENERATED_IDS:
+            conn.execute(
+                text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', '{column}'),"
+                    f" max({column})) FROM {table}"
+                )
+            )
+    return counts
+
+
+def main():
+    parser = generatorParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="sqlite:///synthetic.db")
+    parser.add_argument("--schema", help="Postgres schema to fill instead of public")
+    parser.add_argument("--reset", action="store_true", help="drop tables first")
+    args = parser.parse_args()
+
+    rows = Generator(args).generate()
+
+    url = databaseUrl(args.url)
+    connect_args = {}
+    if args.schema:
+        connect_args["options"] = f"-csearch_path={args.schema}"
+    engine = create_engine(url, connect_args=connect_args)
+    with engine.begin() as conn:
+        if args.schema:
+            conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {args.schema}"))
+        if args.reset:
+            Base.metadata.drop_all(conn)
+        Base.metadata.create_all(conn)
+        for table, rowCount in insertRows(conn, rows):
+            print(f"{table:<16s}{rowCount:>10d}")
+
+
+if __name__ == "__main__":
+    main()
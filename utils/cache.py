@@ -0,0 +1,53 @@
+import time
+
+MISSING = object()
+
+
+class TTLCache:
+    """Small in-process cache whose entries expire after ``ttl`` seconds.
+
+    ``None`` is a valid cached value (e.g. "this channel has no league"), so
+    lookups return MISSING on a miss. Hits and misses are counted to show how
+    many round trips the cache saves.
+    """
+
+    def __init__(self, name: str, ttl: float):
+        self.name = name
+        self.ttl = ttl
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        if entry is not None:
+            del self.entries[key]
+        self.misses += 1
+        return MISSING
+
+    def set(self, key, value):
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        return value
+
+    def invalidate(self, key=MISSING):
+        if key is MISSING:
+            self.entries.clear()
+        else:
+            self.entries.pop(key, None)
+
+    def invalidateWhere(self, predicate):
+        for key in [key for key in self.entries if predicate(key)]:
+            del self.entries[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
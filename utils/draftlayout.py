@@ -0,0 +1,54 @@
+import numpy as np
+
+SERPENTINE = "serpentine"
+LINEAR = "linear"
+THIRD_ROUND_REVERSAL = "third_round_reversal"
+ORDER_TYPES = (SERPENTINE, LINEAR, THIRD_ROUND_REVERSAL)
+
+
+def reversedRounds(rounds: int, orderType: str) -> np.ndarray:
+    """Which rounds run from the last draft slot back to the first."""
+    round_index = np.arange(rounds)
+    if orderType == LINEAR:
+        return np.zeros(rounds, dtype=bool)
+    if orderType == SERPENTINE:
+        return round_index % 2 == 1
+    if orderType == THIRD_ROUND_REVERSAL:
+        # rounds 2 and 3 both run backwards, then it snakes again
+        return np.where(round_index < 2, round_index % 2 == 1, round_index % 2 == 0)
+    raise ValueError(f"Unknown draft order type {orderType}")
+
+
+def pickGrid(numSlots: int, rounds: int, orderType: str = SERPENTINE) -> np.ndarray:
+    """Draft slot (1-based) making each pick, as a (rounds, numSlots) array.
+
+    Pick number is ``round * numSlots + column + 1``.
+    """
+    forward = np.arange(1, numSlots + 1)
+    return np.where(
+        reversedRounds(rounds, orderType)[:, None], forward[::-1], forward
+    )
+
+
+def draftPickRows(
+    draft_id: int, slotTeams: dict, rounds: int, orderType: str = SERPENTINE
+) -> list[dict]:
+    """Unmade DraftPick rows for every pick of a draft, ready for one INSERT.
+
+    ``slotTeams`` maps draft_slot to fantasy_team_id.
+    """
+    slots = np.array(sorted(slotTeams))
+    teams = np.array([slotTeams[slot] for slot in slots])
+    grid = pickGrid(len(slots), rounds, orderType)
+    # draft slots need not be contiguous, so map them through their position
+    fantasyTeams = teams[grid.ravel() - 1]
+    pickNumbers = np.arange(1, grid.size + 1)
+    return [
+        {
+            "draft_id": draft_id,
+            "fantasy_team_id": int(fantasy_team_id),
+            "pick_number": int(pick_number),
+            "team_number": "-1",
+        }
+        for fantasy_team_id, pick_number in zip(fantasyTeams, pickNumbers)
+    ]
@@ -0,0 +1,290 @@
+import asyncio
+import logging
+
+from sqlalchemy import delete, exists, insert, literal, select
+
+from models.draft import Draft, DraftPick, DraftPool, DraftQueue, StatboticsData
+from models.scores import FRCEvent, League, Team, TeamScore
+from utils.projections import projectRows, registrationsQuery
+
+logger = logging.getLogger("discord")
+
+
+class DraftPickConflict(Exception):
+    """A pick lost a race with another pick or no longer matches the draft."""
+
+
+class DraftState:
+    """In-memory view of a live draft.
+
+    Picks are held in pick order with a pointer at the first unmade pick, so
+    every turn check, pick validation and pick update is O(1). The available
+    list is ordered by projected points (then EPA) once at load time and
+    consumed from the front as teams go off the board.
+    """
+
+    def __init__(
+        self, draft: Draft, league: League, picks, eligible, epaRanking, queues=()
+    ):
+        self.draft_id = draft.draft_id
+        self.event_key = draft.event_key
+        self.discord_channel = draft.discord_channel
+        self.rounds = draft.rounds
+        self.league_id = league.league_id
+        self.year = league.year
+        self.is_fim = league.is_fim
+        self.offseason = league.offseason
+        # [pick_number, fantasy_team_id, team_number] ordered by pick_number
+        self.picks = [list(pick) for pick in picks]
+        self.picked = {pick[2] for pick in self.picks if pick[2] != "-1"}
+        self.eligible = set(eligible)
+        # (team_number, epa, projected points), best first
+        self.epaRanking = list(epaRanking)
+        self.pickIndex = 0
+        self.rankingIndex = 0
+        # fantasy_team_id -> [team_number, ...] and a cursor past picked entries
+        self.queues = {}
+        self.queueIndex = {}
+        for fantasy_team_id, team_number in queues:
+            self.queues.setdefault(fantasy_team_id, []).append(team_number)
+        self.advance()
+
+    def advance(self):
+        while (
+            self.pickIndex < len(self.picks) and self.picks[self.pickIndex][2] != "-1"
+        ):
+            self.pickIndex += 1
+        while (
+            self.rankingIndex < len(self.epaRanking)
+            and self.epaRanking[self.rankingIndex][0] in self.picked
+        ):
+            self.rankingIndex += 1
+
+    @property
+    def picksMade(self) -> int:
+        return len(self.picked)
+
+    def isComplete(self) -> bool:
+        return self.pickIndex >= len(self.picks)
+
+    def currentPickNumber(self) -> int:
+        if self.isComplete():
+            return -1
+        return self.picks[self.pickIndex][0]
+
+    def currentFantasyTeamId(self) -> int:
+        if self.isComplete():
+            return -1
+        return self.picks[self.pickIndex][1]
+
+    def isUnpicked(self, team_number: str) -> bool:
+        return team_number not in self.picked
+
+    def isEligible(self, team_number: str) -> bool:
+        return team_number in self.eligible
+
+    def bestAvailable(self, count: int = 1):
+        teams = []
+        index = self.rankingIndex
+        while len(teams) < count and index < len(self.epaRanking):
+            if self.epaRanking[index][0] not in self.picked:
+                teams.append(self.epaRanking[index])
+            index += 1
+        return teams
+
+    def setQueue(self, fantasy_team_id: int, teams):
+        self.queues[fantasy_team_id] = list(teams)
+        self.queueIndex[fantasy_team_id] = 0
+
+    def getQueue(self, fantasy_team_id: int):
+        return [
+            team
+            for team in self.queues.get(fantasy_team_id, [])
+            if team not in self.picked
+        ]
+
+    def nextQueuedTeam(self, fantasy_team_id: int):
+        queue = self.queues.get(fantasy_team_id)
+        if not queue:
+            return None
+        index = self.queueIndex.get(fantasy_team_id, 0)
+        # picked teams never come back, so the cursor only moves forward
+        while index < len(queue) and queue[index] in self.picked:
+            index += 1
+        self.queueIndex[fantasy_team_id] = index
+        if index < len(queue):
+            return queue[index]
+        return None
+
+    def autoPickTeam(self, fantasy_team_id: int):
+        """First available team in the team's queue, else best projected team."""
+        team_number = self.nextQueuedTeam(fantasy_team_id)
+        if team_number is not None:
+            return team_number
+        suggestedTeams = self.bestAvailable()
+        if suggestedTeams:
+            return suggestedTeams[0][0]
+        return None
+
+    def recordPick(self, pick_number: int, team_number: str):
+        if pick_number != self.currentPickNumber():
+            raise ValueError(
+                f"Draft {self.draft_id} expected pick {self.currentPickNumber()}, got {pick_number}"
+            )
+        self.picks[self.pickIndex][2] = team_number
+        self.picked.add(team_number)
+        self.advance()
+
+
+async def getDraftAndLeague(session, draft_id: int):
+    result = await session.execute(
+        select(Draft, League)
+        .join(League, Draft.league_id == League.league_id)
+        .where(Draft.draft_id == draft_id)
+    )
+    return result.first()
+
+
+async def buildDraftPool(session, draft_id: int):
+    """(Re)materialize the draft_pool rows for a draft in one INSERT ... SELECT.
+
+    FiM drafts draw from every FiM team registered for an event that year,
+    other drafts from the teams registered at the draft event. EPA comes from
+    the previous season, or the current one for offseason drafts. The caller
+    commits.
+    """
+    row = await getDraftAndLeague(session, draft_id)
+    if row is None:
+        return
+    draft, league = row
+    if league.is_fim:
+        eligible = (
+            select(Team.team_number.label("team_number"), Team.team_number_int)
+            .distinct()
+            .join(TeamScore, Team.team_number == TeamScore.team_key)
+            .join(FRCEvent, TeamScore.event_key == FRCEvent.event_key)
+            .where(Team.is_fim, FRCEvent.year == league.year)
+        )
+    else:
+        eligible = (
+            select(TeamScore.team_key.label("team_number"), Team.team_number_int)
+            .distinct()
+            .join(Team, Team.team_number == TeamScore.team_key)
+            .where(TeamScore.event_key == draft.event_key)
+        )
+    eligible = eligible.subquery()
+    epaYear = league.year if league.offseason else league.year - 1
+    picked = exists().where(
+        DraftPick.draft_id == draft_id,
+        DraftPick.team_number == eligible.c.team_number,
+    )
+    await session.execute(delete(DraftPool).where(DraftPool.draft_id == draft_id))
+    await session.execute(
+        insert(DraftPool).from_select(
+            [
+                "draft_id",
+                "team_number",
+                "year_end_epa",
+                "is_picked",
+                "team_number_int",
+            ],
+            select(
+                literal(draft_id),
+                eligible.c.team_number,
+                StatboticsData.year_end_epa,
+                picked,
+                eligible.c.team_number_int,
+            ).outerjoin(
+                StatboticsData,
+                (StatboticsData.team_number == eligible.c.team_number)
+                & (StatboticsData.year == epaYear),
+            ),
+        )
+    )
+
+
+async def loadDraftState(session, draft_id: int) -> DraftState:
+    row = await getDraftAndLeague(session, draft_id)
+    if row is None:
+        return None
+    draft, league = row
+
+    result = await session.execute(
+        select(DraftPick.pick_number, DraftPick.fantasy_team_id, DraftPick.team_number)
+        .where(DraftPick.draft_id == draft_id)
+        .order_by(DraftPick.pick_number.asc())
+    )
+    picks = result.all()
+
+    poolStmt = (
+        select(DraftPool.team_number, DraftPool.year_end_epa)
+        .where(DraftPool.draft_id == draft_id)
+        .order_by(DraftPool.year_end_epa.desc().nulls_last())
+    )
+    pool = (await session.execute(poolStmt)).all()
+    if not pool:
+        # drafts created before draft_pool existed
+        await buildDraftPool(session, draft_id)
+        await session.commit()
+        pool = (await session.execute(poolStmt)).all()
+
+    eligible = [team_number for team_number, _ in pool]
+    epaYear = league.year if league.offseason else league.year - 1
+    result = await session.execute(
+        registrationsQuery(
+            league.year, epaYear, None if league.is_fim else draft.event_key
+        )
+    )
+    _, projected = projectRows(result.all(), league.year, league.offseason)
+    epaRanking = sorted(
+        ((team, epa, projected.get(team, 0.0)) for team, epa in pool),
+        key=lambda entry: (entry[2], entry[1] or 0),
+        reverse=True,
+    )
+
+    result = await session.execute(
+        select(DraftQueue.fantasy_team_id, DraftQueue.team_number)
+        .where(DraftQueue.draft_id == draft_id)
+        .order_by(DraftQueue.fantasy_team_id.asc(), DraftQueue.position.asc())
+    )
+    queues = result.all()
+    return DraftState(draft, league, picks, eligible, epaRanking, queues)
+
+
+class DraftStateManager:
+    """Keeps one DraftState per draft for the life of the bot process."""
+
+    def __init__(self, sessionmaker):
+        self.sessionmaker = sessionmaker
+        self.states = {}
+        self.loadLocks = {}
+
+    async def get(self, draft_id: int) -> DraftState:
+        state = self.states.get(draft_id)
+        if state is not None:
+            return state
+        lock = self.loadLocks.setdefault(draft_id, asyncio.Lock())
+        async with lock:
+            state = self.states.get(draft_id)
+            if state is None:
+                async with self.sessionmaker() as session:
+                    state = await loadDraftState(session, draft_id)
+                if state is not None:
+                    self.states[draft_id] = state
+        return state
+
+    async def reload(self, draft_id: int) -> DraftState:
+        logger.info(f"Reloading draft state for draft {draft_id}")
+        self.invalidate(draft_id)
+        return await self.get(draft_id)
+
+    def invalidate(self, draft_id: int = None):
+        if draft_id is None:
+            self.states.clear()
+        else:
+            self.states.pop(draft_id, None)
+
+    def invalidateEvent(self, event_key: str):
+        for draft_id, state in list(self.states.items()):
+            if state.event_key == event_key or state.is_fim:
+                self.states.pop(draft_id, None)
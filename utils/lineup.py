@@ -0,0 +1,366 @@
+import numpy as np
+from scipy.optimize import Bounds, LinearConstraint, milp
+from sqlalchemy import func, select
+
+from models.scores import (
+    FantasyTeam,
+    FRCEvent,
+    League,
+    TeamOwned,
+    TeamScore,
+    TeamStarted,
+    WeekStatus,
+)
+from utils.projections import projectRows, registrationsQuery
+
+STATESWEEK = 7
+STATESEXTRA = 1
+MAXSTARTS = 2
+# teams whose season standing is locked in at States
+STATESLOCKED = 3
+
+
+def seasonKey(year) -> str:
+    """Key of the whole-FiM season event."""
+    return f"{year}fim"
+
+
+def fimScoresKey(year) -> str:
+    """event_key of the weekly FantasyScores rows of FiM leagues."""
+    return f"fim{year}"
+
+
+def statesKey(year) -> str:
+    """Key of the FiM State Championship."""
+    return f"{year}micmp"
+
+
+def lineupWeek(eventKey: str, eventWeek: int, year: int) -> int:
+    """Lineup week an event's teams are started in."""
+    if eventKey == statesKey(year):
+        return STATESWEEK
+    if year == 2026 and eventWeek == 6:
+        # 2026 special case: week 5 lineups also cover week 6 events
+        return 5
+    return int(eventWeek)
+
+
+def rankPoints(weeklyScores: list, teamCount: int, placed: int = 0) -> list:
+    """Rank points for weekly scores ordered best first.
+
+    The team in place ``i`` gets ``teamCount - (placed + i + 1)``, where
+    ``placed`` teams already hold the places above; tied teams share the
+    points of the first team in the tie.
+    """
+    points = []
+    for i, score in enumerate(weeklyScores):
+        if i > 0 and score == weeklyScores[i - 1]:
+            points.append(points[-1])
+        else:
+            points.append(teamCount - (placed + i + 1))
+    return points
+
+
+def statesLockedPoints(place: int) -> int:
+    """Rank points of the team in ``place`` of the locked States top three."""
+    return 100 - place * 25
+
+
+def weekSlots(week: int, teamStarts: int) -> int:
+    if week == STATESWEEK:
+        return teamStarts + STATESEXTRA
+    return teamStarts
+
+
+def optimizeLineup(candidates, slots: dict, startsLeft: dict) -> list:
+    """Pick the starts that maximize projected points under the start limits.
+
+    ``candidates`` are (team_number, week, event_key, points) for every week a
+    rostered team can be started, ``slots`` the starts allowed per week and
+    ``startsLeft`` how many pre-States starts each team has left. Weeks and
+    teams only meet through these two capacity constraints, so the LP
+    relaxation is already integral and milp solves it in milliseconds.
+    Returns the chosen candidates.
+    """
+    candidates = [c for c in candidates if c[3] > 0 and slots.get(c[1], 0) > 0]
+    if not candidates:
+        return []
+    points = np.array([c[3] for c in candidates])
+    weeks = sorted({c[1] for c in candidates})
+    teams = sorted({c[0] for c in candidates if c[1] != STATESWEEK})
+
+    rows = []
+    upper = []
+    for week in weeks:
+        rows.append([1.0 if c[1] == week else 0.0 for c in candidates])
+        upper.append(slots[week])
+    for team in teams:
+        rows.append(
+            [1.0 if c[0] == team and c[1] != STATESWEEK else 0.0 for c in candidates]
+        )
+        upper.append(max(startsLeft.get(team, MAXSTARTS), 0))
+
+    result = milp(
+        -points,
+        constraints=LinearConstraint(np.array(rows), -np.inf, np.array(upper)),
+        integrality=np.ones(len(candidates)),
+        bounds=Bounds(0, 1),
+    )
+    if result.x is None:
+        return []
+    return [c for c, chosen in zip(candidates, result.x) if chosen > 0.5]
+
+
+def lineupQueries(league, fantasyId: int) -> dict:
+    """Statements whose results feed optimizeLineupRows.
+
+    Usable from both the bot's async and the API's sync sessions.
+    """
+    owned = select(TeamOwned.team_key).where(
+        TeamOwned.league_id == league.league_id,
+        TeamOwned.fantasy_team_id == fantasyId,
+    )
+    return {
+        "owned": owned,
+        "starts": select(
+            TeamStarted.fantasy_team_id,
+            TeamStarted.team_number,
+            TeamStarted.event_key,
+            TeamStarted.week,
+        ).where(
+            TeamStarted.league_id == league.league_id,
+            TeamStarted.team_number.in_(owned.scalar_subquery()),
+        ),
+        "weeks": select(
+            WeekStatus.week, WeekStatus.lineups_locked, WeekStatus.scores_finalized
+        ).where(WeekStatus.year == league.year),
+        "registrations": registrationsQuery(league.year, league.year - 1),
+    }
+
+
+def optimizeLineupRows(league, fantasyId: int, rows: dict) -> list[dict]:
+    """Best season lineup for a fantasy team from the results of lineupQueries.
+
+    Locked or finalized weeks keep their current starts and count against
+    MAXSTARTS; every other week up to States is re-planned. Teams at more
+    than one event in a pre-States week are left out, as startTeamTask
+    refuses them. Returns one entry per week with its starts.
+    """
+    owned = {team_key for (team_key,) in rows["owned"]}
+    closedWeeks = {
+        week
+        for week, lineups_locked, scores_finalized in rows["weeks"]
+        if lineups_locked or scores_finalized
+    }
+
+    registrations = rows["registrations"]
+    projection, _ = projectRows(registrations, league.year)
+    # (team_number, week) -> [(event_key, points), ...]
+    events = {}
+    for index, row in enumerate(registrations):
+        if row.team_key not in owned:
+            continue
+        week = lineupWeek(row.event_key, row.week, league.year)
+        if week > STATESWEEK:
+            continue
+        events.setdefault((row.team_key, week), []).append(
+            (row.event_key, float(projection["total"][index]))
+        )
+
+    startsUsed = {}
+    kept = {}
+    for fantasy_team_id, team_number, event_key, week in rows["starts"]:
+        if week in closedWeeks or fantasy_team_id != fantasyId:
+            if week < STATESWEEK:
+                startsUsed[team_number] = startsUsed.get(team_number, 0) + 1
+            if fantasy_team_id == fantasyId:
+                kept.setdefault(week, []).append((team_number, event_key))
+
+    candidates = []
+    for (team_number, week), teamEvents in events.items():
+        if week in closedWeeks or (week < STATESWEEK and len(teamEvents) > 1):
+            continue
+        # States scoring counts every event the team plays that week
+        candidates.append(
+            (
+                team_number,
+                week,
+                min(teamEvents)[0],
+                sum(points for _, points in teamEvents),
+            )
+        )
+    weeks = sorted({week for _, week in events} | set(kept))
+    slots = {
+        week: weekSlots(week, league.team_starts)
+        for week in weeks
+        if week not in closedWeeks
+    }
+    startsLeft = {team: MAXSTARTS - used for team, used in startsUsed.items()}
+    chosen = optimizeLineup(candidates, slots, startsLeft)
+
+    lineup = []
+    for week in weeks:
+        if week in closedWeeks:
+            teams = [
+                {
+                    "team_number": team_number,
+                    "event_key": event_key,
+                    "projected_points": None,
+                }
+                for team_number, event_key in kept.get(week, [])
+            ]
+        else:
+            teams = [
+                {
+                    "team_number": team_number,
+                    "event_key": event_key,
+                    "projected_points": round(points, 2),
+                }
+                for team_number, chosenWeek, event_key, points in chosen
+                if chosenWeek == week
+            ]
+            teams.sort(key=lambda team: team["projected_points"], reverse=True)
+        lineup.append({"week": week, "locked": week in closedWeeks, "teams": teams})
+    return lineup
+
+
+class LineupContext:
+    """Everything startTeamTask/setLineupTask need for one fantasy team and week.
+
+    Loaded with a handful of queries up front; the start rules then run
+    against this in-memory copy and the caller writes the resulting lineup
+    in one transaction.
+    """
+
+    def __init__(
+        self, fantasyteam, league, weekStatus, week, owned, started, events, starts
+    ):
+        self.fantasyteam = fantasyteam
+        self.league = league
+        self.weekStatus = weekStatus
+        self.week = week
+        self.owned = set(owned)
+        # [(team_number, event_key), ...] currently starting this week
+        self.started = list(started)
+        # team_number -> [(event_key, event_name), ...] at FiM events this week
+        self.events = events
+        # team_number -> starts before States across the league
+        self.seasonStarts = dict(starts)
+
+    def lineupError(self):
+        """Reason this week's lineup cannot be changed at all, if any."""
+        if not self.league.is_fim:
+            return "This league does not support starts/sits."
+        if self.weekStatus and self.weekStatus.lineups_locked:
+            return "Lineups are locked for this week, you cannot modify your lineup at this time."
+        if self.league.year == 2026 and self.week == 6:
+            return "Week 6 starts for 2026 are managed under week 5 only. Please try again using week 5."
+        return None
+
+    def maxStarts(self) -> int:
+        return weekSlots(self.week, self.league.team_starts)
+
+    def clearWeek(self):
+        for team_number, _ in self.started:
+            if self.week < STATESWEEK:
+                # a started team may since have been dropped, so it has no count
+                self.seasonStarts[team_number] = (
+                    self.seasonStarts.get(team_number, 0) - 1
+                )
+        self.started = []
+
+    def startTeam(self, frcteam: str):
+        """Apply the start rules; returns (message, started event or None)."""
+        if frcteam not in self.owned:
+            return "You do not own this team.", None
+        if len(self.started) >= self.maxStarts():
+            return "Already starting max number of teams this week.", None
+        teamcompeting = self.events.get(frcteam, [])
+        if len(teamcompeting) == 0:
+            return "This team is not competing this week!", None
+        if len(teamcompeting) > 1:
+            return (
+                "Please contact a fantasy admin to start your team. They are competing at multiple FiM events this week which is a special case.",
+                None,
+            )
+        if any(team_number == frcteam for team_number, _ in self.started):
+            return "This team is already starting this week!", None
+        if (
+            not self.week == STATESWEEK
+            and self.seasonStarts.get(frcteam, 0) >= MAXSTARTS
+        ):
+            return (
+                f"This team may not be started again until States, they have reached the maximum of {MAXSTARTS}",
+                None,
+            )
+        event_key, event_name = teamcompeting[0]
+        self.started.append((frcteam, event_key))
+        if self.week < STATESWEEK:
+            self.seasonStarts[frcteam] = self.seasonStarts.get(frcteam, 0) + 1
+        return (
+            f"{self.fantasyteam.fantasy_team_name} is starting team {frcteam} competing at {event_name} in week {self.week}!",
+            event_key,
+        )
+
+
+async def loadLineupContext(session, fantasyId: int, week: int) -> LineupContext:
+    result = await session.execute(
+        select(FantasyTeam, League)
+        .join(League, FantasyTeam.league_id == League.league_id)
+        .where(FantasyTeam.fantasy_team_id == fantasyId)
+    )
+    fantasyteam, league = result.first()
+
+    result = await session.execute(
+        select(WeekStatus).where(
+            WeekStatus.year == league.year, WeekStatus.week == week
+        )
+    )
+    weekStatus = result.scalars().first()
+
+    result = await session.execute(
+        select(TeamOwned.team_key).where(
+            TeamOwned.league_id == league.league_id,
+            TeamOwned.fantasy_team_id == fantasyId,
+        )
+    )
+    owned = result.scalars().all()
+
+    result = await session.execute(
+        select(TeamStarted.team_number, TeamStarted.event_key).where(
+            TeamStarted.fantasy_team_id == fantasyId, TeamStarted.week == week
+        )
+    )
+    started = result.all()
+
+    event_weeks = [week]
+    # 2026 special case: for week 5 lineups, allow teams competing in week 6.
+    if league.year == 2026 and week == 5:
+        event_weeks.append(6)
+    result = await session.execute(
+        select(TeamScore.team_key, FRCEvent.event_key, FRCEvent.event_name)
+        .join(FRCEvent, TeamScore.event_key == FRCEvent.event_key)
+        .where(
+            TeamScore.team_key.in_(owned),
+            FRCEvent.year == league.year,
+            FRCEvent.week.in_(event_weeks),
+            FRCEvent.is_fim,
+        )
+    )
+    events = {}
+    for team_key, event_key, event_name in result.all():
+        events.setdefault(team_key, []).append((event_key, event_name))
+
+    result = await session.execute(
+        select(TeamStarted.team_number, func.count())
+        .where(
+            TeamStarted.league_id == league.league_id,
+            TeamStarted.team_number.in_(owned),
+            TeamStarted.week < STATESWEEK,
+        )
+        .group_by(TeamStarted.team_number)
+    )
+    starts = result.all()
+    return LineupContext(
+        fantasyteam, league, weekStatus, week, owned, started, events, starts
+    )
@@ -0,0 +1,137 @@
+import asyncio
+import functools
+import inspect
+import logging
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+
+logger = logging.getLogger("discord")
+
+SLOW_LOCK_WAIT = 1.0  # seconds; longer waits are logged
+
+
+class KeyedLocks:
+    """One asyncio.Lock per key, e.g. ("league", 4) or ("draft", 12).
+
+    Mutations under the same key run one at a time while different keys run
+    in parallel. Locks are re-entrant per task, so a locked task can call
+    another locked helper for the same league, and are dropped once nobody
+    holds or waits for them. Time spent waiting is recorded.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        # key -> [lock, owning task, depth, holders + waiters]
+        self.entries = {}
+        self.acquisitions = 0
+        self.contended = 0
+        self.totalWait = 0.0
+        self.maxWait = 0.0
+
+    def recordWait(self, key, wait: float):
+        self.acquisitions += 1
+        self.totalWait += wait
+        self.maxWait = max(self.maxWait, wait)
+        if wait > SLOW_LOCK_WAIT:
+            logger.warning(f"Waited {wait:.2f}s for the {self.name} lock on {key}")
+
+    def wouldWait(self, *keys) -> bool:
+        """Whether taking ``keys`` means waiting on another task.
+
+        An uncontended acquire never yields, so when this is False nothing
+        else runs between the check and holding the lock.
+        """
+        task = asyncio.current_task()
+        for key in keys:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] is not task:
+                return True
+        return False
+
+    @asynccontextmanager
+    async def hold(self, key):
+        task = asyncio.current_task()
+        entry = self.entries.get(key)
+        if entry is not None and entry[1] is task:
+            entry[2] += 1
+            try:
+                yield
+            finally:
+                entry[2] -= 1
+            return
+
+        if entry is None:
+            entry = self.entries[key] = [asyncio.Lock(), None, 0, 0]
+        entry[3] += 1
+        try:
+            if entry[0].locked():
+                self.contended += 1
+            start = time.perf_counter()
+            async with entry[0]:
+                self.recordWait(key, time.perf_counter() - start)
+                entry[1] = task
+                entry[2] = 1
+                try:
+                    yield
+                finally:
+                    entry[1] = None
+                    entry[2] = 0
+        finally:
+            entry[3] -= 1
+            if entry[3] == 0:
+                del self.entries[key]
+
+    @asynccontextmanager
+    async def holdAll(self, keys):
+        """Hold several keys at once, taken in sorted order to avoid deadlocks."""
+        async with AsyncExitStack() as stack:
+            for key in sorted(set(keys)):
+                await stack.enter_async_context(self.hold(key))
+            yield
+
+    def stats(self) -> dict:
+        acquisitions = self.acquisitions
+        return {
+            "name": self.name,
+            "held": len(self.entries),
+            "acquisitions": acquisitions,
+            "contended": self.contended,
+            "avg_wait": self.totalWait / acquisitions if acquisitions else 0.0,
+            "max_wait": self.maxWait,
+        }
+
+
+def serialized(keyOf):
+    """Run a cog method under ``bot.locks`` for the key ``keyOf`` returns.
+
+    ``keyOf(cog, arguments)`` is awaited with the method's bound arguments.
+    Only when the lock is held by another task does the interaction's
+    session commit and give its connection back to the pool before waiting,
+    so queued commands don't exhaust it. The method must validate its
+    preconditions itself, under the lock, rather than trust checks its
+    caller made before.
+    """
+
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            arguments = signature.bind(self, *args, **kwargs).arguments
+            key = await keyOf(self, arguments)
+            if self.bot.locks.wouldWait(key):
+                await self.bot.async_session.release()
+            async with self.bot.locks.hold(key):
+                return await method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+async def fantasyTeamLeague(cog, arguments):
+    return ("league", await cog.bot.getFantasyTeamLeagueId(arguments["fantasyId"]))
+
+
+async def draftOf(cog, arguments):
+    return ("draft", arguments["draft_id"])
@@ -0,0 +1,318 @@
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from urllib.parse import urlsplit
+
+import requests
+from sqlalchemy import event
+
+perfLogger = logging.getLogger("perf")
+
+# log-spaced upper bounds from 1 ms to ~46 s, two per doubling
+BUCKETS = tuple(0.001 * 2 ** (i / 2) for i in range(32))
+# response size bounds, 256 B to 8 MB
+SIZE_BUCKETS = tuple(2**i for i in range(8, 24))
+HTTP_SERVICES = {
+    "www.thebluealliance.com": "tba",
+    "api.statbotics.io": "statbotics",
+}
+
+
+class Histogram:
+    """Fixed log-spaced buckets; percentiles are read off the bucket bounds."""
+
+    def __init__(self, bounds=BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                if index == len(self.bounds):
+                    return self.max
+                return min(self.bounds[index], self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class Timing:
+    """Work done on behalf of one command, filled in by the DB and HTTP hooks."""
+
+    def __init__(self):
+        self.queries = 0
+        self.dbTime = 0.0
+        self.httpCalls = 0
+        self.httpTime = 0.0
+
+
+# Timing of the command being handled. Tasks spawned by the command share
+# the object, but only work finished before the command returns is recorded.
+currentTiming = ContextVar("currentTiming", default=None)
+
+
+class CommandStats:
+    def __init__(self):
+        self.wall = Histogram()
+        self.db = Histogram()
+        self.http = Histogram()
+        self.queries = Histogram(bounds=tuple(2**i for i in range(12)))
+        self.errors = 0
+
+    def record(self, timing: Timing, wall: float, failed: bool):
+        self.wall.observe(wall)
+        self.db.observe(timing.dbTime)
+        self.http.observe(timing.httpTime)
+        self.queries.observe(timing.queries)
+        if failed:
+            self.errors += 1
+
+    def summary(self) -> dict:
+        return {
+            "calls": self.wall.count,
+            "errors": self.errors,
+            "p50": self.wall.percentile(0.5),
+            "p95": self.wall.percentile(0.95),
+            "p99": self.wall.percentile(0.99),
+            "max": self.wall.max,
+            "avg_queries": self.queries.mean(),
+            "max_queries": self.queries.max,
+            "avg_db": self.db.mean(),
+            "avg_http": self.http.mean(),
+        }
+
+
+class PerfStats:
+    """Per-command latency, query count, DB time and HTTP time since startup.
+
+    Commands are timed by ``begin``; statements are timed by the cursor
+    events ``instrumentEngine`` installs and HTTP calls by TimedSession, both
+    charging the command whose context they run in.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.commands = {}
+        self.queries = Histogram()
+        self.services = {}
+
+    def begin(self, name: str):
+        """Start timing a command in the current context.
+
+        Returns ``finish(failed)``, which records the call; queries and HTTP
+        requests made in between are charged to it.
+        """
+        timing = Timing()
+        currentTiming.set(timing)
+        start = time.perf_counter()
+
+        def finish(failed: bool):
+            wall = time.perf_counter() - start
+            stats = self.commands.get(name)
+            if stats is None:
+                stats = self.commands[name] = CommandStats()
+            stats.record(timing, wall, failed)
+
+        return finish
+
+    def recordQuery(self, elapsed: float):
+        self.queries.observe(elapsed)
+        timing = currentTiming.get()
+        if timing is not None:
+            timing.queries += 1
+            timing.dbTime += elapsed
+
+    def recordHttp(self, service: str, elapsed: float):
+        histogram = self.services.get(service)
+        if histogram is None:
+            histogram = self.services[service] = Histogram()
+        histogram.observe(elapsed)
+        timing = currentTiming.get()
+        if timing is not None:
+            timing.httpCalls += 1
+            timing.httpTime += elapsed
+
+    def instrumentEngine(self, engine):
+        """Time every statement run on ``engine`` (a sync Engine)."""
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def beforeCursorExecute(conn, cursor, statement, params, context, many):
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def afterCursorExecute(conn, cursor, statement, params, context, many):
+            self.recordQuery(time.perf_counter() - conn.info["query_start"].pop())
+
+    def commandSummaries(self) -> list[tuple[str, dict]]:
+        """(command, summary) pairs, slowest p95 first."""
+        return sorted(
+            ((name, stats.summary()) for name, stats in self.commands.items()),
+            key=lambda item: item[1]["p95"],
+            reverse=True,
+        )
+
+    def snapshot(self) -> dict:
+        return {
+            "time": time.time(),
+            "uptime": time.time() - self.started,
+            "commands": dict(self.commandSummaries()),
+            "queries": {
+                "count": self.queries.count,
+                "p50": self.queries.percentile(0.5),
+                "p95": self.queries.percentile(0.95),
+                "max": self.queries.max,
+            },
+            "http": {
+                service: {
+                    "count": histogram.count,
+                    "p50": histogram.percentile(0.5),
+                    "p95": histogram.percentile(0.95),
+                    "max": histogram.max,
+                }
+                for service, histogram in self.services.items()
+            },
+        }
+
+    def writeLog(self):
+        perfLogger.info(json.dumps(self.snapshot(), sort_keys=True))
+
+
+perfStats = PerfStats()
+
+
+def openPerfLog(path: str):
+    """Send ``perf`` records to their own rotating file as JSON lines."""
+    handler = RotatingFileHandler(path, maxBytes=5_000_000, backupCount=3)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    perfLogger.addHandler(handler)
+    perfLogger.setLevel(logging.INFO)
+    perfLogger.propagate = False
+
+
+def promLabels(**labels) -> str:
+    escaped = (
+        str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        for value in labels.values()
+    )
+    return ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped))
+
+
+def promHistogram(name: str, endpoint: str, histogram: Histogram) -> list[str]:
+    """Prometheus exposition lines for one endpoint's histogram."""
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.bounds, histogram.counts):
+        cumulative += count
+        labels = promLabels(endpoint=endpoint, le=f"{bound:g}")
+        lines.append(f"{name}_bucket{{{labels}}} {cumulative}")
+    labels = promLabels(endpoint=endpoint, le="+Inf")
+    lines.append(f"{name}_bucket{{{labels}}} {histogram.count}")
+    labels = promLabels(endpoint=endpoint)
+    lines.append(f"{name}_sum{{{labels}}} {histogram.total}")
+    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+    return lines
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latency = Histogram()
+        self.size = Histogram(bounds=SIZE_BUCKETS)
+        self.statuses = {}
+        self.queries = 0
+        self.dbTime = 0.0
+
+
+class EndpointMetrics:
+    """Per-endpoint latency, SQL statement counts and response sizes for the API.
+
+    Latency and sizes are exported as histograms, so percentiles come from
+    histogram_quantile() on the Prometheus side. Requests on other threads
+    record concurrently, hence the lock. Numbers are per process, so every
+    worker exposes its own.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def record(self, endpoint: str, status: int, wall: float, timing, size):
+        with self.lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = EndpointStats()
+            stats.latency.observe(wall)
+            if size is not None:
+                stats.size.observe(size)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.queries += timing.queries
+            stats.dbTime += timing.dbTime
+
+    def prometheus(self) -> str:
+        """Everything recorded so far in the Prometheus text format."""
+        with self.lock:
+            endpoints = sorted(self.endpoints.items())
+            lines = [
+                "# HELP api_requests_total Requests handled, by endpoint and status.",
+                "# TYPE api_requests_total counter",
+            ]
+            for endpoint, stats in endpoints:
+                for status, count in sorted(stats.statuses.items()):
+                    labels = promLabels(endpoint=endpoint, status=status)
+                    lines.append(f"api_requests_total{{{labels}}} {count}")
+            for name, attribute, description in (
+                ("api_request_duration_seconds", "latency", "Time to respond."),
+                ("api_response_size_bytes", "size", "Response body sizes."),
+            ):
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} histogram")
+                for endpoint, stats in endpoints:
+                    lines += promHistogram(name, endpoint, getattr(stats, attribute))
+            for name, attribute, description in (
+                ("api_sql_statements_total", "queries", "SQL statements run."),
+                ("api_sql_seconds_total", "dbTime", "Time spent in SQL."),
+            ):
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} counter")
+                for endpoint, stats in endpoints:
+                    labels = promLabels(endpoint=endpoint)
+                    lines.append(f"{name}{{{labels}}} {getattr(stats, attribute)}")
+        return "\n".join(lines) + "\n"
+
+
+class TimedSession(requests.Session):
+    """requests.Session that charges each call to the current command."""
+
+    def request(self, method, url, *args, **kwargs):
+        host = urlsplit(url).hostname or ""
+        start = time.perf_counter()
+        try:
+            return super().request(method, url, *args, **kwargs)
+        finally:
+            perfStats.recordHttp(
+                HTTP_SERVICES.get(host, host), time.perf_counter() - start
+            )
+
+
+def timedGet(url, **kwargs) -> requests.Response:
+    """Timed stand-in for ``requests.get``."""
+    with TimedSession() as session:
+        return session.get(url, **kwargs)
@@ -0,0 +1,72 @@
+import asyncio
+import heapq
+import logging
+from datetime import datetime
+
+logger = logging.getLogger("discord")
+
+
+class PickClock:
+    """One scheduler for every draft's pick clock.
+
+    Deadlines live in a heap keyed by expiry time and a single task sleeps
+    until the earliest one, so the number of running drafts does not change
+    how many tasks or queries are involved. Re-scheduling a draft just
+    replaces its entry in ``deadlines``; stale heap entries are skipped when
+    they surface.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.deadlines = {}  # draft_id -> (pick_number, deadline)
+        self.wakeup = asyncio.Event()
+        self.onExpire = None
+        self.task = None
+
+    def start(self, onExpire):
+        self.onExpire = onExpire
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def schedule(self, draft_id: int, pick_number: int, deadline: datetime):
+        self.deadlines[draft_id] = (pick_number, deadline)
+        heapq.heappush(self.heap, (deadline, draft_id, pick_number))
+        self.wakeup.set()
+
+    def cancel(self, draft_id: int):
+        self.deadlines.pop(draft_id, None)
+
+    def getDeadline(self, draft_id: int):
+        return self.deadlines.get(draft_id)
+
+    async def run(self):
+        while True:
+            self.wakeup.clear()
+            timeout = None
+            while self.heap:
+                deadline, draft_id, pick_number = self.heap[0]
+                if self.deadlines.get(draft_id) != (pick_number, deadline):
+                    heapq.heappop(self.heap)  # cancelled or rescheduled
+                    continue
+                timeout = (deadline - datetime.now()).total_seconds()
+                if timeout > 0:
+                    break
+                heapq.heappop(self.heap)
+                del self.deadlines[draft_id]
+                timeout = None
+                asyncio.create_task(self.expire(draft_id, pick_number))
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def expire(self, draft_id: int, pick_number: int):
+        try:
+            await self.onExpire(draft_id, pick_number)
+        except Exception:
+            logger.exception(f"Pick clock expiry failed for draft {draft_id}")
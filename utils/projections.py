@@ -0,0 +1,179 @@
+import numpy as np
+from scipy.special import erfinv, ndtr
+from sqlalchemy import select
+
+from models.draft import StatboticsData
+from models.scores import FRCEvent, Team, TeamScore
+
+QUAL_ALPHA = 1.07  # same alpha as TeamScore.update_qualification_points
+# Spread of unitless EPA between two teams' match performances; larger values
+# make expected ranks regress harder toward the middle of the event.
+EPA_SPREAD = 250.0
+# Expected elimination points by alliance seed, rough district averages for
+# 30 (win) / 20 (finalist) / 13 / 7 point finishes.
+ELIM_POINTS_BY_ALLIANCE = np.array([22.0, 18.0, 15.0, 13.0, 11.0, 10.0, 9.0, 8.0])
+# Award points expected from the weakest to the strongest team at an event
+AWARD_POINTS_RANGE = (1.0, 8.0)
+STATES_WEEK = 6  # no rookie points at the District Championship
+
+
+def allianceSeed(strengthRank: np.ndarray) -> np.ndarray:
+    """Alliance a team of the given strength rank is expected to land on.
+
+    Ranks 1-16 fill the captain/first pick of alliances 1-8 two at a time, 17-24
+    are second picks in serpentine order (8 down to 1) and anything after is
+    unpicked (0).
+    """
+    seed = np.where(strengthRank <= 16, np.ceil(strengthRank / 2), 25 - strengthRank)
+    return np.where(strengthRank > 24, 0, seed)
+
+
+def expectedAlliancePoints(strengthRank: np.ndarray) -> np.ndarray:
+    # 17 - alliance for captains and first picks, the alliance number for
+    # second picks, matching the pick values used when scoring
+    ranks = np.arange(1, 26, dtype=float)
+    seeds = allianceSeed(ranks)
+    points = np.where(ranks <= 16, 17 - seeds, seeds)
+    points[seeds == 0] = 0
+    return np.interp(strengthRank, ranks, points)
+
+
+def expectedElimPoints(strengthRank: np.ndarray) -> np.ndarray:
+    ranks = np.arange(1, 26, dtype=float)
+    seeds = allianceSeed(ranks).astype(int)
+    points = np.where(seeds > 0, ELIM_POINTS_BY_ALLIANCE[np.maximum(seeds, 1) - 1], 0)
+    return np.interp(strengthRank, ranks, points)
+
+
+def expectedQualificationPoints(expectedRank: np.ndarray, numTeams: np.ndarray):
+    """Vectorized TeamScore.update_qualification_points, without rounding."""
+    term1 = (numTeams - 2 * expectedRank + 2) / (QUAL_ALPHA * numTeams)
+    term2 = 10 / erfinv(1 / QUAL_ALPHA)
+    return erfinv(term1) * term2 + 12
+
+
+def projectRegistrations(
+    eventKeys, epas, weeks=None, rookieBonus=None, includeAwards=True
+) -> dict[str, np.ndarray]:
+    """Expected fantasy points for every (team, event) registration at once.
+
+    ``eventKeys`` and ``epas`` are parallel arrays with one entry per
+    registration; missing EPAs (NaN) are treated as a below-average team.
+    Offseason events are scored without awards or rookie bonuses, so pass
+    ``includeAwards=False`` for those.
+    Each team's expected qualification rank is 1 + the sum of its chances of
+    being outranked by every other team at the same event, computed for all
+    events together.
+    """
+    eventKeys = np.asarray(eventKeys)
+    epas = np.asarray(epas, dtype=float)
+    if epas.size == 0:
+        empty = np.zeros(0)
+        return {
+            "qual": empty,
+            "alliance": empty,
+            "elim": empty,
+            "award": empty,
+            "rookie": empty,
+            "total": empty,
+        }
+    known = epas[~np.isnan(epas)]
+    fallback = np.percentile(known, 25) if known.size else 0.0
+    epas = np.where(np.isnan(epas), fallback, epas)
+
+    # Lay registrations out as an (events x largest event) grid padded with
+    # NaN so every event is ranked in the same array operation.
+    _, eventIndex, counts = np.unique(
+        eventKeys, return_inverse=True, return_counts=True
+    )
+    order = np.argsort(eventIndex, kind="stable")
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    slot = np.empty_like(order)
+    slot[order] = np.arange(order.size) - np.repeat(starts, counts)
+    grid = np.full((counts.size, counts.max()), np.nan)
+    grid[eventIndex, slot] = epas
+
+    # beats[e, i, j] = P(team j finishes above team i at event e)
+    beats = ndtr((grid[:, None, :] - grid[:, :, None]) / (EPA_SPREAD * np.sqrt(2)))
+    rankGrid = 0.5 + np.nansum(beats, axis=2)
+    expectedRank = rankGrid[eventIndex, slot]
+    numTeams = counts[eventIndex].astype(float)
+
+    qual = expectedQualificationPoints(expectedRank, numTeams)
+    alliance = expectedAlliancePoints(expectedRank)
+    elim = expectedElimPoints(expectedRank)
+    percentile = np.where(
+        numTeams > 1, (numTeams - expectedRank) / np.maximum(numTeams - 1, 1), 0.5
+    )
+    award = AWARD_POINTS_RANGE[0] + percentile * (
+        AWARD_POINTS_RANGE[1] - AWARD_POINTS_RANGE[0]
+    )
+    rookie = np.zeros_like(qual)
+    if not includeAwards:
+        award = np.zeros_like(qual)
+    elif rookieBonus is not None:
+        rookie = np.asarray(rookieBonus, dtype=float)
+        if weeks is not None:
+            rookie = np.where(np.asarray(weeks) == STATES_WEEK, 0.0, rookie)
+    total = qual + alliance + elim + award + rookie
+    return {
+        "qual": qual,
+        "alliance": alliance,
+        "elim": elim,
+        "award": award,
+        "rookie": rookie,
+        "total": total,
+    }
+
+
+def rookieBonus(rookieYears, year: int) -> np.ndarray:
+    rookieYears = np.array(
+        [np.nan if y is None else y for y in rookieYears], dtype=float
+    )
+    return np.select([rookieYears == year, rookieYears == year - 1], [5.0, 2.0], 0.0)
+
+
+def registrationsQuery(year: int, epaYear: int, eventKey: str = None):
+    """Registrations to project: one event, or every FiM event of a season.
+
+    Returns a select of (team_number, event_key, week, year_end_epa,
+    rookie_year) usable from both the bot's async and the API's sync sessions.
+    """
+    stmt = (
+        select(
+            TeamScore.team_key,
+            TeamScore.event_key,
+            FRCEvent.week,
+            StatboticsData.year_end_epa,
+            Team.rookie_year,
+        )
+        .join(FRCEvent, TeamScore.event_key == FRCEvent.event_key)
+        .join(Team, Team.team_number == TeamScore.team_key)
+        .outerjoin(
+            StatboticsData,
+            (StatboticsData.team_number == TeamScore.team_key)
+            & (StatboticsData.year == epaYear),
+        )
+    )
+    if eventKey is not None:
+        return stmt.where(TeamScore.event_key == eventKey)
+    return stmt.where(FRCEvent.year == year, FRCEvent.is_fim, Team.is_fim)
+
+
+def projectRows(rows, year: int, offseason: bool = False):
+    """Project the rows of registrationsQuery.
+
+    Returns (per-registration projection dict, {team_number: total points}).
+    """
+    teams = [row[0] for row in rows]
+    projection = projectRegistrations(
+        [row[1] for row in rows],
+        [np.nan if row[3] is None else row[3] for row in rows],
+        weeks=[row[2] for row in rows],
+        rookieBonus=rookieBonus([row[4] for row in rows], year),
+        includeAwards=not offseason,
+    )
+    totals = {}
+    for team_number, points in zip(teams, projection["total"]):
+        totals[team_number] = totals.get(team_number, 0.0) + float(points)
+    return projection, totals
@@ -0,0 +1,87 @@
+import asyncio
+from contextvars import ContextVar
+
+# (session, task that owns it) for the interaction being handled
+interactionSession = ContextVar("interactionSession", default=None)
+
+
+class SharedSession:
+    """Hands out the interaction's open session without closing it on exit.
+
+    An exception leaving a helper's block does not roll anything back: the
+    command may catch it and carry on with its own pending writes. Whatever
+    is still uncommitted when the interaction's task ends is rolled back.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    async def __aenter__(self):
+        return self.session
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+class ScopedSessionMaker:
+    """Drop-in for ``async_session()`` that reuses the interaction's session.
+
+    Once ``bindTask()`` has run, every ``async with bot.async_session() as
+    session`` in the same task gets the same session, so a command holds at
+    most one pooled connection at a time however many helpers it goes
+    through. Tasks spawned from a command inherit the context but get their
+    own sessions, as an AsyncSession must not be used concurrently.
+    """
+
+    def __init__(self, sessionmaker):
+        self.sessionmaker = sessionmaker
+        self.scopes = 0
+        self.reused = 0
+        # session.close() tasks still running, kept so they aren't collected
+        self.closing = set()
+
+    def current(self):
+        current = interactionSession.get()
+        if current is not None and current[1] is asyncio.current_task():
+            return current[0]
+        return None
+
+    def __call__(self):
+        session = self.current()
+        if session is not None:
+            self.reused += 1
+            return SharedSession(session)
+        return self.sessionmaker()
+
+    async def release(self):
+        """Give the interaction's connection back to the pool before a wait.
+
+        Commits the open transaction; the session stays usable afterwards.
+        """
+        session = self.current()
+        if session is not None and session.in_transaction():
+            await session.commit()
+
+    def bindTask(self):
+        """Give the current task one session until the task finishes.
+
+        Called at the start of an interaction's task, or of a background
+        task such as a pick clock expiry; the session is closed from a done
+        callback, which also rolls back anything left uncommitted.
+        """
+        if self.current() is not None:
+            return
+        self.scopes += 1
+        session = self.sessionmaker()
+        task = asyncio.current_task()
+        interactionSession.set((session, task))
+
+        def closeSession(task):
+            closing = asyncio.ensure_future(session.close())
+            self.closing.add(closing)
+            closing.add_done_callback(self.closing.discard)
+
+        task.add_done_callback(closeSession)
+
+    def stats(self) -> dict:
+        return {"scopes": self.scopes, "reused": self.reused}
@@ -0,0 +1,275 @@
+import numpy as np
+from sqlalchemy import func, select
+
+from models.scores import (
+    FantasyScores,
+    FantasyTeam,
+    TeamOwned,
+    TeamStarted,
+    WeekStatus,
+)
+from utils.lineup import STATESWEEK, lineupWeek, weekSlots
+from utils.projections import projectRows, registrationsQuery
+
+SIMULATIONS = 20000
+# Spread of a single started team's points at one event around its projection
+EVENT_POINTS_STD = 15.0
+STATES_LOCKED_POINTS = np.array([100.0, 75.0, 50.0])
+SIMULATION_CHUNK = 5000
+
+# league_id -> (scores signature, results); results stay valid until the
+# league's FantasyScores change
+simulationCache = {}
+
+
+def weekRankPoints(scores: np.ndarray, eligible: np.ndarray = None) -> np.ndarray:
+    """Rank points for a (simulations, teams) block of weekly scores.
+
+    A team earns one point for every team it beats; tied teams share the
+    better rank, so this is N - 1 - (teams strictly ahead). With ``eligible``
+    only those teams count as being ahead.
+    """
+    ahead = scores[:, None, :] > scores[:, :, None]
+    if eligible is not None:
+        ahead &= eligible[:, None, :]
+    return scores.shape[1] - 1 - ahead.sum(axis=2)
+
+
+def statesRankPoints(scores: np.ndarray, totals: np.ndarray):
+    """States week rank points and the locked teams for each simulation.
+
+    The top three on rank points going into States get 100/75/50 in that
+    order; everyone else is ranked on their States score below them.
+    """
+    numTeams = scores.shape[1]
+    numLocked = min(3, numTeams)
+    order = np.argsort(-totals, axis=1, kind="stable")
+    locked = np.zeros(scores.shape, dtype=bool)
+    np.put_along_axis(locked, order[:, :numLocked], True, axis=1)
+    points = (weekRankPoints(scores, ~locked) - numLocked).astype(float)
+    np.put_along_axis(
+        points, order[:, :numLocked], STATES_LOCKED_POINTS[:numLocked], axis=1
+    )
+    return points, locked
+
+
+def simulateSeason(
+    rankPoints,
+    weeklyScores,
+    means,
+    stds,
+    statesIndex=None,
+    simulations: int = SIMULATIONS,
+    seed=None,
+) -> dict[str, np.ndarray]:
+    """Play out the remaining weeks of a league many times at once.
+
+    ``rankPoints`` and ``weeklyScores`` are each team's finalized totals,
+    ``means``/``stds`` are (remaining weeks, teams) projected weekly scores and
+    ``statesIndex`` is the row of the States week, if it is still to come.
+    Returns per-team odds of a top-3 (States lock, or final top 3 once States
+    is done), odds of finishing first and the expected final rank points.
+    """
+    rng = np.random.default_rng(seed)
+    rankPoints = np.asarray(rankPoints, dtype=float)
+    weeklyScores = np.asarray(weeklyScores, dtype=float)
+    means = np.asarray(means, dtype=float).reshape(-1, rankPoints.size)
+    stds = np.asarray(stds, dtype=float).reshape(means.shape)
+    numTeams = rankPoints.size
+
+    top3 = np.zeros(numTeams)
+    wins = np.zeros(numTeams)
+    finalPoints = np.zeros(numTeams)
+    for start in range(0, simulations, SIMULATION_CHUNK):
+        size = min(SIMULATION_CHUNK, simulations - start)
+        # weekly scores are whole numbers, so round to keep ties realistic
+        scores = np.rint(rng.normal(means, stds, size=(size, *means.shape)))
+        scores = scores.clip(min=0)
+        totals = np.tile(rankPoints, (size, 1))
+        locked = None
+        for week in range(means.shape[0]):
+            if week == statesIndex:
+                points, locked = statesRankPoints(scores[:, week, :], totals)
+                totals += points
+            else:
+                totals += weekRankPoints(scores[:, week, :])
+        tiebreak = weeklyScores + scores.sum(axis=1)
+
+        # standings: rank points, then total weekly score
+        ahead = (totals[:, None, :] > totals[:, :, None]) | (
+            (totals[:, None, :] == totals[:, :, None])
+            & (tiebreak[:, None, :] > tiebreak[:, :, None])
+        )
+        place = ahead.sum(axis=2)
+        if locked is None:
+            locked = place < 3
+        top3 += locked.sum(axis=0)
+        wins += (place == 0).sum(axis=0)
+        finalPoints += totals.sum(axis=0)
+
+    return {
+        "top3": top3 / simulations,
+        "win": wins / simulations,
+        "rank_points": finalPoints / simulations,
+    }
+
+
+def scoresSignatureQuery(leagueId: int):
+    """Cheap fingerprint of a league's FantasyScores for cache invalidation."""
+    return select(
+        func.count(),
+        func.sum(FantasyScores.rank_points),
+        func.sum(FantasyScores.weekly_score),
+        func.max(FantasyScores.week),
+    ).where(FantasyScores.league_id == leagueId)
+
+
+def simulationQueries(league) -> dict:
+    """Statements whose results feed simulateLeagueRows.
+
+    Usable from both the bot's async and the API's sync sessions.
+    """
+    leagueId = league.league_id
+    return {
+        "teams": select(FantasyTeam.fantasy_team_id, FantasyTeam.fantasy_team_name)
+        .where(FantasyTeam.league_id == leagueId)
+        .order_by(FantasyTeam.fantasy_team_id.asc()),
+        "scores": select(
+            FantasyScores.fantasy_team_id,
+            FantasyScores.week,
+            FantasyScores.rank_points,
+            FantasyScores.weekly_score,
+        ).where(FantasyScores.league_id == leagueId),
+        "finalized": select(WeekStatus.week).where(
+            WeekStatus.year == league.year, WeekStatus.scores_finalized
+        ),
+        "owned": select(TeamOwned.fantasy_team_id, TeamOwned.team_key).where(
+            TeamOwned.league_id == leagueId
+        ),
+        "starts": select(
+            TeamStarted.fantasy_team_id,
+            TeamStarted.team_number,
+            TeamStarted.event_key,
+            TeamStarted.week,
+        ).where(TeamStarted.league_id == leagueId),
+        "registrations": registrationsQuery(league.year, league.year - 1),
+    }
+
+
+def projectLineups(league, teamIds, rows: dict, weeks):
+    """Projected weekly score mean and std for each (remaining week, team).
+
+    Set lineups are used as-is; otherwise each team is assumed to start its
+    best projected rostered teams for that week.
+    """
+    registrations = rows["registrations"]
+    projection, _ = projectRows(registrations, league.year)
+    # (team_number, fantasy week) -> projected points, and per event for starts
+    teamWeekPoints = {}
+    eventPoints = {}
+    for index, row in enumerate(registrations):
+        points = float(projection["total"][index])
+        week = lineupWeek(row.event_key, row.week, league.year)
+        key = (row.team_key, week)
+        teamWeekPoints[key] = teamWeekPoints.get(key, 0.0) + points
+        eventPoints[(row.team_key, row.event_key)] = points
+
+    rosters = {}
+    for fantasy_team_id, team_key in rows["owned"]:
+        rosters.setdefault(fantasy_team_id, []).append(team_key)
+    started = {}
+    for fantasy_team_id, team_number, event_key, week in rows["starts"]:
+        started.setdefault((fantasy_team_id, week), []).append(
+            (team_number, event_key)
+        )
+
+    teamColumn = {teamId: column for column, teamId in enumerate(teamIds)}
+    means = np.zeros((len(weeks), len(teamIds)))
+    stds = np.zeros_like(means)
+    for row, week in enumerate(weeks):
+        slots = weekSlots(week, league.team_starts)
+        for teamId, column in teamColumn.items():
+            lineup = started.get((teamId, week))
+            if lineup:
+                if week == STATESWEEK:
+                    # States counts every event the started team plays that week
+                    points = [
+                        teamWeekPoints.get((team, week), 0.0) for team, _ in lineup
+                    ]
+                else:
+                    points = [eventPoints.get(start, 0.0) for start in lineup]
+            else:
+                candidates = sorted(
+                    (
+                        teamWeekPoints[(team, week)]
+                        for team in rosters.get(teamId, [])
+                        if (team, week) in teamWeekPoints
+                    ),
+                    reverse=True,
+                )
+                points = candidates[:slots]
+            means[row, column] = sum(points)
+            stds[row, column] = EVENT_POINTS_STD * np.sqrt(len(points))
+    return means, stds
+
+
+def simulateLeagueRows(
+    league, rows: dict, simulations: int = SIMULATIONS, seed=None
+) -> list[dict]:
+    """Run the playoff-odds simulation from the results of simulationQueries."""
+    teams = list(rows["teams"])
+    teamIds = [team.fantasy_team_id for team in teams]
+    finalized = {week for (week,) in rows["finalized"]}
+
+    rankPoints = dict.fromkeys(teamIds, 0.0)
+    weeklyScores = dict.fromkeys(teamIds, 0.0)
+    for fantasy_team_id, week, rank_points, weekly_score in rows["scores"]:
+        if week in finalized and fantasy_team_id in rankPoints:
+            rankPoints[fantasy_team_id] += rank_points or 0
+            weeklyScores[fantasy_team_id] += weekly_score or 0
+
+    eventWeeks = {
+        lineupWeek(row.event_key, row.week, league.year)
+        for row in rows["registrations"]
+    }
+    weeks = sorted(
+        week for week in eventWeeks if week <= STATESWEEK and week not in finalized
+    )
+    means, stds = projectLineups(league, teamIds, rows, weeks)
+    odds = simulateSeason(
+        [rankPoints[teamId] for teamId in teamIds],
+        [weeklyScores[teamId] for teamId in teamIds],
+        means,
+        stds,
+        statesIndex=weeks.index(STATESWEEK) if STATESWEEK in weeks else None,
+        simulations=simulations,
+        seed=seed,
+    )
+
+    results = [
+        {
+            "fantasy_team_id": team.fantasy_team_id,
+            "fantasy_team_name": team.fantasy_team_name,
+            "rank_points": rankPoints[team.fantasy_team_id],
+            "projected_rank_points": round(float(odds["rank_points"][column]), 2),
+            "top3_odds": round(float(odds["top3"][column]), 4),
+            "win_odds": round(float(odds["win"][column]), 4),
+        }
+        for column, team in enumerate(teams)
+    ]
+    results.sort(
+        key=lambda team: (team["top3_odds"], team["projected_rank_points"]),
+        reverse=True,
+    )
+    return results
+
+
+def getCachedSimulation(leagueId: int, signature):
+    cached = simulationCache.get(leagueId)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    return None
+
+
+def setCachedSimulation(leagueId: int, signature, results):
+    simulationCache[leagueId] = (signature, results)
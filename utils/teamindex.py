@@ -0,0 +1,189 @@
+import asyncio
+import time
+from bisect import bisect_left
+
+from discord import app_commands
+from sqlalchemy import select
+
+from models.draft import Draft
+from models.scores import Team, TeamOwned
+from models.transactions import TeamOnWaivers
+from utils.cache import MISSING, TTLCache
+
+INDEX_TTL = 3600
+SCOPE_TTL = 30
+DRAFT_CHANNEL_TTL = 600
+MAX_CHOICES = 25  # Discord's limit for autocomplete results
+
+
+class TeamIndex:
+    """Prefix index over FRC team numbers and the words of team names.
+
+    Both lookups are a bisect into a sorted list followed by a scan of the
+    matching run, so answering a keystroke never touches the database.
+    """
+
+    def __init__(self, teams):
+        self.names = {}
+        self.fim = set()
+        for team_number, name, is_fim in teams:
+            self.names[team_number] = name
+            if is_fim:
+                self.fim.add(team_number)
+        self.numbers = sorted(self.names)
+        self.words = sorted(
+            (word, team_number)
+            for team_number, name in self.names.items()
+            for word in set(name.lower().split())
+        )
+        self.ordered = sorted(self.names, key=self.sortKey)
+
+    @staticmethod
+    def sortKey(team_number: str):
+        return (len(team_number), team_number)
+
+    def numberMatches(self, prefix: str):
+        index = bisect_left(self.numbers, prefix)
+        while index < len(self.numbers) and self.numbers[index].startswith(prefix):
+            yield self.numbers[index]
+            index += 1
+
+    def wordMatches(self, prefix: str):
+        index = bisect_left(self.words, (prefix, ""))
+        while index < len(self.words) and self.words[index][0].startswith(prefix):
+            yield self.words[index][1]
+            index += 1
+
+    def search(self, current: str, allowed=None, limit: int = MAX_CHOICES):
+        """Team numbers matching what the user has typed so far.
+
+        Number matches come first, shortest number first, then teams with a
+        name word starting with the text. ``allowed`` filters the results.
+        """
+        current = current.strip().lower()
+        if not current:
+            candidates = self.ordered
+        else:
+            candidates = sorted(self.numberMatches(current), key=self.sortKey)
+            if not current.isdigit():
+                candidates += sorted(set(self.wordMatches(current)), key=self.sortKey)
+        results = []
+        seen = set()
+        for team_number in candidates:
+            if team_number in seen:
+                continue
+            if allowed is not None and not allowed(team_number):
+                continue
+            seen.add(team_number)
+            results.append(team_number)
+            if len(results) >= limit:
+                break
+        return results
+
+    def choice(self, team_number: str) -> app_commands.Choice:
+        name = self.names.get(team_number, "")
+        return app_commands.Choice(
+            name=f"{team_number} - {name}"[:100], value=team_number
+        )
+
+
+class TeamAutocomplete:
+    """Context-scoped team number autocomplete shared by every cog.
+
+    The team index is loaded once an hour; the per-league or per-team scope
+    (roster, free agents, waivers) is loaded once per SCOPE_TTL and then
+    reused for every keystroke.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.index = None
+        self.indexLoaded = 0.0
+        self.indexLock = asyncio.Lock()
+        self.scopes = TTLCache("autocomplete_scope", SCOPE_TTL)
+        self.draftChannels = TTLCache("draft_channel", DRAFT_CHANNEL_TTL)
+
+    def invalidate(self):
+        self.index = None
+        self.scopes.invalidate()
+
+    async def getIndex(self) -> TeamIndex:
+        if self.index is not None and time.monotonic() - self.indexLoaded < INDEX_TTL:
+            return self.index
+        async with self.indexLock:
+            if self.index is None or time.monotonic() - self.indexLoaded >= INDEX_TTL:
+                async with self.bot.async_session() as session:
+                    result = await session.execute(
+                        select(Team.team_number, Team.name, Team.is_fim)
+                    )
+                    self.index = TeamIndex(result.all())
+                self.indexLoaded = time.monotonic()
+        return self.index
+
+    async def getScope(self, key, stmt) -> set:
+        teams = self.scopes.get(key)
+        if teams is MISSING:
+            async with self.bot.async_session() as session:
+                teams = set((await session.execute(stmt)).scalars().all())
+            self.scopes.set(key, teams)
+        return teams
+
+    async def getDraftId(self, channel_id):
+        draft_id = self.draftChannels.get(channel_id)
+        if draft_id is MISSING:
+            async with self.bot.async_session() as session:
+                result = await session.execute(
+                    select(Draft.draft_id).where(
+                        Draft.discord_channel == str(channel_id)
+                    )
+                )
+                draft_id = self.draftChannels.set(channel_id, result.scalars().first())
+        return draft_id
+
+    async def getAllowed(self, interaction, scope: str, index: TeamIndex):
+        if scope == "fim":
+            return index.fim.__contains__
+        if scope == "draft":
+            draft_id = await self.getDraftId(interaction.channel_id)
+            if draft_id is None:
+                return None
+            state = await self.bot.draftStates.get(draft_id)
+            if state is None:
+                return None
+            return lambda team: state.isEligible(team) and state.isUnpicked(team)
+
+        league_id = await self.bot.getChannelLeagueId(interaction.channel_id)
+        if league_id is None:
+            return index.fim.__contains__
+        if scope == "roster":
+            fantasyId = await self.bot.getUserFantasyTeamId(
+                interaction.user.id, interaction.channel_id
+            )
+            roster = await self.getScope(
+                ("roster", fantasyId),
+                select(TeamOwned.team_key).where(
+                    TeamOwned.fantasy_team_id == fantasyId
+                ),
+            )
+            return roster.__contains__
+        waivers = await self.getScope(
+            ("waivers", league_id),
+            select(TeamOnWaivers.team_number).where(
+                TeamOnWaivers.league_id == league_id
+            ),
+        )
+        if scope == "waivers":
+            return waivers.__contains__
+        # free agents: FiM teams nobody in the league owns and not on waivers
+        owned = await self.getScope(
+            ("owned", league_id),
+            select(TeamOwned.team_key).where(TeamOwned.league_id == league_id),
+        )
+        return lambda team: (
+            team in index.fim and team not in owned and team not in waivers
+        )
+
+    async def complete(self, interaction, current: str, scope: str):
+        index = await self.getIndex()
+        allowed = await self.getAllowed(interaction, scope, index)
+        return [index.choice(team) for team in index.search(current, allowed)]